@@ -0,0 +1,351 @@
+from __future__ import annotations
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Iterator, Literal, NamedTuple
+
+from PIL import Image
+
+from backend.app import main as engine
+from backend.app.main import (
+  GraphIndex,
+  GraphValidationError,
+  ProjectNode,
+  ProjectPayload,
+  RenderTimings,
+  create_graph_evaluator,
+  encode_image,
+  read_project,
+  write_bytes_atomic,
+)
+
+OUTPUT_SUFFIXES = {"png": "png", "jpeg": "jpg", "webp": "webp"}
+DEFAULT_CACHE_MB = 128
+# Frames submitted per worker before waiting on results; keeps decoded images and futures bounded.
+FRAMES_IN_FLIGHT_PER_WORKER = 2
+PROGRESS_INTERVAL_SEC = 5.0
+
+
+class BatchRenderError(ValueError):
+  pass
+
+
+class BatchRenderConfig(NamedTuple):
+  slot: str
+  revision: int | None
+  input_node: str
+  outputs: list[str]
+  output_dir: Path
+  image_format: str
+  quality: int | None
+  scale: float
+  cache_mb: int
+
+
+class FrameResult(NamedTuple):
+  frame: str
+  status: Literal["rendered", "skipped", "failed"]
+  elapsed_ms: float = 0.0
+  node_ms: dict[str, float] | None = None
+  error: str | None = None
+
+
+def collect_input_frames(source: str) -> list[Path]:
+  image_suffixes = {suffix.lower() for suffix in Image.registered_extensions()}
+  source_path = Path(source)
+  if source_path.is_dir():
+    candidates = [path for path in source_path.iterdir() if path.suffix.lower() in image_suffixes]
+  else:
+    candidates = [Path(match) for match in glob.glob(source)]
+  return sorted(path for path in candidates if path.is_file())
+
+
+def resolve_output_ids(project: ProjectPayload, requested: list[str] | None) -> list[str]:
+  preview_ids = [node.id for node in project.nodes if node.type == "PreviewDisplay"]
+  if not requested:
+    if not preview_ids:
+      raise BatchRenderError("PreviewDisplay ノードがありません。")
+    return preview_ids
+  unknown = [node_id for node_id in requested if node_id not in preview_ids]
+  if unknown:
+    raise BatchRenderError(f"PreviewDisplay ノードではありません: {', '.join(unknown)}")
+  return list(dict.fromkeys(requested))
+
+
+def resolve_input_node(project: ProjectPayload, requested: str | None) -> str:
+  media_ids = [node.id for node in project.nodes if node.type == "MediaInput"]
+  if requested is None:
+    if not media_ids:
+      raise BatchRenderError("MediaInput ノードがありません。")
+    return media_ids[0]
+  if requested not in media_ids:
+    raise BatchRenderError(f"MediaInput ノードではありません: {requested}")
+  return requested
+
+
+def output_paths_for(config: BatchRenderConfig, frame: Path) -> dict[str, Path]:
+  suffix = OUTPUT_SUFFIXES[config.image_format]
+  if len(config.outputs) == 1:
+    return {config.outputs[0]: config.output_dir / f"{frame.stem}.{suffix}"}
+  return {node_id: config.output_dir / node_id / f"{frame.stem}.{suffix}" for node_id in config.outputs}
+
+
+def check_output_collisions(config: BatchRenderConfig, frames: list[Path]) -> None:
+  # Outputs are named by frame stem, so 'a.png' and 'a.jpg' would silently overwrite each other.
+  claimed: dict[Path, Path] = {}
+  collisions: list[str] = []
+  for frame in frames:
+    for target in output_paths_for(config, frame).values():
+      other = claimed.setdefault(target, frame)
+      if other != frame:
+        collisions.append(f"{other.name} / {frame.name} -> {target.name}")
+  if collisions:
+    raise BatchRenderError(f"出力ファイル名が重複する入力フレームがあります: {', '.join(dict.fromkeys(collisions))}")
+
+
+def is_frame_complete(config: BatchRenderConfig, frame: Path) -> bool:
+  # Outputs are written atomically, so an existing file is a finished one.
+  return all(path.exists() for path in output_paths_for(config, frame).values())
+
+
+def substitute_input_frame(project: ProjectPayload, input_node: str, frame: Path) -> ProjectPayload:
+  nodes: list[ProjectNode] = []
+  for node in project.nodes:
+    if node.id == input_node:
+      params = {key: value for key, value in (node.params or {}).items() if key != "assetId"}
+      params["path"] = str(frame.absolute())
+      node = node.model_copy(update={"params": params})
+    nodes.append(node)
+  return project.model_copy(update={"nodes": nodes})
+
+
+class BatchWorker:
+  def __init__(self, config: BatchRenderConfig) -> None:
+    self.config = config
+    self.project, _, _ = read_project(config.slot, config.revision)
+
+  def render(self, frame: Path) -> FrameResult:
+    started = time.perf_counter()
+    project = substitute_input_frame(self.project, self.config.input_node, frame)
+    timings = RenderTimings()
+    try:
+      # A frame that cannot be decoded fails instead of rendering the placeholder.
+      resolve_outputs = create_graph_evaluator(
+        project,
+        self.config.scale,
+        GraphIndex(project),
+        timings=timings,
+        strict_inputs=frozenset([self.config.input_node]),
+      )
+      images = resolve_outputs(self.config.outputs)
+      for node_id, target in output_paths_for(self.config, frame).items():
+        image = images.get(node_id)
+        if image is None:
+          raise BatchRenderError(f"{node_id} の出力がありません")
+        target.parent.mkdir(parents=True, exist_ok=True)
+        write_bytes_atomic(target, encode_image(image.convert("RGB"), self.config.image_format, self.config.quality))
+    except (BatchRenderError, GraphValidationError, OSError) as error:
+      return FrameResult(str(frame), "failed", (time.perf_counter() - started) * 1000.0, timings.node_ids, str(error))
+    return FrameResult(str(frame), "rendered", (time.perf_counter() - started) * 1000.0, timings.node_ids)
+
+
+_WORKER: BatchWorker | None = None
+EngineLimits = tuple[int, int, int]
+
+
+def apply_worker_limits(config: BatchRenderConfig) -> EngineLimits:
+  # Frames are the unit of parallelism, so a worker evaluates its graph on one thread within its own cache budget.
+  previous = (engine.GRAPH_WORKERS, engine.NODE_RESULT_CACHE.max_bytes, engine.DECODED_MEDIA_CACHE.max_bytes)
+  restore_worker_limits((1, config.cache_mb * 1024 * 1024, config.cache_mb * 1024 * 1024))
+  return previous
+
+
+def restore_worker_limits(limits: EngineLimits) -> None:
+  engine.GRAPH_WORKERS, engine.NODE_RESULT_CACHE.max_bytes, engine.DECODED_MEDIA_CACHE.max_bytes = limits
+
+
+def init_worker(config: BatchRenderConfig) -> None:
+  # Pool processes only render frames, so their limits stay for the process lifetime.
+  global _WORKER
+  apply_worker_limits(config)
+  _WORKER = BatchWorker(config)
+
+
+def render_frame(frame: Path) -> FrameResult:
+  if _WORKER is None:
+    raise RuntimeError("batch worker is not initialised")
+  return _WORKER.render(frame)
+
+
+class ThroughputReport:
+  def __init__(self, node_types: dict[str, str]) -> None:
+    self.node_types = node_types
+    self.counts = {"rendered": 0, "skipped": 0, "failed": 0}
+    self.node_ms: dict[str, float] = {}
+    self.frame_ms = 0.0
+    self.failures: list[tuple[str, str]] = []
+    self.started = time.perf_counter()
+
+  def add(self, result: FrameResult) -> None:
+    self.counts[result.status] += 1
+    if result.status == "failed":
+      self.failures.append((result.frame, result.error or ""))
+    if result.status != "rendered":
+      return
+    self.frame_ms += result.elapsed_ms
+    for node_id, elapsed_ms in (result.node_ms or {}).items():
+      self.node_ms[node_id] = self.node_ms.get(node_id, 0.0) + elapsed_ms
+
+  def summary(self) -> dict[str, Any]:
+    elapsed_sec = time.perf_counter() - self.started
+    rendered = self.counts["rendered"]
+    total_node_ms = sum(self.node_ms.values()) or 1.0
+    nodes = [
+      {
+        "nodeId": node_id,
+        "type": self.node_types.get(node_id, "?"),
+        "totalMs": round(elapsed_ms, 3),
+        "meanMs": round(elapsed_ms / max(rendered, 1), 3),
+        "share": round(elapsed_ms / total_node_ms, 4),
+      }
+      for node_id, elapsed_ms in sorted(self.node_ms.items(), key=lambda item: item[1], reverse=True)
+    ]
+    return {
+      **self.counts,
+      "elapsedSec": round(elapsed_sec, 3),
+      "framesPerSec": round(rendered / elapsed_sec, 3) if elapsed_sec > 0 else 0.0,
+      "meanFrameMs": round(self.frame_ms / max(rendered, 1), 3),
+      "nodes": nodes,
+      "failures": [{"frame": frame, "error": error} for frame, error in self.failures],
+    }
+
+
+def format_report(summary: dict[str, Any]) -> str:
+  lines = [
+    f"rendered {summary['rendered']} / skipped {summary['skipped']} / failed {summary['failed']}",
+    f"elapsed {summary['elapsedSec']:.2f}s, {summary['framesPerSec']:.2f} frames/s, "
+    f"{summary['meanFrameMs']:.1f} ms/frame per worker",
+  ]
+  if summary["nodes"]:
+    lines.append(f"{'node':<24}{'type':<20}{'total ms':>12}{'mean ms':>10}{'share':>8}")
+    for node in summary["nodes"]:
+      lines.append(
+        f"{node['nodeId']:<24}{node['type']:<20}{node['totalMs']:>12.1f}{node['meanMs']:>10.2f}{node['share']:>8.1%}"
+      )
+  for failure in summary["failures"]:
+    lines.append(f"failed: {failure['frame']}: {failure['error']}")
+  return "\n".join(lines)
+
+
+def iterate_results(config: BatchRenderConfig, frames: list[Path], workers: int) -> Iterator[FrameResult]:
+  if workers <= 1:
+    # Rendering in the caller's process: the limits are scoped to this batch, not left on the imported engine.
+    worker = BatchWorker(config)
+    previous = apply_worker_limits(config)
+    try:
+      for frame in frames:
+        yield worker.render(frame)
+    finally:
+      restore_worker_limits(previous)
+    return
+  max_in_flight = workers * FRAMES_IN_FLIGHT_PER_WORKER
+  with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(config,)) as executor:
+    pending: set[Future[FrameResult]] = set()
+    queued = iter(frames)
+    for frame in queued:
+      pending.add(executor.submit(render_frame, frame))
+      if len(pending) < max_in_flight:
+        continue
+      done, pending = wait(pending, return_when=FIRST_COMPLETED)
+      for future in done:
+        yield future.result()
+    for future in wait(pending).done:
+      yield future.result()
+
+
+def run_batch(
+  config: BatchRenderConfig,
+  project: ProjectPayload,
+  frames: list[Path],
+  workers: int,
+  resume: bool = False,
+  progress: Any = None,
+) -> dict[str, Any]:
+  GraphIndex(project).plan()
+  check_output_collisions(config, frames)
+  report = ThroughputReport({node.id: node.type for node in project.nodes})
+  todo: list[Path] = []
+  for frame in frames:
+    if resume and is_frame_complete(config, frame):
+      report.add(FrameResult(str(frame), "skipped"))
+    else:
+      todo.append(frame)
+  config.output_dir.mkdir(parents=True, exist_ok=True)
+  last_progress = time.perf_counter()
+  for result in iterate_results(config, todo, workers):
+    report.add(result)
+    if progress is not None and time.perf_counter() - last_progress >= PROGRESS_INTERVAL_SEC:
+      last_progress = time.perf_counter()
+      done = report.counts["rendered"] + report.counts["failed"]
+      print(f"{done}/{len(todo)} frames", file=progress, flush=True)
+  return report.summary()
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+  parser = argparse.ArgumentParser(description="NodeVision headless batch renderer")
+  parser.add_argument("slot", help="backend/storage 内のプロジェクトスロット名（.nveproj）")
+  parser.add_argument("--input", required=True, help="入力フレームのディレクトリ、または glob パターン（例: 'frames/*.png'）")
+  parser.add_argument("--output-dir", required=True, help="出力先ディレクトリ")
+  parser.add_argument("--input-node", help="入力フレームを差し込む MediaInput ノード ID（既定: 先頭の MediaInput）")
+  parser.add_argument(
+    "--output",
+    action="append",
+    dest="outputs",
+    help="書き出す PreviewDisplay ノード ID（複数指定可、既定: すべて）",
+  )
+  parser.add_argument("--format", choices=sorted(OUTPUT_SUFFIXES), default="png", help="出力形式")
+  parser.add_argument("--quality", type=int, help="JPEG / WebP の品質（1-100）")
+  parser.add_argument("--scale", type=float, default=1.0, help="レンダリング倍率")
+  parser.add_argument("--revision", type=int, help="ジャーナル保存されたプロジェクトのリビジョン")
+  parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="ワーカープロセス数")
+  parser.add_argument("--cache-mb", type=int, default=DEFAULT_CACHE_MB, help="ワーカーごとのノード結果／メディアキャッシュ上限（MB）")
+  parser.add_argument("--resume", action="store_true", help="出力が揃っているフレームをスキップする")
+  parser.add_argument("--json", action="store_true", help="レポートを JSON で出力する")
+  return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+  args = parse_args(argv)
+  frames = collect_input_frames(args.input)
+  if not frames:
+    print(f"入力フレームが見つかりません: {args.input}", file=sys.stderr)
+    return 2
+  try:
+    project, _, _ = read_project(args.slot, args.revision)
+    config = BatchRenderConfig(
+      slot=args.slot,
+      revision=args.revision,
+      input_node=resolve_input_node(project, args.input_node),
+      outputs=resolve_output_ids(project, args.outputs),
+      output_dir=Path(args.output_dir),
+      image_format=args.format,
+      quality=args.quality,
+      scale=max(args.scale, 0.01),
+      cache_mb=max(args.cache_mb, 0),
+    )
+    summary = run_batch(config, project, frames, max(args.workers, 1), args.resume, sys.stderr)
+  except (BatchRenderError, GraphValidationError, FileNotFoundError, ValueError) as error:
+    print(str(error), file=sys.stderr)
+    return 2
+  print(json.dumps(summary, ensure_ascii=False, indent=2) if args.json else format_report(summary))
+  return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+  sys.exit(main())
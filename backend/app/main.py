@@ -1,26 +1,107 @@
 from __future__ import annotations
 
+import asyncio
+import hashlib
+import uuid
 import json
+import mmap
+import os
+import stat
+import threading
+import time
+from bisect import bisect_right
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
 from pathlib import Path
-from typing import Any, List, Literal, Optional, NamedTuple
+from typing import Any, Awaitable, Callable, List, Literal, Optional, NamedTuple, TypeVar
 from base64 import b64encode
 from datetime import datetime
+from functools import lru_cache
 from zoneinfo import ZoneInfo
 from io import BytesIO
 
 import math
-from PIL import Image, ImageDraw, ImageEnhance, ImageFont
+from PIL import Image, ImageDraw, ImageFont
 
 RESAMPLE_LANCZOS = getattr(getattr(Image, "Resampling", Image), "LANCZOS", Image.BICUBIC)
 
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, Header, HTTPException, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.exceptions import RequestValidationError
 from pydantic import BaseModel, Field, ValidationError, ConfigDict
 
+try:
+  import orjson
+except ModuleNotFoundError:
+  orjson = None
+
+try:
+  import av
+except ModuleNotFoundError:
+  av = None
+
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
 BACKEND_VERSION = "0.2.0"
 DEFAULT_PROJECT_SLOT = "latest"
 STORAGE_DIR = PROJECT_ROOT / "storage"
 BENCH_LOG_PATH = PROJECT_ROOT / "tmp" / "preview_bench.log"
+
+
+def read_env_int(name: str, default: int, minimum: int = 0) -> int:
+  try:
+    value = int(os.environ.get(name, default))
+  except ValueError:
+    value = default
+  return max(value, minimum)
+
+
+NODE_CACHE_MAX_BYTES = read_env_int("NODEVISION_NODE_CACHE_MB", 512) * 1024 * 1024
+MEDIA_CACHE_MAX_BYTES = read_env_int("NODEVISION_MEDIA_CACHE_MB", 256) * 1024 * 1024
+FRAME_CACHE_MAX_BYTES = read_env_int("NODEVISION_FRAME_CACHE_MB", 256) * 1024 * 1024
+MEDIA_MISSING_TTL_SEC = 2.0
+LATENCY_WINDOW_SIZE = read_env_int("NODEVISION_LATENCY_WINDOW", 200, 1)
+SESSION_MAX_COUNT = read_env_int("NODEVISION_MAX_SESSIONS", 32, 1)
+SESSION_EVENT_HISTORY = 512
+SESSION_HEARTBEAT_SEC = 30.0
+PREVIEW_DRAFT_MAX_EDGE = 480
+PREVIEW_DRAFT_QUALITY = 60
+RENDER_POOL_MODE = "process" if os.environ.get("NODEVISION_RENDER_POOL", "thread").strip().lower() == "process" else "thread"
+RENDER_POOL_WORKERS = read_env_int("NODEVISION_RENDER_WORKERS", min(os.cpu_count() or 1, 4), 1)
+RENDER_POOL_MAX_PENDING = read_env_int("NODEVISION_RENDER_MAX_PENDING", RENDER_POOL_WORKERS * 4, 1)
+GRAPH_WORKERS = read_env_int("NODEVISION_GRAPH_WORKERS", os.cpu_count() or 1, 1)
+PROXY_RENDER_BUDGET_RATIO = read_env_int("NODEVISION_PROXY_BUDGET_PCT", 60, 1) / 100.0
+PROXY_SCALE_STEP = 0.125
+COST_MODEL_MAX_GRAPHS = 256
+COST_MODEL_SMOOTHING = 0.3
+COST_MODEL_MIN_SAMPLE_MS = 5.0
+EXECUTION_PLAN_CACHE_SIZE = 128
+PROJECT_COMPACT_MIN_NODES = read_env_int("NODEVISION_PROJECT_COMPACT_NODES", 500)
+PROJECT_CACHE_SIZE = 16
+PROJECT_JOURNAL_MAX_ENTRIES = read_env_int("NODEVISION_JOURNAL_MAX_ENTRIES", 256, 1)
+PROJECT_KEYED_LISTS = ("nodes", "assets")
+ASSET_HASH_WORKERS = read_env_int("NODEVISION_HASH_WORKERS", 2, 1)
+ASSET_HASH_CHUNK_BYTES = 8 * 1024 * 1024
+ASSET_HASH_MAX_ENTRIES = 4096
+PROXY_CACHE_DIR = Path(os.environ.get("NODEVISION_PROXY_CACHE_DIR") or PROJECT_ROOT / "cache" / "proxies")
+PROXY_PYRAMID_FACTORS = (2, 4, 8)
+PROXY_PYRAMID_WORKERS = read_env_int("NODEVISION_PROXY_WORKERS", 1, 1)
+PROXY_PYRAMID_QUALITY = 92
+PROXY_PYRAMID_MIN_EDGE = 64
+PROXY_PYRAMID_MAX_ENTRIES = 1024
+PREVIEW_CACHE_CONTROL = "private, no-cache"
+# Proxy reasons whose scale follows from the request or project alone; cost_model / historical_delay drift with load.
+PINNED_PROXY_REASONS = frozenset({
+  "client_force_on", "client_force_off", "project_metadata_on", "project_metadata_off", "viewport_zoom",
+})
+VIDEO_FILE_SUFFIXES = frozenset({".mp4", ".mov", ".m4v", ".mkv", ".webm", ".avi"})
+VIDEO_DECODER_MAX_OPEN = 4
+GRAPH_SIGNATURE_MEMO_LIMIT = 64
+PREFETCH_FRAMES = read_env_int("NODEVISION_PREFETCH_FRAMES", 8)
+PREFETCH_WORKERS = read_env_int("NODEVISION_PREFETCH_WORKERS", 1, 1)
+PREFETCH_NICE = 10
+PREFETCH_YIELD_SEC = 0.005
+METRICS_BUCKETS_SEC = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+RENDER_FIXED_COST_MS = 1.0
+NODE_FIXED_COST_MS = 0.1
 STORAGE_DIR.mkdir(parents=True, exist_ok=True)
 
 
@@ -105,16 +186,19 @@ class ProjectPayload(BaseModel):
 class ProjectSaveRequest(BaseModel):
   project: ProjectPayload
   slot: str | None = Field(default=DEFAULT_PROJECT_SLOT)
+  journal: bool = False
 
 
 class ProjectSaveResponse(BaseModel):
   slot: str
   path: str
   summary: ProjectSummary
+  revision: int | None = None
 
 
 class ProjectLoadRequest(BaseModel):
   slot: str | None = Field(default=DEFAULT_PROJECT_SLOT)
+  revision: int | None = Field(default=None, ge=1)
 
 
 class ProjectLoadResponse(BaseModel):
@@ -122,6 +206,7 @@ class ProjectLoadResponse(BaseModel):
   path: str
   project: ProjectPayload
   summary: ProjectSummary
+  revision: int | None = None
 
 
 class ValidationIssue(BaseModel):
@@ -142,7 +227,32 @@ class PreviewProxyInfo(BaseModel):
   scale: float
   reason: str
   averageDelayMs: float | None = None
+  p95DelayMs: float | None = None
   targetDelayMs: float | None = None
+  predictedRenderMs: float | None = None
+  actualRenderMs: float | None = None
+
+
+class PreviewTimings(BaseModel):
+  totalMs: float
+  stages: dict[str, float] = Field(default_factory=dict)
+  nodes: dict[str, float] = Field(default_factory=dict)
+
+
+class PreviewViewport(BaseModel):
+  x: int = Field(ge=0)
+  y: int = Field(ge=0)
+  width: int = Field(ge=1)
+  height: int = Field(ge=1)
+  zoom: float = Field(default=1.0, gt=0.0, le=64.0)
+
+
+class PreviewHud(BaseModel):
+  title: str
+  fps: float
+  nodeCount: int
+  pipeline: list[str]
+  lines: list[str]
 
 
 class PreviewResponse(BaseModel):
@@ -152,11 +262,212 @@ class PreviewResponse(BaseModel):
   source: PreviewSourceInfo
   proxy: PreviewProxyInfo
   generatedAt: str
+  timings: PreviewTimings | None = None
+  viewport: PreviewViewport | None = None
+  frame: int | None = None
+  hud: PreviewHud | None = None
 
 
 class PreviewGenerateRequest(BaseModel):
   project: ProjectPayload
   forceProxy: bool | None = None
+  includeTimings: bool = False
+  viewport: PreviewViewport | None = None
+  frame: int | None = Field(default=None, ge=0)
+  overlay: Literal["pixels", "metadata"] = "pixels"
+
+
+class PreviewRenderRequest(PreviewGenerateRequest):
+  format: Literal["png", "jpeg", "webp"] | None = None
+  quality: int | None = Field(default=None, ge=1, le=100)
+
+
+class PreviewBatchRequest(BaseModel):
+  project: ProjectPayload
+  forceProxy: bool | None = None
+  outputs: list[str] | None = None
+  format: Literal["png", "jpeg", "webp"] = "png"
+  quality: int | None = Field(default=None, ge=1, le=100)
+  includeTimings: bool = False
+  frame: int | None = Field(default=None, ge=0)
+
+
+class PreviewBatchItem(BaseModel):
+  nodeId: str
+  imageBase64: str
+  mediaType: str
+  width: int
+  height: int
+  source: PreviewSourceInfo
+
+
+class PreviewBatchResponse(BaseModel):
+  outputs: list[PreviewBatchItem] = Field(default_factory=list)
+  missing: list[str] = Field(default_factory=list)
+  proxy: PreviewProxyInfo
+  generatedAt: str
+  timings: PreviewTimings | None = None
+
+
+class NodeCacheStats(BaseModel):
+  entries: int
+  bytes: int
+  maxBytes: int
+  hits: int
+  misses: int
+  evictions: int
+  hitRatio: float
+
+
+class RenderPoolStats(BaseModel):
+  mode: str
+  workers: int
+  maxPending: int
+  inFlight: int
+  queued: int
+  completed: int
+  rejected: int
+
+
+class EncoderStats(BaseModel):
+  format: str
+  count: int
+  averageEncodeMs: float
+  lastEncodeMs: float
+  averageBytes: float
+  lastBytes: int
+  totalBytes: int
+
+
+class LatencyStats(BaseModel):
+  profile: str
+  count: int
+  meanMs: float
+  p50Ms: float
+  p95Ms: float
+
+
+class LatencySampleRequest(BaseModel):
+  profile: str
+  delayMs: float = Field(ge=0)
+
+
+class PrefetchStats(BaseModel):
+  framesAhead: int
+  workers: int
+  active: int
+  scheduled: int
+  rendered: int
+  cancelled: int
+
+
+class PreviewStatsResponse(BaseModel):
+  cache: NodeCacheStats
+  media: NodeCacheStats
+  frames: NodeCacheStats
+  pool: RenderPoolStats
+  prefetch: PrefetchStats
+  encoders: list[EncoderStats] = Field(default_factory=list)
+  latency: list[LatencyStats] = Field(default_factory=list)
+
+
+class AssetHashStatus(BaseModel):
+  path: str
+  size: int
+  state: Literal["pending", "hashing", "done", "failed"]
+  bytesHashed: int
+  progress: float
+  hash: str | None = None
+  error: str | None = None
+  assetId: str | None = None
+  declaredHash: str | None = None
+  matches: bool | None = None
+
+
+class AssetProjectRequest(BaseModel):
+  project: ProjectPayload
+
+
+class ProxyLevelInfo(BaseModel):
+  factor: int
+  path: str
+  width: int
+  height: int
+
+
+class AssetProxyStatus(BaseModel):
+  path: str
+  state: Literal["pending", "building", "done", "failed"]
+  hash: str | None = None
+  levels: list[ProxyLevelInfo] = Field(default_factory=list)
+  error: str | None = None
+  assetId: str | None = None
+  proxyPath: str | None = None
+
+
+class AssetProxyResponse(BaseModel):
+  pending: int
+  building: int
+  done: int
+  failed: int
+  assets: list[AssetProxyStatus] = Field(default_factory=list)
+
+
+class AssetHashResponse(BaseModel):
+  pending: int
+  hashing: int
+  done: int
+  failed: int
+  bytesTotal: int
+  bytesHashed: int
+  assets: list[AssetHashStatus] = Field(default_factory=list)
+
+
+class GraphEvent(BaseModel):
+  sequence: int
+  event: str
+  payload: dict[str, Any] = Field(default_factory=dict)
+
+
+class SessionCreateRequest(BaseModel):
+  project: ProjectPayload
+
+
+class SessionInfoResponse(BaseModel):
+  sessionId: str
+  revision: int
+  summary: ProjectSummary
+
+
+class SessionPatchOperation(BaseModel):
+  op: Literal["setParam", "setInput", "addNode", "removeNode", "addEdge", "removeEdge"]
+  nodeId: str | None = None
+  key: str | None = None
+  value: Any = None
+  node: ProjectNode | None = None
+  edge: ProjectEdge | None = None
+
+
+class SessionPatchRequest(BaseModel):
+  operations: list[SessionPatchOperation] = Field(default_factory=list)
+  baseRevision: int | None = None
+
+
+class SessionPatchResponse(BaseModel):
+  sessionId: str
+  revision: int
+  invalidated: list[str]
+  events: list[GraphEvent]
+
+
+class SessionPreviewRequest(BaseModel):
+  forceProxy: bool | None = None
+  includeTimings: bool = False
+  frame: int | None = Field(default=None, ge=0)
+
+
+GraphObserver = Callable[[str, dict[str, Any]], None]
+RegionBox = tuple[int, int, int, int]
 
 
 class ProxyDecision(NamedTuple):
@@ -165,6 +476,64 @@ class ProxyDecision(NamedTuple):
   reason: str
   average_delay_ms: float | None
   target_delay_ms: float
+  p95_delay_ms: float | None = None
+  predicted_render_ms: float | None = None
+
+
+class RenderCostEstimate(NamedTuple):
+  graph_key: str
+  fixed_ms: float
+  node_ms: dict[str, float]
+  node_fixed_ms: float = 0.0
+
+  def predict(self, scale: float, node_ids: set[str] | None = None) -> float:
+    # Node costs are per full-resolution pixel, so they shrink with the proxy area.
+    # fixed_ms already holds node_fixed_ms for every node; nodes left out (cache hits) give theirs back.
+    if node_ids is None:
+      return self.fixed_ms + sum(self.node_ms.values()) * scale * scale
+    costs = [cost for node_id, cost in self.node_ms.items() if node_id in node_ids]
+    fixed = self.fixed_ms - self.node_fixed_ms * (len(self.node_ms) - len(costs))
+    return fixed + sum(costs) * scale * scale
+
+
+class PreviewPlan(NamedTuple):
+  source_width: int
+  source_height: int
+  proxy_decision: ProxyDecision
+  cost_estimate: RenderCostEstimate
+  viewport: RegionBox | None = None
+
+
+class RenderedPreview(NamedTuple):
+  image: Image.Image
+  source_width: int
+  source_height: int
+  proxy_decision: ProxyDecision
+  generated_at: str
+  render_ms: float | None = None
+  viewport: PreviewViewport | None = None
+  frame: int | None = None
+  hud: PreviewHud | None = None
+
+
+class EncodeSample(NamedTuple):
+  format: str
+  encode_ms: float
+  byte_count: int
+
+
+class EncodedPreview(NamedTuple):
+  data: bytes
+  media_type: str
+  width: int
+  height: int
+  source: PreviewSourceInfo
+  proxy: PreviewProxyInfo
+  generated_at: str
+  sample: EncodeSample
+  timings: RenderTimings | None = None
+  viewport: PreviewViewport | None = None
+  frame: int | None = None
 
 
 def parse_float(value: Any) -> float | None:
@@ -185,6 +554,310 @@ def parse_int(value: Any) -> int | None:
   return result
 
 
+def parse_frame_number(value: Any) -> int | None:
+  frame = parse_int(value)
+  return frame if frame is not None and frame >= 0 else None
+
+
+def estimate_image_bytes(image: Image.Image) -> int:
+  return max(image.width * image.height * len(image.getbands()), 1)
+
+
+class NodeResultCache:
+  def __init__(self, max_bytes: int) -> None:
+    self.max_bytes = max_bytes
+    self._entries: OrderedDict[str, tuple[Image.Image, int]] = OrderedDict()
+    self._bytes = 0
+    self._hits = 0
+    self._misses = 0
+    self._evictions = 0
+    self._lock = threading.Lock()
+
+  def get(self, key: str) -> Image.Image | None:
+    with self._lock:
+      entry = self._entries.get(key)
+      if entry is None:
+        self._misses += 1
+        return None
+      self._entries.move_to_end(key)
+      self._hits += 1
+      return entry[0]
+
+  def contains(self, key: str) -> bool:
+    with self._lock:
+      return key in self._entries
+
+  def put(self, key: str, image: Image.Image) -> None:
+    size = estimate_image_bytes(image)
+    with self._lock:
+      if size > self.max_bytes:
+        return
+      previous = self._entries.pop(key, None)
+      if previous is not None:
+        self._bytes -= previous[1]
+      self._entries[key] = (image, size)
+      self._bytes += size
+      while self._bytes > self.max_bytes and self._entries:
+        _, (_, evicted_size) = self._entries.popitem(last=False)
+        self._bytes -= evicted_size
+        self._evictions += 1
+
+  def clear(self) -> None:
+    with self._lock:
+      self._entries.clear()
+      self._bytes = 0
+      self._hits = 0
+      self._misses = 0
+      self._evictions = 0
+
+  def stats(self) -> NodeCacheStats:
+    with self._lock:
+      lookups = self._hits + self._misses
+      return NodeCacheStats(
+        entries=len(self._entries),
+        bytes=self._bytes,
+        maxBytes=self.max_bytes,
+        hits=self._hits,
+        misses=self._misses,
+        evictions=self._evictions,
+        hitRatio=(self._hits / lookups) if lookups else 0.0,
+      )
+
+
+NODE_RESULT_CACHE = NodeResultCache(NODE_CACHE_MAX_BYTES)
+COLOR_NODE_TYPES = {"ExposureAdjust", "ContrastAdjust", "SaturationAdjust"}
+# Rough Pillow throughput per output pixel; measured render times correct these per graph.
+NODE_COST_NS_PER_PIXEL = {
+  "MediaInput": 15.0,
+  "ExposureAdjust": 2.0,
+  "ContrastAdjust": 2.0,
+  "SaturationAdjust": 2.0,
+  "Resize": 10.0,
+  "Crop": 1.0,
+  "Blend": 4.0,
+  "PreviewDisplay": 0.5,
+}
+RESIZE_INPUT_COST_NS_PER_PIXEL = 20.0
+
+
+class RenderPoolBusyError(RuntimeError):
+  pass
+
+
+class RenderPool:
+  def __init__(self, mode: str, workers: int, max_pending: int) -> None:
+    self.mode = mode
+    self.workers = workers
+    self.max_pending = max_pending
+    self._executor: Executor | None = None
+    self._local_executor: ThreadPoolExecutor | None = None
+    self._futures: set[Future[Any]] = set()
+    self._completed = 0
+    self._rejected = 0
+    self._lock = threading.Lock()
+
+  def _get_executor(self, local: bool = False) -> Executor:
+    if local and self.mode == "process":
+      # Jobs holding callbacks or locks cannot be pickled, so they stay on threads in this process.
+      if self._local_executor is None:
+        self._local_executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="preview-stream")
+      return self._local_executor
+    if self._executor is None:
+      if self.mode == "process":
+        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+      else:
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="preview-render")
+    return self._executor
+
+  def _discard(self, future: Future[Any]) -> None:
+    with self._lock:
+      self._futures.discard(future)
+      self._completed += 1
+
+  def submit(self, fn: Any, *args: Any, local: bool = False) -> Future[Any]:
+    with self._lock:
+      if len(self._futures) >= self.max_pending:
+        self._rejected += 1
+        raise RenderPoolBusyError(f"render queue is full ({self.max_pending} pending)")
+      future = self._get_executor(local).submit(fn, *args)
+      self._futures.add(future)
+    future.add_done_callback(self._discard)
+    return future
+
+  async def run(self, fn: Any, *args: Any) -> Any:
+    return await asyncio.wrap_future(self.submit(fn, *args))
+
+  def busy(self) -> bool:
+    with self._lock:
+      return bool(self._futures)
+
+  async def run_local(self, fn: Any, *args: Any) -> Any:
+    return await asyncio.wrap_future(self.submit(fn, *args, local=True))
+
+  def stats(self) -> RenderPoolStats:
+    with self._lock:
+      in_flight = sum(1 for future in self._futures if future.running())
+      return RenderPoolStats(
+        mode=self.mode,
+        workers=self.workers,
+        maxPending=self.max_pending,
+        inFlight=in_flight,
+        queued=len(self._futures) - in_flight,
+        completed=self._completed,
+        rejected=self._rejected,
+      )
+
+
+RENDER_POOL = RenderPool(RENDER_POOL_MODE, RENDER_POOL_WORKERS, RENDER_POOL_MAX_PENDING)
+# Encoders release the GIL, so batch outputs are encoded side by side inside a render job.
+ENCODE_EXECUTOR = ThreadPoolExecutor(max_workers=RENDER_POOL_WORKERS, thread_name_prefix="nodevision-encode")
+# Shared by all renders; node tasks never wait on each other, so nested use cannot deadlock.
+GRAPH_EXECUTOR = ThreadPoolExecutor(max_workers=GRAPH_WORKERS, thread_name_prefix="nodevision-graph")
+JOURNAL_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="nodevision-journal")
+
+
+class EncoderStatsTracker:
+  def __init__(self) -> None:
+    self._samples: dict[str, list[float]] = {}
+    self._lock = threading.Lock()
+
+  def record(self, sample: EncodeSample) -> None:
+    with self._lock:
+      entry = self._samples.setdefault(sample.format, [0, 0.0, 0.0, 0, 0])
+      entry[0] += 1
+      entry[1] += sample.encode_ms
+      entry[2] = sample.encode_ms
+      entry[3] = sample.byte_count
+      entry[4] += sample.byte_count
+
+  def stats(self) -> list[EncoderStats]:
+    with self._lock:
+      return [
+        EncoderStats(
+          format=name,
+          count=int(count),
+          averageEncodeMs=total_ms / count,
+          lastEncodeMs=last_ms,
+          averageBytes=total_bytes / count,
+          lastBytes=int(last_bytes),
+          totalBytes=int(total_bytes),
+        )
+        for name, (count, total_ms, last_ms, last_bytes, total_bytes) in sorted(self._samples.items())
+      ]
+
+
+ENCODER_STATS = EncoderStatsTracker()
+
+
+class RenderTimings:
+  def __init__(self) -> None:
+    self.stages: dict[str, float] = {}
+    self.node_samples: list[tuple[str, float]] = []
+    self.node_ids: dict[str, float] = {}
+    # (graph key, predicted ms, actual ms); applied by the API process, since process-pool workers have their own model.
+    self.cost_samples: list[tuple[str, float, float]] = []
+
+  def add_stage(self, name: str, elapsed_ms: float) -> None:
+    self.stages[name] = self.stages.get(name, 0.0) + elapsed_ms
+
+  def add_node(self, node_type: str, elapsed_ms: float, node_id: str | None = None) -> None:
+    self.node_samples.append((node_type, elapsed_ms))
+    if node_id is not None:
+      self.node_ids[node_id] = self.node_ids.get(node_id, 0.0) + elapsed_ms
+
+  def node_totals(self) -> dict[str, float]:
+    totals: dict[str, float] = {}
+    for node_type, elapsed_ms in self.node_samples:
+      totals[node_type] = totals.get(node_type, 0.0) + elapsed_ms
+    return totals
+
+  def to_model(self) -> PreviewTimings:
+    return PreviewTimings(
+      totalMs=round(sum(self.stages.values()), 3),
+      stages={name: round(value, 3) for name, value in self.stages.items()},
+      nodes={name: round(value, 3) for name, value in self.node_totals().items()},
+    )
+
+  def server_timing(self) -> str:
+    entries = [f"{name};dur={value:.2f}" for name, value in self.stages.items()]
+    entries.extend(f"node.{name};dur={value:.2f}" for name, value in self.node_totals().items())
+    entries.append(f"total;dur={sum(self.stages.values()):.2f}")
+    return ", ".join(entries)
+
+
+class TimingHistogram:
+  def __init__(self, name: str, label: str, help_text: str, buckets: tuple[float, ...]) -> None:
+    self.name = name
+    self.label = label
+    self.help_text = help_text
+    self.buckets = buckets
+    self._series: dict[str, list[float]] = {}
+
+  def observe(self, label_value: str, elapsed_sec: float) -> None:
+    series = self._series.get(label_value)
+    if series is None:
+      series = self._series[label_value] = [0.0] * (len(self.buckets) + 2)
+    for index, bound in enumerate(self.buckets):
+      if elapsed_sec <= bound:
+        series[index] += 1
+    series[-2] += elapsed_sec
+    series[-1] += 1
+
+  def render(self) -> list[str]:
+    lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+    for label_value, series in sorted(self._series.items()):
+      labels = f'{self.label}="{label_value}"'
+      for index, bound in enumerate(self.buckets):
+        lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {int(series[index])}')
+      lines.append(f'{self.name}_bucket{{{labels},le="+Inf"}} {int(series[-1])}')
+      lines.append(f"{self.name}_sum{{{labels}}} {series[-2]:.6f}")
+      lines.append(f"{self.name}_count{{{labels}}} {int(series[-1])}")
+    return lines
+
+
+class PreviewMetrics:
+  def __init__(self, buckets: tuple[float, ...]) -> None:
+    self.stages = TimingHistogram("nodevision_preview_stage_seconds", "stage", "Preview render time per stage.", buckets)
+    self.nodes = TimingHistogram("nodevision_node_seconds", "node_type", "Node evaluation time per node type.", buckets)
+    self._lock = threading.Lock()
+
+  def observe(self, timings: RenderTimings | None) -> None:
+    if timings is None:
+      return
+    with self._lock:
+      for name, elapsed_ms in timings.stages.items():
+        self.stages.observe(name, elapsed_ms / 1000.0)
+      self.stages.observe("total", sum(timings.stages.values()) / 1000.0)
+      for node_type, elapsed_ms in timings.node_samples:
+        self.nodes.observe(node_type, elapsed_ms / 1000.0)
+
+  def render(self) -> list[str]:
+    with self._lock:
+      return self.stages.render() + self.nodes.render()
+
+
+PREVIEW_METRICS = PreviewMetrics(METRICS_BUCKETS_SEC)
+PREVIEW_MEDIA_TYPES = {"png": "image/png", "jpeg": "image/jpeg", "webp": "image/webp"}
+
+
+def normalize_cache_value(value: Any) -> Any:
+  if isinstance(value, bool) or value is None or isinstance(value, str):
+    return value
+  if isinstance(value, (int, float)):
+    parsed = parse_float(value)
+    return parsed if parsed is not None else str(value)
+  if isinstance(value, dict):
+    return {str(key): normalize_cache_value(item) for key, item in sorted(value.items(), key=lambda kv: str(kv[0]))}
+  if isinstance(value, (list, tuple)):
+    return [normalize_cache_value(item) for item in value]
+  return str(value)
+
+
+def compute_signature(payload: dict[str, Any]) -> str:
+  encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+  return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
 def clamp_scale(value: Any, default: float = 0.5) -> float:
   parsed = parse_float(value)
   if parsed is None:
@@ -200,39 +873,158 @@ def compute_latency_target(width: int, height: int) -> float:
   return 150.0
 
 
-def compute_preview_latency_average(width: int, height: int) -> float | None:
-  if not BENCH_LOG_PATH.exists():
-    return None
+class PreviewLatencyTracker:
+  def __init__(self, log_path: Path, window: int) -> None:
+    self.log_path = log_path
+    self.window = window
+    self._samples: dict[str, deque[float]] = {}
+    self._summaries: dict[str, LatencyStats] = {}
+    self._offset = 0
+    self._inode: int | None = None
+    self._partial = b""
+    self._lock = threading.Lock()
 
-  target_profile = f"{width}x{height}"
-  delays: list[float] = []
+  def record(self, profile: str, delay_ms: float) -> LatencyStats:
+    base_profile = profile.split("_", 1)[0]
+    with self._lock:
+      samples = self._samples.get(base_profile)
+      if samples is None:
+        samples = self._samples[base_profile] = deque(maxlen=self.window)
+      samples.append(delay_ms)
+      self._summaries.pop(base_profile, None)
+      return self._summarize(base_profile)  # type: ignore[return-value]
 
-  try:
-    with BENCH_LOG_PATH.open("r", encoding="utf-8") as fh:
-      for raw_line in fh:
-        line = raw_line.strip()
-        if not line:
-          continue
-        parts = line.split(",")
-        if len(parts) != 3:
-          continue
-        tag, profile, value = parts
-        if tag != "PREVIEW_DELAY":
-          continue
-        base_profile = profile.split("_", 1)[0]
-        if base_profile != target_profile:
-          continue
-        parsed = parse_float(value)
-        if parsed is None:
-          continue
-        delays.append(parsed)
-  except OSError:
-    return None
+  def _follow_log(self) -> None:
+    try:
+      log_stat = self.log_path.stat()
+    except OSError:
+      return
+    with self._lock:
+      if self._inode != log_stat.st_ino or log_stat.st_size < self._offset:
+        self._inode = log_stat.st_ino
+        self._offset = 0
+        self._partial = b""
+      if log_stat.st_size == self._offset:
+        return
+      try:
+        with self.log_path.open("rb") as fh:
+          fh.seek(self._offset)
+          chunk = fh.read()
+      except OSError:
+        return
+      self._offset += len(chunk)
+      lines = (self._partial + chunk).split(b"\n")
+      self._partial = lines.pop()
+    for raw_line in lines:
+      line = raw_line.decode("utf-8", errors="replace").strip()
+      parts = line.split(",")
+      if len(parts) != 3:
+        continue
+      tag, profile, value = parts
+      if tag != "PREVIEW_DELAY":
+        continue
+      parsed = parse_float(value)
+      if parsed is None:
+        continue
+      self.record(profile, parsed)
 
-  if not delays:
-    return None
+  def _summarize(self, profile: str) -> LatencyStats | None:
+    summary = self._summaries.get(profile)
+    if summary is not None:
+      return summary
+    samples = self._samples.get(profile)
+    if not samples:
+      return None
+    ordered = sorted(samples)
+
+    def percentile(fraction: float) -> float:
+      return ordered[min(int(math.ceil(fraction * len(ordered))) - 1, len(ordered) - 1)]
+
+    summary = LatencyStats(
+      profile=profile,
+      count=len(ordered),
+      meanMs=sum(ordered) / len(ordered),
+      p50Ms=percentile(0.5),
+      p95Ms=percentile(0.95),
+    )
+    self._summaries[profile] = summary
+    return summary
+
+  def stats_for(self, width: int, height: int) -> LatencyStats | None:
+    self._follow_log()
+    with self._lock:
+      return self._summarize(f"{width}x{height}")
+
+  def snapshot(self) -> list[LatencyStats]:
+    self._follow_log()
+    with self._lock:
+      return [summary for profile in sorted(self._samples) if (summary := self._summarize(profile)) is not None]
+
+
+LATENCY_TRACKER = PreviewLatencyTracker(BENCH_LOG_PATH, LATENCY_WINDOW_SIZE)
+
+
+class RenderCostModel:
+  def __init__(self, max_graphs: int, smoothing: float) -> None:
+    self.max_graphs = max_graphs
+    self.smoothing = smoothing
+    self._corrections: OrderedDict[str, float] = OrderedDict()
+    self._global_correction: float | None = None
+    self._lock = threading.Lock()
+
+  def correction_for(self, graph_key: str) -> float:
+    with self._lock:
+      correction = self._corrections.get(graph_key)
+      if correction is not None:
+        self._corrections.move_to_end(graph_key)
+        return correction
+      return self._global_correction if self._global_correction is not None else 1.0
 
-  return sum(delays) / len(delays)
+  def predict(self, estimate: RenderCostEstimate, scale: float) -> float:
+    return estimate.predict(scale) * self.correction_for(estimate.graph_key)
+
+  def observe(self, graph_key: str, predicted_ms: float, actual_ms: float) -> None:
+    if predicted_ms <= 0.0:
+      return
+    ratio = min(max(actual_ms / predicted_ms, 0.1), 10.0)
+    with self._lock:
+      previous = self._corrections.pop(graph_key, None)
+      self._corrections[graph_key] = ratio if previous is None else previous + self.smoothing * (ratio - previous)
+      while len(self._corrections) > self.max_graphs:
+        self._corrections.popitem(last=False)
+      if self._global_correction is None:
+        self._global_correction = ratio
+      else:
+        self._global_correction += self.smoothing * (ratio - self._global_correction)
+
+  def clear(self) -> None:
+    with self._lock:
+      self._corrections.clear()
+      self._global_correction = None
+
+
+RENDER_COST_MODEL = RenderCostModel(COST_MODEL_MAX_GRAPHS, COST_MODEL_SMOOTHING)
+
+
+def observe_render_timings(timings: RenderTimings) -> None:
+  PREVIEW_METRICS.observe(timings)
+  for graph_key, predicted_ms, actual_ms in timings.cost_samples:
+    RENDER_COST_MODEL.observe(graph_key, predicted_ms, actual_ms)
+
+
+def choose_proxy_scale(estimate: RenderCostEstimate, budget_ms: float, max_scale: float = 1.0) -> tuple[float, float]:
+  correction = RENDER_COST_MODEL.correction_for(estimate.graph_key)
+  full_ms = estimate.predict(1.0) * correction
+  if full_ms <= budget_ms:
+    return 1.0, full_ms
+  fixed_ms = estimate.fixed_ms * correction
+  variable_ms = full_ms - fixed_ms
+  # When the unscaled overhead alone misses the budget no scale can meet it, so only the pixel work is held to it.
+  headroom = budget_ms - fixed_ms if budget_ms > fixed_ms else budget_ms
+  scale = math.sqrt(headroom / variable_ms) if variable_ms > 0.0 else 1.0
+  scale = max(math.floor(scale / PROXY_SCALE_STEP) * PROXY_SCALE_STEP, PROXY_SCALE_STEP)
+  scale = min(scale, max_scale, 1.0)
+  return scale, estimate.predict(scale) * correction
 
 
 def compute_proxy_decision(
@@ -240,6 +1032,7 @@ def compute_proxy_decision(
   width: int,
   height: int,
   force_proxy: bool | None,
+  cost_estimate: RenderCostEstimate,
 ) -> ProxyDecision:
   target_delay = compute_latency_target(width, height)
   metadata = project.metadata or {}
@@ -264,280 +1057,1883 @@ def compute_proxy_decision(
 
   width = max(width, 1)
   height = max(height, 1)
+  latency = LATENCY_TRACKER.stats_for(width, height)
+  average_delay = latency.meanMs if latency is not None else None
+  p95_delay = latency.p95Ms if latency is not None else None
+  # Only a scale the project chose explicitly caps the model; otherwise it may pick anything up to full size.
+  scale_cap = clamp_scale(proxy_metadata.get("scale"), 1.0)
+  scale, predicted_ms = choose_proxy_scale(cost_estimate, target_delay * PROXY_RENDER_BUDGET_RATIO, scale_cap)
+  reason = "cost_model"
+  if scale >= 1.0 and p95_delay is not None and p95_delay > target_delay:
+    # Measured previews at this size miss the target even though the model fits, so the measurement wins.
+    scale, reason = default_scale, "historical_delay"
+    predicted_ms = RENDER_COST_MODEL.predict(cost_estimate, scale)
+  return ProxyDecision(scale < 1.0, scale, reason, average_delay, target_delay, p95_delay, predicted_ms)
 
-  if width >= 3840 or height >= 2160:
-    return ProxyDecision(True, min(default_scale, 0.5), "resolution_4k", None, target_delay)
-  if width >= 2560 or height >= 1440:
-    return ProxyDecision(True, min(default_scale, 0.5), "resolution_qhd", None, target_delay)
 
-  average_delay = compute_preview_latency_average(width, height)
-  if average_delay is not None and average_delay > target_delay:
-    return ProxyDecision(True, min(default_scale, 0.5), "historical_delay", average_delay, target_delay)
+class AssetIndex:
+  def __init__(self, assets: list[ProjectAsset]) -> None:
+    self.by_id: dict[str, ProjectAsset] = {asset.id: asset for asset in assets}
+    self.by_path: dict[str, ProjectAsset] = {}
+    for asset in assets:
+      self.by_path.setdefault(asset.path, asset)
+    self._candidates: dict[tuple[str | None, str | None], list[Path]] = {}
 
-  return ProxyDecision(False, 1.0, "auto", average_delay, target_delay)
+  def find_asset(self, media_path: str | None, asset_id: str | None) -> ProjectAsset | None:
+    asset = self.by_id.get(asset_id) if asset_id is not None else None
+    if asset is None and media_path is not None:
+      asset = self.by_path.get(media_path)
+    return asset
 
+  def candidates_for(self, media_node: ProjectNode) -> list[Path]:
+    params = media_node.params or {}
+    media_path = params.get("path") if isinstance(params.get("path"), str) else None
+    asset_id = params.get("assetId") if isinstance(params.get("assetId"), str) else None
+    key = (media_path, asset_id)
+    cached = self._candidates.get(key)
+    if cached is None:
+      cached = resolve_media_candidates(media_path, self.find_asset(media_path, asset_id))
+      self._candidates[key] = cached
+    return cached
 
-def load_media_image(
-  project: ProjectPayload,
-  media_node: ProjectNode,
-  asset_map: dict[str, ProjectAsset],
-) -> Image.Image:
-  params = media_node.params or {}
-  candidate_strings: list[str] = []
-  media_path = params.get("path")
-  if isinstance(media_path, str) and media_path:
-    candidate_strings.append(media_path)
 
-  asset: ProjectAsset | None = None
-  asset_id = params.get("assetId")
-  if isinstance(asset_id, str):
-    asset = asset_map.get(asset_id)
+class MediaPathIndex:
+  def __init__(self, missing_ttl: float) -> None:
+    self.missing_ttl = missing_ttl
+    self._missing: dict[Path, float] = {}
+    self._lock = threading.Lock()
 
-  if asset is None and isinstance(media_path, str):
-    for candidate_asset in asset_map.values():
-      if candidate_asset.path == media_path:
-        asset = candidate_asset
-        break
+  def stat_file(self, path: Path) -> os.stat_result | None:
+    now = time.monotonic()
+    with self._lock:
+      expires_at = self._missing.get(path)
+    if expires_at is not None and expires_at > now:
+      return None
+    try:
+      result = path.stat()
+    except OSError:
+      result = None
+    with self._lock:
+      if result is None or not stat.S_ISREG(result.st_mode):
+        self._missing[path] = now + self.missing_ttl
+        return None
+      self._missing.pop(path, None)
+    return result
 
-  if asset is not None:
-    if isinstance(asset.path, str):
-      candidate_strings.append(asset.path)
-    if isinstance(asset.proxyPath, str):
-      candidate_strings.append(asset.proxyPath)
 
-  candidates: list[Path] = []
-  for candidate in candidate_strings:
-    item = Path(candidate)
-    if item not in candidates:
-      candidates.append(item)
-    cwd_candidate = Path.cwd() / candidate
-    if cwd_candidate not in candidates:
-      candidates.append(cwd_candidate)
-    project_candidate = PROJECT_ROOT / candidate
-    if project_candidate not in candidates:
-      candidates.append(project_candidate)
+MEDIA_PATH_INDEX = MediaPathIndex(MEDIA_MISSING_TTL_SEC)
+DECODED_MEDIA_CACHE = NodeResultCache(MEDIA_CACHE_MAX_BYTES)
+DECODED_FRAME_CACHE = NodeResultCache(FRAME_CACHE_MAX_BYTES)
 
-  image: Image.Image | None = None
-  for candidate in candidates:
-    if not candidate.exists() or not candidate.is_file():
-      continue
-    try:
-      with Image.open(candidate) as loaded:
-        image = loaded.convert("RGB")
-      break
-    except OSError:
-      continue
-  if image is None:
-    fallback_width, fallback_height = extract_resolution(project)
-    width = max(int(params.get("placeholderWidth") or fallback_width), 64)
-    height = max(int(params.get("placeholderHeight") or fallback_height), 64)
-    image = Image.new("RGB", (width, height))
-    draw = ImageDraw.Draw(image)
-    for y in range(height):
-      ratio = y / max(height - 1, 1)
-      r = int(48 + 96 * ratio)
-      g = int(80 + 100 * (1 - ratio))
-      b = int(120 + 50 * math.sin(ratio * math.pi))
-      draw.line((0, y, width, y), fill=(r, g, b))
-    placeholder_font = ImageFont.load_default()
-    label = media_node.displayName or params.get("path") or params.get("assetId") or "Media Placeholder"
-    draw.rectangle((0, 0, width, 36), fill=(20, 26, 46, 192))
-    draw.text((12, 12), str(label), fill="#f5f7ff", font=placeholder_font)
-  return image
 
+def hash_file_contents(path: Path, progress: Callable[[int], None] | None = None) -> str:
+  digest = hashlib.sha256()
+  with path.open("rb") as fh:
+    size = os.fstat(fh.fileno()).st_size
+    if size > 0:
+      with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        view = memoryview(mapped)
+        try:
+          for offset in range(0, size, ASSET_HASH_CHUNK_BYTES):
+            # hashlib releases the GIL for large buffers, so renders keep running meanwhile.
+            digest.update(view[offset:offset + ASSET_HASH_CHUNK_BYTES])
+            if progress is not None:
+              progress(min(offset + ASSET_HASH_CHUNK_BYTES, size))
+        finally:
+          view.release()
+  return f"sha256:{digest.hexdigest()}"
 
-def extract_resolution(project: ProjectPayload) -> tuple[int, int]:
-  width = 1920
-  height = 1080
-  if project.projectResolution and isinstance(project.projectResolution, dict):
-    width = int(project.projectResolution.get("width") or width)
-    height = int(project.projectResolution.get("height") or height)
-  return max(width, 1), max(height, 1)
 
+class AssetHashJob:
+  def __init__(self, path: Path, file_stat: os.stat_result) -> None:
+    self.path = path
+    self.size = file_stat.st_size
+    self.state = "pending"
+    self.bytes_hashed = 0
+    self.hash: str | None = None
+    self.error: str | None = None
+    self.future: Future | None = None
 
-def is_proxy_forced(project: ProjectPayload) -> bool | None:
-  metadata = project.metadata or {}
-  if isinstance(metadata, dict):
-    preview_proxy = metadata.get("previewProxy")
-    if isinstance(preview_proxy, dict) and "enabled" in preview_proxy:
-      value = preview_proxy.get("enabled")
-      if isinstance(value, bool):
-        return value
-  return None
+  def to_model(self) -> AssetHashStatus:
+    return AssetHashStatus(
+      path=str(self.path),
+      size=self.size,
+      state=self.state,
+      bytesHashed=self.bytes_hashed,
+      progress=round(self.bytes_hashed / self.size, 4) if self.size else float(self.state == "done"),
+      hash=self.hash,
+      error=self.error,
+    )
 
 
-def build_image_from_graph(project: ProjectPayload) -> Image.Image:
-  node_map: dict[str, ProjectNode] = {node.id: node for node in project.nodes}
-  asset_map: dict[str, ProjectAsset] = {asset.id: asset for asset in project.assets}
-  image_cache: dict[str, Image.Image] = {}
-
-  def resolve_single_input(node: ProjectNode) -> str | None:
-    inputs = node.inputs or {}
-    priority_keys = ["primary", "video", "image", "input"]
-    for key in priority_keys:
-      target = inputs.get(key)
-      if isinstance(target, str):
-        return target.split(":", 1)[0]
-    for target in inputs.values():
-      if isinstance(target, str):
-        return target.split(":", 1)[0]
-    return None
+class AssetHashService:
+  # Content hashes keyed by (path, size, mtime); lookups never block, misses are hashed on the pool.
+  def __init__(self, workers: int, max_entries: int) -> None:
+    self.max_entries = max_entries
+    self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="nodevision-hash")
+    self._jobs: OrderedDict[tuple[str, int, int], AssetHashJob] = OrderedDict()
+    self._lock = threading.Lock()
 
-  def resolve_named_input(node: ProjectNode, key: str) -> str | None:
-    inputs = node.inputs or {}
-    target = inputs.get(key)
-    if isinstance(target, str):
-      return target.split(":", 1)[0]
-    return None
+  @staticmethod
+  def key_of(path: Path, file_stat: os.stat_result) -> tuple[str, int, int]:
+    return str(path.absolute()), file_stat.st_size, file_stat.st_mtime_ns
 
-  def resolve_input_image(node: ProjectNode, key: str) -> Image.Image | None:
-    target_id = resolve_named_input(node, key)
-    return resolve_node(target_id) if target_id else None
+  def lookup(self, path: Path, file_stat: os.stat_result) -> str | None:
+    with self._lock:
+      job = self._jobs.get(self.key_of(path, file_stat))
+    return job.hash if job is not None else None
 
-  def resolve_node(node_id: str) -> Image.Image | None:
-    if node_id in image_cache:
-      return image_cache[node_id]
-    node = node_map.get(node_id)
-    if node is None:
-      return None
-    base_image: Image.Image | None = None
-    if node.type == "MediaInput":
-      base_image = load_media_image(project, node, asset_map)
-    elif node.type in {"ExposureAdjust", "ContrastAdjust", "SaturationAdjust"}:
-      parent = resolve_single_input(node)
+  def request(self, path: Path, file_stat: os.stat_result) -> AssetHashJob:
+    key = self.key_of(path, file_stat)
+    with self._lock:
+      job = self._jobs.get(key)
+      if job is not None and job.state != "failed":
+        self._jobs.move_to_end(key)
+        return job
+      job = self._jobs[key] = AssetHashJob(path.absolute(), file_stat)
+      job.future = self._executor.submit(self.run, job)
+      self.evict()
+    return job
+
+  def ensure(self, path: Path, file_stat: os.stat_result) -> str | None:
+    # Blocking variant for background jobs that need the hash before they can start.
+    job = self.request(path, file_stat)
+    if job.future is not None:
+      job.future.result()
+    return job.hash
+
+  def evict(self) -> None:
+    finished = [key for key, job in self._jobs.items() if job.state in ("done", "failed")]
+    for key in finished[:max(len(self._jobs) - self.max_entries, 0)]:
+      del self._jobs[key]
+
+  def run(self, job: AssetHashJob) -> None:
+    job.state = "hashing"
+
+    def report(bytes_hashed: int) -> None:
+      job.bytes_hashed = bytes_hashed
+
+    try:
+      digest = hash_file_contents(job.path, report)
+    except (OSError, ValueError) as error:
+      job.state, job.error = "failed", str(error)
+      return
+    job.hash, job.bytes_hashed, job.state = digest, job.size, "done"
+
+  def jobs(self) -> list[AssetHashJob]:
+    with self._lock:
+      return list(self._jobs.values())
+
+  def clear(self) -> None:
+    with self._lock:
+      self._jobs.clear()
+
+
+ASSET_HASHER = AssetHashService(ASSET_HASH_WORKERS, ASSET_HASH_MAX_ENTRIES)
+
+
+class ProxyPyramid(NamedTuple):
+  source_size: tuple[int, int]
+  levels: dict[int, tuple[Path, tuple[int, int]]]
+
+
+class ProxyPyramidJob:
+  def __init__(self, path: Path) -> None:
+    self.path = path
+    self.state = "pending"
+    self.content_hash: str | None = None
+    self.pyramid: ProxyPyramid | None = None
+    self.error: str | None = None
+    self.future: Future | None = None
+
+  def proxy_path(self) -> str | None:
+    # The finest level is what gets recorded as the asset's proxyPath.
+    levels = self.pyramid.levels if self.pyramid is not None else {}
+    return str(levels[min(levels)][0]) if levels else None
+
+  def to_model(self) -> AssetProxyStatus:
+    levels = self.pyramid.levels if self.pyramid is not None else {}
+    return AssetProxyStatus(
+      path=str(self.path),
+      state=self.state,
+      hash=self.content_hash,
+      levels=[
+        ProxyLevelInfo(factor=factor, path=str(path), width=size[0], height=size[1])
+        for factor, (path, size) in sorted(levels.items())
+      ],
+      error=self.error,
+      proxyPath=self.proxy_path(),
+    )
+
+
+class ProxyPyramidService:
+  # Downscaled copies (1/2, 1/4, 1/8) stored under the source's content hash, so identical files share one pyramid.
+  def __init__(self, cache_dir: Path, factors: tuple[int, ...], workers: int, max_entries: int) -> None:
+    self.cache_dir = cache_dir
+    self.factors = factors
+    self.max_entries = max_entries
+    self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="nodevision-proxy")
+    self._jobs: OrderedDict[tuple[str, int, int], ProxyPyramidJob] = OrderedDict()
+    self._pyramids: OrderedDict[str, ProxyPyramid] = OrderedDict()
+    self._failures: OrderedDict[str, str] = OrderedDict()
+    self._lock = threading.Lock()
+
+  def directory_for(self, content_hash: str) -> Path:
+    digest = content_hash.split(":", 1)[-1]
+    return self.cache_dir / digest[:2] / digest
+
+  def find(self, content_hash: str) -> ProxyPyramid | None:
+    with self._lock:
+      pyramid = self._pyramids.get(content_hash)
+      if pyramid is not None:
+        self._pyramids.move_to_end(content_hash)
+    if pyramid is not None:
+      return pyramid
+    # Misses are not remembered: another worker process may finish the same pyramid at any time.
+    directory = self.directory_for(content_hash)
+    try:
+      manifest = json.loads((directory / "manifest.json").read_text(encoding="utf-8"))
+      pyramid = ProxyPyramid(
+        tuple(manifest["source"]),
+        {int(level["factor"]): (directory / level["file"], tuple(level["size"])) for level in manifest["levels"]},
+      )
+    except (OSError, ValueError, KeyError, TypeError):
+      return None
+    self.remember(content_hash, pyramid)
+    return pyramid
+
+  def remember(self, content_hash: str, pyramid: ProxyPyramid) -> None:
+    # Manifests stay on disk, so a forgotten pyramid is only re-read, never rebuilt.
+    with self._lock:
+      self._pyramids[content_hash] = pyramid
+      self._pyramids.move_to_end(content_hash)
+      while len(self._pyramids) > self.max_entries:
+        self._pyramids.popitem(last=False)
+
+  def remember_failure(self, content_hash: str, error: str) -> None:
+    # Sources that cannot be proxied (videos, undecodable files) fail once per content, not once per save.
+    with self._lock:
+      self._failures[content_hash] = error
+      self._failures.move_to_end(content_hash)
+      while len(self._failures) > self.max_entries:
+        self._failures.popitem(last=False)
+
+  def failure_for(self, content_hash: str) -> str | None:
+    with self._lock:
+      return self._failures.get(content_hash)
+
+  def request(self, path: Path, file_stat: os.stat_result) -> ProxyPyramidJob:
+    key = AssetHashService.key_of(path, file_stat)
+    with self._lock:
+      job = self._jobs.get(key)
+      # Failed hashing is retried; a failed build stays failed until the file changes.
+      if job is not None and (job.state != "failed" or job.content_hash in self._failures):
+        self._jobs.move_to_end(key)
+        return job
+      job = self._jobs[key] = ProxyPyramidJob(path.absolute())
+      job.future = self._executor.submit(self.run, job, file_stat)
+      self.evict()
+    return job
+
+  def evict(self) -> None:
+    finished = [key for key, job in self._jobs.items() if job.state in ("done", "failed")]
+    for key in finished[:max(len(self._jobs) - self.max_entries, 0)]:
+      del self._jobs[key]
+
+  def run(self, job: ProxyPyramidJob, file_stat: os.stat_result) -> None:
+    job.state = "building"
+    try:
+      job.content_hash = ASSET_HASHER.ensure(job.path, file_stat)
+      if job.content_hash is None:
+        raise OSError(f"ハッシュを計算できません: {job.path}")
+      failure = self.failure_for(job.content_hash)
+      if failure is not None:
+        job.state, job.error = "failed", failure
+        return
+      job.pyramid = self.find(job.content_hash) or self.build(job.path, job.content_hash)
+    except (OSError, ValueError) as error:
+      job.state, job.error = "failed", str(error)
+      if job.content_hash is not None:
+        self.remember_failure(job.content_hash, job.error)
+      return
+    job.state = "done"
+
+  def build(self, path: Path, content_hash: str) -> ProxyPyramid:
+    directory = self.directory_for(content_hash)
+    directory.mkdir(parents=True, exist_ok=True)
+    levels: dict[int, tuple[Path, tuple[int, int]]] = {}
+    with Image.open(path) as loaded:
+      image = loaded.convert("RGB")
+    source_size = image.size
+    previous_factor = 1
+    for factor in self.factors:
+      image = image.reduce(factor // previous_factor)
+      previous_factor = factor
+      if min(image.size) < PROXY_PYRAMID_MIN_EDGE:
+        break
+      level_path = directory / f"{factor}.jpg"
+      buffer = BytesIO()
+      image.save(buffer, "JPEG", quality=PROXY_PYRAMID_QUALITY)
+      write_bytes_atomic(level_path, buffer.getvalue())
+      levels[factor] = (level_path, image.size)
+    manifest = {
+      "source": list(source_size),
+      "levels": [
+        {"factor": factor, "file": level_path.name, "size": list(size)}
+        for factor, (level_path, size) in levels.items()
+      ],
+    }
+    # The manifest goes last; a pyramid without one is treated as missing and rebuilt.
+    write_bytes_atomic(directory / "manifest.json", json.dumps(manifest).encode("utf-8"))
+    pyramid = ProxyPyramid(source_size, levels)
+    self.remember(content_hash, pyramid)
+    return pyramid
+
+  def level_for(self, path: Path, file_stat: os.stat_result, scale: float) -> tuple[Path, os.stat_result, int, tuple[int, int]] | None:
+    # Smallest level that still has at least the requested resolution; never blocks on hashing or building.
+    if scale >= 1.0:
+      return None
+    content_hash = ASSET_HASHER.lookup(path, file_stat)
+    pyramid = self.find(content_hash) if content_hash is not None else None
+    if pyramid is None:
+      return None
+    usable = [factor for factor in pyramid.levels if factor * scale <= 1.0 + 1e-9]
+    if not usable:
+      return None
+    factor = max(usable)
+    level_path = pyramid.levels[factor][0]
+    level_stat = MEDIA_PATH_INDEX.stat_file(level_path)
+    if level_stat is None:
+      return None
+    return level_path, level_stat, factor, pyramid.source_size
+
+  def jobs(self) -> list[ProxyPyramidJob]:
+    with self._lock:
+      return list(self._jobs.values())
+
+  def clear(self) -> None:
+    with self._lock:
+      self._jobs.clear()
+      self._pyramids.clear()
+      self._failures.clear()
+
+
+PROXY_PYRAMIDS = ProxyPyramidService(PROXY_CACHE_DIR, PROXY_PYRAMID_FACTORS, PROXY_PYRAMID_WORKERS, PROXY_PYRAMID_MAX_ENTRIES)
+
+
+def locate_asset_file(asset: ProjectAsset) -> tuple[Path, os.stat_result] | None:
+  for path in resolve_media_candidates(asset.path, None):
+    file_stat = MEDIA_PATH_INDEX.stat_file(path)
+    if file_stat is not None:
+      return path, file_stat
+  return None
+
+
+def schedule_asset_proxies(project: ProjectPayload) -> list[AssetProxyStatus]:
+  statuses: list[AssetProxyStatus] = []
+  for asset in project.assets:
+    located = locate_asset_file(asset)
+    if located is None:
+      status = AssetProxyStatus(path=asset.path, state="failed", error="ファイルが見つかりません。")
+    else:
+      job = PROXY_PYRAMIDS.request(*located)
+      if job.future is not None:
+        # Runs at once for finished jobs, so a load already answers with the recorded proxyPath.
+        job.future.add_done_callback(lambda _, asset=asset, job=job: record_asset_proxy(asset, job))
+      status = job.to_model()
+    status.assetId = asset.id
+    statuses.append(status)
+  return statuses
+
+
+def record_asset_proxy(asset: ProjectAsset, job: ProxyPyramidJob) -> None:
+  proxy_path = job.proxy_path()
+  if proxy_path is not None:
+    asset.proxyPath = proxy_path
+
+
+def build_asset_proxy_response(statuses: list[AssetProxyStatus]) -> AssetProxyResponse:
+  counts = {state: 0 for state in ("pending", "building", "done", "failed")}
+  for status in statuses:
+    counts[status.state] += 1
+  return AssetProxyResponse(**counts, assets=statuses)
+
+
+def schedule_asset_hashing(project: ProjectPayload) -> list[AssetHashStatus]:
+  statuses: list[AssetHashStatus] = []
+  for asset in project.assets:
+    located = locate_asset_file(asset)
+    if located is None:
+      status = AssetHashStatus(path=asset.path, size=0, state="failed", bytesHashed=0, progress=0.0, error="ファイルが見つかりません。")
+    else:
+      status = ASSET_HASHER.request(*located).to_model()
+    status.assetId = asset.id
+    status.declaredHash = asset.hash
+    status.matches = status.hash == asset.hash if status.hash is not None else None
+    statuses.append(status)
+  return statuses
+
+
+def schedule_asset_jobs(project: ProjectPayload) -> None:
+  # Stats every asset file, so endpoints call this through asyncio.to_thread.
+  schedule_asset_hashing(project)
+  schedule_asset_proxies(project)
+
+
+def build_asset_hash_response(statuses: list[AssetHashStatus]) -> AssetHashResponse:
+  counts = {state: 0 for state in ("pending", "hashing", "done", "failed")}
+  for status in statuses:
+    counts[status.state] += 1
+  return AssetHashResponse(
+    **counts,
+    bytesTotal=sum(status.size for status in statuses),
+    bytesHashed=sum(status.bytesHashed for status in statuses),
+    assets=statuses,
+  )
+
+
+def resolve_media_candidates(media_path: str | None, asset: ProjectAsset | None) -> list[Path]:
+  candidate_strings: list[str] = []
+  if media_path:
+    candidate_strings.append(media_path)
+
+  if asset is not None:
+    if isinstance(asset.path, str):
+      candidate_strings.append(asset.path)
+    if isinstance(asset.proxyPath, str):
+      candidate_strings.append(asset.proxyPath)
+
+  candidates: list[Path] = []
+  for candidate in candidate_strings:
+    item = Path(candidate)
+    if item not in candidates:
+      candidates.append(item)
+    cwd_candidate = Path.cwd() / candidate
+    if cwd_candidate not in candidates:
+      candidates.append(cwd_candidate)
+    project_candidate = PROJECT_ROOT / candidate
+    if project_candidate not in candidates:
+      candidates.append(project_candidate)
+  return candidates
+
+
+def locate_media_files(media_node: ProjectNode, asset_index: AssetIndex) -> list[tuple[Path, os.stat_result]]:
+  located: list[tuple[Path, os.stat_result]] = []
+  for candidate in asset_index.candidates_for(media_node):
+    file_stat = MEDIA_PATH_INDEX.stat_file(candidate)
+    if file_stat is not None:
+      located.append((candidate, file_stat))
+  return located
+
+
+def describe_media_source(
+  project: ProjectPayload,
+  media_node: ProjectNode,
+  asset_index: AssetIndex,
+  content_identity: bool = True,
+) -> dict[str, Any]:
+  # Files whose content hash is already known are identified by it, so moved or touched copies keep their cache.
+  files = [
+    [content_hash] if content_identity and (content_hash := ASSET_HASHER.lookup(path, file_stat)) else
+    [str(path.absolute()), file_stat.st_mtime_ns, file_stat.st_size]
+    for path, file_stat in locate_media_files(media_node, asset_index)
+  ]
+  params = media_node.params or {}
+  return {
+    "files": files,
+    "resolution": list(extract_resolution(project)),
+    "label": media_node.displayName or params.get("path") or params.get("assetId") or "Media Placeholder",
+  }
+
+
+@lru_cache(maxsize=256)
+def read_image_size(path: str, mtime_ns: int, size: int) -> tuple[int, int]:
+  with Image.open(path) as loaded:
+    return loaded.size
+
+
+def media_cache_key(path: Path, file_stat: os.stat_result, scale: float) -> str:
+  return f"{path.absolute()}|{file_stat.st_mtime_ns}|{file_stat.st_size}|{scale:.6f}"
+
+
+def decode_media_file(
+  path: Path,
+  file_stat: os.stat_result,
+  scale: float = 1.0,
+  target_size: tuple[int, int] | None = None,
+) -> Image.Image:
+  cache_key = media_cache_key(path, file_stat, scale)
+  if target_size is not None:
+    cache_key += f"|{target_size[0]}x{target_size[1]}"
+  cached = DECODED_MEDIA_CACHE.get(cache_key)
+  if cached is not None:
+    return cached
+  with Image.open(path) as loaded:
+    if target_size is None:
+      target_size = (scale_pixel_value(loaded.width, scale), scale_pixel_value(loaded.height, scale))
+    if target_size != loaded.size:
+      # JPEG can decode straight to a reduced DCT scale; other formats ignore the draft request.
+      loaded.draft("RGB", target_size)
+    image = loaded.convert("RGB")
+  if image.size != target_size:
+    image = downscale_decoded_image(image, target_size)
+  DECODED_MEDIA_CACHE.put(cache_key, image)
+  return image
+
+
+def decoded_reduce_factor(size: tuple[int, int], target_size: tuple[int, int]) -> int:
+  return int(min(size[0] / target_size[0], size[1] / target_size[1]))
+
+
+def downscale_decoded_image(image: Image.Image, target_size: tuple[int, int]) -> Image.Image:
+  # Box-reduce by the whole factor first, then Lanczos only for the remainder.
+  reduce_factor = decoded_reduce_factor(image.size, target_size)
+  if reduce_factor >= 2:
+    image = image.reduce(reduce_factor)
+  if image.size != target_size:
+    image = image.resize(target_size, RESAMPLE_LANCZOS)
+  return image
+
+
+RAW_TILE_BYTES_PER_PIXEL = {"L": 1, "P": 1, "RGB": 3, "BGR": 3, "RGBA": 4, "RGBX": 4, "BGRX": 4, "BGRA": 4}
+
+
+def prune_decoder_tiles(loaded: Image.Image, region: RegionBox) -> bool:
+  tiles = list(getattr(loaded, "tile", None) or [])
+  if len(tiles) > 1:
+    kept = [
+      tile for tile in tiles
+      if tile[1][0] < region[2] and tile[1][2] > region[0] and tile[1][1] < region[3] and tile[1][3] > region[1]
+    ]
+    loaded.tile = kept
+    return True
+  if len(tiles) != 1 or tiles[0][0] != "raw":
+    return False
+  _, extents, offset, args = tiles[0]
+  rawmode, stride, orientation = (args, 0, 1) if isinstance(args, str) else (tuple(args) + (0, 1))[:3]
+  bytes_per_pixel = RAW_TILE_BYTES_PER_PIXEL.get(rawmode)
+  if bytes_per_pixel is None or tuple(extents) != (0, 0, loaded.width, loaded.height) or orientation not in (1, -1):
+    return False
+  # Uncompressed rows are contiguous, so only the rows covering the region are read.
+  stride = stride or loaded.width * bytes_per_pixel
+  skipped_rows = region[1] if orientation == 1 else loaded.height - region[3]
+  loaded.tile = [("raw", (0, region[1], loaded.width, region[3]), offset + skipped_rows * stride, (rawmode, stride, orientation))]
+  return True
+
+
+def decode_media_region(path: Path, file_stat: os.stat_result, scale: float, region: RegionBox) -> Image.Image:
+  full_size = read_image_size(str(path.absolute()), file_stat.st_mtime_ns, file_stat.st_size)
+  full_box = (0, 0, full_size[0], full_size[1])
+  cached = DECODED_MEDIA_CACHE.get(media_cache_key(path, file_stat, scale))
+  if cached is not None:
+    return crop_to_region(cached, full_box, region, scale)
+  # Runs the full decode's reduce + Lanczos steps on an aligned source window, so the result is a crop of it.
+  target_size = (scale_pixel_value(full_size[0], scale), scale_pixel_value(full_size[1], scale))
+  wanted = scale_region_box(region, scale, full_size)
+  reduce_factor = decoded_reduce_factor(full_size, target_size) if target_size != full_size else 1
+  reduce_factor = reduce_factor if reduce_factor >= 2 else 1
+  reduced_size = (-(-full_size[0] // reduce_factor), -(-full_size[1] // reduce_factor))
+  if reduced_size == target_size:
+    reduced_box = wanted
+  else:
+    reduced_box = map_region_through_resize(wanted, reduced_size, target_size)
+  source_box = (
+    reduced_box[0] * reduce_factor,
+    reduced_box[1] * reduce_factor,
+    min(reduced_box[2] * reduce_factor, full_size[0]),
+    min(reduced_box[3] * reduce_factor, full_size[1]),
+  )
+  with Image.open(path) as loaded:
+    image = loaded.crop(source_box).convert("RGB") if prune_decoder_tiles(loaded, source_box) else None
+  if image is None:
+    return crop_to_region(decode_media_file(path, file_stat, scale), full_box, region, scale)
+  if reduce_factor >= 2:
+    image = image.reduce(reduce_factor)
+  if reduced_size == target_size:
+    return image
+  ratio_x = reduced_size[0] / target_size[0]
+  ratio_y = reduced_size[1] / target_size[1]
+  box = (
+    wanted[0] * ratio_x - reduced_box[0],
+    wanted[1] * ratio_y - reduced_box[1],
+    wanted[2] * ratio_x - reduced_box[0],
+    wanted[3] * ratio_y - reduced_box[1],
+  )
+  return image.resize((wanted[2] - wanted[0], wanted[3] - wanted[1]), RESAMPLE_LANCZOS, box=box)
+
+
+VIDEO_DECODE_ERRORS: tuple[type[BaseException], ...] = (OSError, ValueError)
+if av is not None:
+  VIDEO_DECODE_ERRORS += (getattr(av, "FFmpegError", None) or getattr(av, "AVError"),)
+
+
+def is_video_file(path: Path) -> bool:
+  return av is not None and path.suffix.lower() in VIDEO_FILE_SUFFIXES
+
+
+def is_video_media_node(media_node: ProjectNode, asset_index: AssetIndex) -> bool:
+  return any(is_video_file(path) for path, _ in locate_media_files(media_node, asset_index))
+
+
+class VideoSeekIndex(NamedTuple):
+  width: int
+  height: int
+  fps: float
+  time_base: float
+  start_pts: int
+  frame_count: int
+  keyframes: list[int]
+
+  def pts_of(self, frame: int) -> int:
+    return self.start_pts + int(round(frame / self.fps / self.time_base))
+
+  def frame_of(self, pts: int) -> int:
+    return int(round((pts - self.start_pts) * self.time_base * self.fps))
+
+  def keyframe_before(self, pts: int) -> int:
+    position = bisect_right(self.keyframes, pts)
+    return self.keyframes[position - 1] if position else self.start_pts
+
+
+def plan_video_seek(index: VideoSeekIndex, position: int | None, target_pts: int) -> int | None:
+  # Keep decoding forward when the target lies ahead in the GOP the decoder is already in; seek otherwise.
+  keyframe = index.keyframe_before(target_pts)
+  if position is not None and position < target_pts and keyframe <= position:
+    return None
+  return keyframe
+
+
+@lru_cache(maxsize=64)
+def build_video_seek_index(path: str, mtime_ns: int, size: int) -> VideoSeekIndex:
+  # Demuxes packets without decoding them, once per file version.
+  with av.open(path) as container:
+    stream = container.streams.video[0]
+    keyframes: list[int] = []
+    frame_count = 0
+    for packet in container.demux(stream):
+      if packet.pts is None:
+        continue
+      frame_count += 1
+      if packet.is_keyframe:
+        keyframes.append(packet.pts)
+    return VideoSeekIndex(
+      width=stream.codec_context.width,
+      height=stream.codec_context.height,
+      fps=float(stream.average_rate or stream.guessed_rate or 30),
+      time_base=float(stream.time_base),
+      start_pts=stream.start_time or 0,
+      frame_count=frame_count,
+      keyframes=sorted(keyframes),
+    )
+
+
+def read_video_seek_index(path: Path, file_stat: os.stat_result) -> VideoSeekIndex:
+  try:
+    return build_video_seek_index(str(path.absolute()), file_stat.st_mtime_ns, file_stat.st_size)
+  except VIDEO_DECODE_ERRORS as error:
+    raise OSError(f"動画を開けません: {path}") from error
+
+
+class VideoDecoder:
+  # One open container per file; it remembers where it stopped so forward scrubbing continues in place.
+  def __init__(self, path: Path, index: VideoSeekIndex) -> None:
+    self.index = index
+    self.container = av.open(str(path))
+    self.stream = self.container.streams.video[0]
+    self.stream.thread_type = "AUTO"
+    self.frames: Any = None
+    self.position: int | None = None
+    self.lock = threading.Lock()
+    # Guarded by the pool lock: an evicted decoder is closed only once its last user releases it.
+    self.users = 0
+    self.retired = False
+
+  def decode(self, frame_number: int, on_frame: Callable[[int, Any], None]) -> None:
+    target_pts = self.index.pts_of(frame_number)
+    with self.lock:
+      seek_pts = plan_video_seek(self.index, self.position, target_pts)
+      if seek_pts is not None or self.frames is None:
+        self.container.seek(seek_pts if seek_pts is not None else self.index.start_pts, stream=self.stream, backward=True, any_frame=False)
+        self.frames = self.container.decode(self.stream)
+        self.position = None
+      for frame in self.frames:
+        if frame.pts is None:
+          continue
+        self.position = frame.pts
+        on_frame(self.index.frame_of(frame.pts), frame)
+        if frame.pts >= target_pts:
+          return
+      self.frames = None
+
+  def close(self) -> None:
+    with self.lock:
+      self.container.close()
+
+
+class VideoDecoderPool:
+  def __init__(self, max_open: int) -> None:
+    self.max_open = max_open
+    self._decoders: OrderedDict[tuple[str, int, int], VideoDecoder] = OrderedDict()
+    self._lock = threading.Lock()
+
+  def acquire(self, path: Path, file_stat: os.stat_result, index: VideoSeekIndex) -> VideoDecoder:
+    # Every acquire must be paired with release().
+    key = AssetHashService.key_of(path, file_stat)
+    with self._lock:
+      decoder = self._decoders.get(key)
+      if decoder is not None:
+        self._decoders.move_to_end(key)
+        decoder.users += 1
+        return decoder
+    decoder = VideoDecoder(path, index)
+    closable: list[VideoDecoder] = []
+    with self._lock:
+      existing = self._decoders.get(key)
+      if existing is not None:
+        closable.append(decoder)
+        decoder = existing
+      else:
+        self._decoders[key] = decoder
+        while len(self._decoders) > self.max_open:
+          closable.extend(self.retire(self._decoders.popitem(last=False)[1]))
+      decoder.users += 1
+    for stale in closable:
+      stale.close()
+    return decoder
+
+  def release(self, decoder: VideoDecoder) -> None:
+    with self._lock:
+      decoder.users -= 1
+      unused = decoder.retired and decoder.users == 0
+    if unused:
+      decoder.close()
+
+  @staticmethod
+  def retire(decoder: VideoDecoder) -> list[VideoDecoder]:
+    decoder.retired = True
+    return [decoder] if decoder.users == 0 else []
+
+  def clear(self) -> None:
+    with self._lock:
+      closable = [stale for decoder in self._decoders.values() for stale in self.retire(decoder)]
+      self._decoders.clear()
+    for decoder in closable:
+      decoder.close()
+
+
+VIDEO_DECODERS = VideoDecoderPool(VIDEO_DECODER_MAX_OPEN)
+
+
+def decode_video_frame(path: Path, file_stat: os.stat_result, frame_number: int, scale: float = 1.0) -> Image.Image:
+  index = read_video_seek_index(path, file_stat)
+  frame_number = min(max(frame_number, 0), max(index.frame_count - 1, 0))
+  target_size = (scale_pixel_value(index.width, scale), scale_pixel_value(index.height, scale))
+  key_prefix = f"{media_cache_key(path, file_stat, scale)}|frame:"
+  cached = DECODED_FRAME_CACHE.get(f"{key_prefix}{frame_number}")
+  if cached is not None:
+    return cached
+  decoded: dict[int, Image.Image] = {}
+
+  def store(number: int, frame: Any) -> None:
+    # Frames passed on the way to the target are kept too, so scrubbing back within the GOP hits the cache.
+    key = f"{key_prefix}{number}"
+    if number != frame_number and DECODED_FRAME_CACHE.contains(key):
+      return
+    image = frame.reformat(width=target_size[0], height=target_size[1], format="rgb24").to_image()
+    DECODED_FRAME_CACHE.put(key, image)
+    decoded[number] = image
+
+  try:
+    decoder = VIDEO_DECODERS.acquire(path, file_stat, index)
+    try:
+      decoder.decode(frame_number, store)
+    finally:
+      VIDEO_DECODERS.release(decoder)
+  except VIDEO_DECODE_ERRORS as error:
+    raise OSError(f"フレーム {frame_number} をデコードできません: {path}") from error
+  image = decoded.get(frame_number)
+  if image is None and decoded:
+    # Past the last decodable frame: show the closest one that was decoded.
+    image = decoded[max(decoded)]
+  if image is None:
+    raise OSError(f"フレーム {frame_number} をデコードできません: {path}")
+  return image
+
+
+def render_placeholder_image(width: int, height: int, label: str) -> Image.Image:
+  ramp = Image.linear_gradient("L").resize((1, height), Image.BILINEAR)
+  channels = [
+    ramp.point([int(48 + 96 * value / 255) for value in range(256)]),
+    ramp.point([int(80 + 100 * (1 - value / 255)) for value in range(256)]),
+    ramp.point([int(120 + 50 * math.sin(value / 255 * math.pi)) for value in range(256)]),
+  ]
+  image = Image.merge("RGB", channels).resize((width, height), Image.NEAREST)
+  draw = ImageDraw.Draw(image)
+  placeholder_font = ImageFont.load_default()
+  draw.rectangle((0, 0, width, 36), fill=(20, 26, 46, 192))
+  draw.text((12, 12), label, fill="#f5f7ff", font=placeholder_font)
+  return image
+
+
+def create_placeholder_image(width: int, height: int, label: str) -> Image.Image:
+  # Placeholders share the decoded media byte budget; callers may draw on the result, so only copies leave the cache.
+  cache_key = f"placeholder|{width}x{height}|{label}"
+  image = DECODED_MEDIA_CACHE.get(cache_key)
+  if image is None:
+    image = render_placeholder_image(width, height, label)
+    DECODED_MEDIA_CACHE.put(cache_key, image)
+  return image.copy()
+
+
+def load_media_image(
+  project: ProjectPayload,
+  media_node: ProjectNode,
+  asset_index: AssetIndex,
+  scale: float = 1.0,
+  region: RegionBox | None = None,
+  frame: int | None = None,
+  strict: bool = False,
+) -> Image.Image:
+  params = media_node.params or {}
+
+  image: Image.Image | None = None
+  decode_error: OSError | None = None
+  for path, file_stat in locate_media_files(media_node, asset_index):
+    try:
+      if is_video_file(path):
+        image = decode_video_frame(path, file_stat, frame or 0, scale)
+        if region is not None:
+          video_index = read_video_seek_index(path, file_stat)
+          image = crop_to_region(image, (0, 0, video_index.width, video_index.height), region, scale)
+        break
+      proxy = PROXY_PYRAMIDS.level_for(path, file_stat, scale)
+      if proxy is not None:
+        # Decode the pyramid level straight to the size the original would have produced at this scale.
+        level_path, level_stat, factor, (source_width, source_height) = proxy
+        target_size = (scale_pixel_value(source_width, scale), scale_pixel_value(source_height, scale))
+        image = decode_media_file(level_path, level_stat, scale * factor, target_size)
+        if region is not None:
+          image = crop_to_region(image, (0, 0, source_width, source_height), region, scale)
+      elif region is None:
+        image = decode_media_file(path, file_stat, scale)
+      else:
+        image = decode_media_region(path, file_stat, scale, region)
+      break
+    except OSError as error:
+      decode_error = error
+      continue
+  if image is None and strict:
+    source = params.get("path") or params.get("assetId") or media_node.id
+    raise OSError(f"メディアを読み込めません: {source}") from decode_error
+  if image is None:
+    full_width, full_height = compute_placeholder_dimensions(project, media_node)
+    width = scale_pixel_value(full_width, scale)
+    height = scale_pixel_value(full_height, scale)
+    label = media_node.displayName or params.get("path") or params.get("assetId") or "Media Placeholder"
+    image = create_placeholder_image(width, height, str(label))
+    if region is not None:
+      image = crop_to_region(image, (0, 0, full_width, full_height), region, scale)
+  return image
+
+
+def compute_placeholder_dimensions(project: ProjectPayload, media_node: ProjectNode) -> tuple[int, int]:
+  params = media_node.params or {}
+  fallback_width, fallback_height = extract_resolution(project)
+  width = max(int(params.get("placeholderWidth") or fallback_width), 64)
+  height = max(int(params.get("placeholderHeight") or fallback_height), 64)
+  return width, height
+
+
+def extract_resolution(project: ProjectPayload) -> tuple[int, int]:
+  width = 1920
+  height = 1080
+  if project.projectResolution and isinstance(project.projectResolution, dict):
+    width = int(project.projectResolution.get("width") or width)
+    height = int(project.projectResolution.get("height") or height)
+  return max(width, 1), max(height, 1)
+
+
+def is_proxy_forced(project: ProjectPayload) -> bool | None:
+  metadata = project.metadata or {}
+  if isinstance(metadata, dict):
+    preview_proxy = metadata.get("previewProxy")
+    if isinstance(preview_proxy, dict) and "enabled" in preview_proxy:
+      value = preview_proxy.get("enabled")
+      if isinstance(value, bool):
+        return value
+  return None
+
+
+def scale_pixel_value(value: int, scale: float) -> int:
+  if scale == 1.0:
+    return value
+  return max(int(round(value * scale)), 1)
+
+
+def compute_resize_dimensions(
+  original_width: int,
+  original_height: int,
+  params: dict[str, Any],
+  scale: float = 1.0,
+) -> tuple[int, int]:
+  keep_aspect = bool(params.get("keepAspectRatio", True))
+  scale_value = parse_float(params.get("scale"))
+  width_value = parse_int(params.get("width"))
+  height_value = parse_int(params.get("height"))
+  if width_value is not None and width_value > 0:
+    width_value = scale_pixel_value(width_value, scale)
+  if height_value is not None and height_value > 0:
+    height_value = scale_pixel_value(height_value, scale)
+
+  target_width = original_width
+  target_height = original_height
+
+  if scale_value is not None and scale_value > 0:
+    target_width = max(int(round(original_width * scale_value)), 1)
+    target_height = max(int(round(original_height * scale_value)), 1)
+  else:
+    if width_value is not None and width_value > 0:
+      target_width = width_value
+    if height_value is not None and height_value > 0:
+      target_height = height_value
+
+    if keep_aspect:
+      if width_value is None and height_value is not None and height_value > 0:
+        target_width = max(int(round(original_width * (target_height / original_height))), 1)
+      elif height_value is None and width_value is not None and width_value > 0:
+        target_height = max(int(round(original_height * (target_width / original_width))), 1)
+      elif width_value is not None and height_value is not None and width_value > 0 and height_value > 0:
+        ratio_w = width_value / original_width
+        ratio_h = height_value / original_height
+        if ratio_w < ratio_h:
+          target_height = max(int(round(original_height * ratio_w)), 1)
+          target_width = max(width_value, 1)
+        else:
+          target_width = max(int(round(original_width * ratio_h)), 1)
+          target_height = max(height_value, 1)
+
+  return max(target_width, 1), max(target_height, 1)
+
+
+def compute_crop_box(
+  parent_width: int,
+  parent_height: int,
+  params: dict[str, Any],
+  scale: float = 1.0,
+) -> tuple[int, int, int, int] | None:
+  origin_x = max(parse_int(params.get("x")) or 0, 0)
+  origin_y = max(parse_int(params.get("y")) or 0, 0)
+  if scale != 1.0:
+    origin_x = int(round(origin_x * scale))
+    origin_y = int(round(origin_y * scale))
+  width_param = parse_int(params.get("width"))
+  height_param = parse_int(params.get("height"))
+  width_value = scale_pixel_value(width_param, scale) if width_param else parent_width
+  height_value = scale_pixel_value(height_param, scale) if height_param else parent_height
+  width_value = max(width_value, 1)
+  height_value = max(height_value, 1)
+  right = min(origin_x + width_value, parent_width)
+  bottom = min(origin_y + height_value, parent_height)
+  origin_x = min(origin_x, parent_width - 1)
+  origin_y = min(origin_y, parent_height - 1)
+  if right <= origin_x or bottom <= origin_y:
+    return None
+  return origin_x, origin_y, right, bottom
+
+
+def resolve_single_input_id(node: ProjectNode) -> str | None:
+  inputs = node.inputs or {}
+  priority_keys = ["primary", "video", "image", "input"]
+  for key in priority_keys:
+    target = inputs.get(key)
+    if isinstance(target, str):
+      return target.split(":", 1)[0]
+  for target in inputs.values():
+    if isinstance(target, str):
+      return target.split(":", 1)[0]
+  return None
+
+
+def scale_region_box(region: RegionBox, scale: float, bounds: tuple[int, int] | None = None) -> RegionBox:
+  # Starts floor and ends ceil, so a region covers every scaled pixel it touches and lines up with a full render.
+  if scale == 1.0:
+    return region
+  left = int(math.floor(region[0] * scale + 1e-9))
+  top = int(math.floor(region[1] * scale + 1e-9))
+  right = max(int(math.ceil(region[2] * scale - 1e-9)), left + 1)
+  bottom = max(int(math.ceil(region[3] * scale - 1e-9)), top + 1)
+  if bounds is not None:
+    right = max(min(right, scale_pixel_value(bounds[0], scale)), left + 1)
+    bottom = max(min(bottom, scale_pixel_value(bounds[1], scale)), top + 1)
+  return left, top, right, bottom
+
+
+def region_pixel_size(region: RegionBox, scale: float, bounds: tuple[int, int] | None = None) -> tuple[int, int]:
+  box = scale_region_box(region, scale, bounds)
+  return box[2] - box[0], box[3] - box[1]
+
+
+def union_regions(first: RegionBox | None, second: RegionBox) -> RegionBox:
+  if first is None:
+    return second
+  return min(first[0], second[0]), min(first[1], second[1]), max(first[2], second[2]), max(first[3], second[3])
+
+
+def clamp_region(region: RegionBox, width: int, height: int) -> RegionBox | None:
+  left, top = max(region[0], 0), max(region[1], 0)
+  right, bottom = min(region[2], width), min(region[3], height)
+  if right <= left or bottom <= top:
+    return None
+  return left, top, right, bottom
+
+
+def map_region_through_resize(
+  region: RegionBox,
+  input_size: tuple[int, int],
+  output_size: tuple[int, int],
+) -> RegionBox:
+  ratio_x = input_size[0] / max(output_size[0], 1)
+  ratio_y = input_size[1] / max(output_size[1], 1)
+  # Lanczos reads three taps on each side, widened when downscaling.
+  margin_x = 3.0 * max(ratio_x, 1.0) + 1.0
+  margin_y = 3.0 * max(ratio_y, 1.0) + 1.0
+  mapped = (
+    int(math.floor(region[0] * ratio_x - margin_x)),
+    int(math.floor(region[1] * ratio_y - margin_y)),
+    int(math.ceil(region[2] * ratio_x + margin_x)),
+    int(math.ceil(region[3] * ratio_y + margin_y)),
+  )
+  return clamp_region(mapped, input_size[0], input_size[1]) or (0, 0, input_size[0], input_size[1])
+
+
+def crop_to_region(image: Image.Image, available: RegionBox, wanted: RegionBox, scale: float) -> Image.Image:
+  if available == wanted:
+    return image
+  outer = scale_region_box(available, scale)
+  inner = scale_region_box(wanted, scale)
+  left, top = inner[0] - outer[0], inner[1] - outer[1]
+  # A full-frame image is round()ed at the far edge, so the ceil()ed region end never reaches past it.
+  right = min(inner[2] - outer[0], image.width)
+  bottom = min(inner[3] - outer[1], image.height)
+  return image.crop((left, top, max(right, left + 1), max(bottom, top + 1)))
+
+
+def resize_region(
+  image: Image.Image,
+  available: RegionBox,
+  wanted: RegionBox,
+  input_size: tuple[int, int],
+  output_size: tuple[int, int],
+  scale: float,
+) -> Image.Image:
+  # Ratios of the scaled sizes, as a full-frame resize at this scale would use them.
+  ratio_x = scale_pixel_value(input_size[0], scale) / max(scale_pixel_value(output_size[0], scale), 1)
+  ratio_y = scale_pixel_value(input_size[1], scale) / max(scale_pixel_value(output_size[1], scale), 1)
+  outer = scale_region_box(available, scale, input_size)
+  inner = scale_region_box(wanted, scale, output_size)
+  box = (
+    inner[0] * ratio_x - outer[0],
+    inner[1] * ratio_y - outer[1],
+    inner[2] * ratio_x - outer[0],
+    inner[3] * ratio_y - outer[1],
+  )
+  box = (max(box[0], 0.0), max(box[1], 0.0), min(box[2], float(image.width)), min(box[3], float(image.height)))
+  return image.resize((inner[2] - inner[0], inner[3] - inner[1]), RESAMPLE_LANCZOS, box=box)
+
+
+def extract_color_operation(node: ProjectNode) -> tuple[str, float]:
+  params = node.params or {}
+  if node.type == "ExposureAdjust":
+    exposure_value = parse_float(params.get("exposure"))
+    exposure = max(min(exposure_value if exposure_value is not None else 0.0, 4.0), -4.0)
+    return "exposure", 2 ** exposure
+  if node.type == "ContrastAdjust":
+    contrast_value = parse_float(params.get("contrast"))
+    return "contrast", max(min(contrast_value if contrast_value is not None else 1.0, 4.0), 0.0)
+  saturation_value = parse_float(params.get("saturation"))
+  return "saturation", max(min(saturation_value if saturation_value is not None else 1.0, 4.0), 0.0)
+
+
+def blend_channel_value(base: float, value: int, factor: float) -> int:
+  # Mirrors Pillow's ImagingBlend so fused LUTs match ImageEnhance output.
+  blended = base + factor * (value - base)
+  if blended <= 0.0:
+    return 0
+  if blended >= 255.0:
+    return 255
+  return int(blended)
+
+
+def compute_lut_luma_mean(histogram: list[int], luts: list[list[int]]) -> int:
+  total = sum(histogram[:256])
+  if total <= 0:
+    return 0
+  channel_means = []
+  for channel, lut in enumerate(luts):
+    counts = histogram[channel * 256:(channel + 1) * 256]
+    channel_means.append(sum(count * lut[value] for value, count in enumerate(counts) if count) / total)
+  luma = (channel_means[0] * 19595 + channel_means[1] * 38470 + channel_means[2] * 7471) / 65536
+  return int(luma + 0.5)
+
+
+def apply_lut_operations(image: Image.Image, operations: list[tuple[str, float]]) -> Image.Image:
+  luts = [list(range(256)) for _ in range(3)]
+  histogram = image.histogram() if any(kind == "contrast" for kind, _ in operations) else []
+  for kind, factor in operations:
+    if kind == "exposure":
+      luts = [[blend_channel_value(0.0, value, factor) for value in lut] for lut in luts]
+    else:
+      mean = compute_lut_luma_mean(histogram, luts)
+      luts = [[blend_channel_value(float(mean), value, factor) for value in lut] for lut in luts]
+  return image.point(luts[0] + luts[1] + luts[2])
+
+
+def apply_saturation(image: Image.Image, factor: float) -> Image.Image:
+  # Same integer luma as ImageEnhance.Color, so chains round and clip exactly like per-node rendering.
+  return Image.blend(image.convert("L").convert("RGB"), image, factor)
+
+
+def apply_color_operations(image: Image.Image, operations: list[tuple[str, float]]) -> Image.Image:
+  active = [(kind, factor) for kind, factor in operations if factor != 1.0]
+  result = image if image.mode == "RGB" else image.convert("RGB")
+  index = 0
+  while index < len(active):
+    if active[index][0] == "saturation":
+      # Each step clips and rounds before the next one, so consecutive factors are not multiplied together.
+      result = apply_saturation(result, active[index][1])
+      index += 1
+    else:
+      segment: list[tuple[str, float]] = []
+      while index < len(active) and active[index][0] != "saturation":
+        segment.append(active[index])
+        index += 1
+      result = apply_lut_operations(result, segment)
+  return result if result is not image else image.copy()
+
+
+def read_media_dimensions(
+  project: ProjectPayload,
+  media_node: ProjectNode,
+  asset_index: AssetIndex,
+) -> tuple[int, int]:
+  for path, file_stat in locate_media_files(media_node, asset_index):
+    try:
+      if is_video_file(path):
+        video_index = read_video_seek_index(path, file_stat)
+        return video_index.width, video_index.height
+      return read_image_size(str(path.absolute()), file_stat.st_mtime_ns, file_stat.st_size)
+    except OSError:
+      continue
+  return compute_placeholder_dimensions(project, media_node)
+
+
+class GraphValidationError(ValueError):
+  pass
+
+
+def merge_edge_inputs(project: ProjectPayload) -> dict[str, ProjectNode]:
+  node_map: dict[str, ProjectNode] = {node.id: node for node in project.nodes}
+  merged: dict[str, dict[str, Any]] = {}
+  for edge in project.edges:
+    target_id, _, handle = edge.to.partition(":")
+    node = node_map.get(target_id)
+    if node is None or not handle:
+      continue
+    inputs = merged.get(target_id)
+    if inputs is None:
+      inputs = merged[target_id] = dict(node.inputs or {})
+    if edge.disabled:
+      if inputs.get(handle) == edge.from_:
+        inputs[handle] = None
+    elif inputs.get(handle) is None:
+      inputs[handle] = edge.from_
+  for target_id, inputs in merged.items():
+    if inputs != (node_map[target_id].inputs or {}):
+      node_map[target_id] = node_map[target_id].model_copy(update={"inputs": inputs})
+  return node_map
+
+
+class ExecutionPlan:
+  def __init__(self, structure_key: str, node_map: dict[str, ProjectNode]) -> None:
+    self.structure_key = structure_key
+    # Input handles resolved to node ids once per structure, so evaluation never re-parses "node:handle".
+    self.inputs: dict[str, dict[str, str]] = {}
+    self.primary_inputs: dict[str, str | None] = {}
+    self.sources: dict[str, list[str]] = {}
+    for node_id, node in node_map.items():
+      inputs = {str(key): target.split(":", 1)[0] for key, target in (node.inputs or {}).items() if isinstance(target, str)}
+      self.inputs[node_id] = inputs
+      self.primary_inputs[node_id] = resolve_single_input_id(node)
+      self.sources[node_id] = [source for source in dict.fromkeys(inputs.values()) if source in node_map]
+
+    # Kahn's algorithm in project order; whatever is left over sits on a cycle.
+    remaining = {node_id: len(sources) for node_id, sources in self.sources.items()}
+    dependents: dict[str, list[str]] = {}
+    for node_id, sources in self.sources.items():
+      for source in sources:
+        dependents.setdefault(source, []).append(node_id)
+    ready = deque(node_id for node_id, count in remaining.items() if count == 0)
+    topological: list[str] = []
+    while ready:
+      node_id = ready.popleft()
+      topological.append(node_id)
+      for dependent in dependents.get(node_id, ()):
+        remaining[dependent] -= 1
+        if remaining[dependent] == 0:
+          ready.append(dependent)
+    if len(topological) != len(node_map):
+      raise GraphValidationError(f"ノードグラフに循環参照があります: {', '.join(self.find_cycle_nodes(remaining))}")
+    self.position = {node_id: index for index, node_id in enumerate(topological)}
+
+    self.outputs = [node_id for node_id, node in node_map.items() if node.type == "PreviewDisplay"]
+    live = set(self.upstream(self.outputs))
+    self.order = [node_id for node_id in topological if node_id in live]
+
+  def find_cycle_nodes(self, remaining: dict[str, int]) -> list[str]:
+    # Peel off blocked nodes that feed nothing else blocked; the rest lies on a cycle.
+    blocked = {node_id for node_id, count in remaining.items() if count > 0}
+    fan_out = {node_id: 0 for node_id in blocked}
+    for node_id in blocked:
+      for source in self.sources[node_id]:
+        if source in blocked:
+          fan_out[source] += 1
+    sinks = [node_id for node_id, count in fan_out.items() if count == 0]
+    while sinks:
+      node_id = sinks.pop()
+      blocked.discard(node_id)
+      for source in self.sources[node_id]:
+        if source in blocked:
+          fan_out[source] -= 1
+          if fan_out[source] == 0:
+            sinks.append(source)
+    return [node_id for node_id in remaining if node_id in blocked]
+
+  def single_input(self, node_id: str) -> str | None:
+    return self.primary_inputs.get(node_id)
+
+  def named_input(self, node_id: str, key: str) -> str | None:
+    return self.inputs.get(node_id, {}).get(key)
+
+  def upstream(self, node_ids: list[str], known: Any = ()) -> list[str]:
+    # Ancestor closure in topological order; nodes in `known` are not expanded.
+    seen: set[str] = set()
+    pending = [node_id for node_id in node_ids if node_id in self.position]
+    while pending:
+      node_id = pending.pop()
+      if node_id in seen:
+        continue
+      seen.add(node_id)
+      if node_id not in known:
+        pending.extend(self.sources[node_id])
+    return sorted(seen, key=self.position.__getitem__)
+
+
+class ExecutionPlanCache:
+  def __init__(self, max_entries: int) -> None:
+    self.max_entries = max_entries
+    self._plans: OrderedDict[str, ExecutionPlan] = OrderedDict()
+    self._lock = threading.Lock()
+
+  def get_or_compile(self, node_map: dict[str, ProjectNode]) -> ExecutionPlan:
+    structure_key = compute_graph_structure_key(node_map)
+    with self._lock:
+      plan = self._plans.get(structure_key)
+      if plan is not None:
+        self._plans.move_to_end(structure_key)
+        return plan
+    plan = ExecutionPlan(structure_key, node_map)
+    with self._lock:
+      self._plans[structure_key] = plan
+      while len(self._plans) > self.max_entries:
+        self._plans.popitem(last=False)
+    return plan
+
+  def clear(self) -> None:
+    with self._lock:
+      self._plans.clear()
+
+
+def compute_graph_structure_key(node_map: dict[str, ProjectNode]) -> str:
+  # Parameters are left out so parameter-only edits reuse the plan and the learned cost correction.
+  return compute_signature([
+    [node.id, node.type, normalize_cache_value(node.inputs or {})]
+    for node in node_map.values()
+  ])
+
+
+EXECUTION_PLAN_CACHE = ExecutionPlanCache(EXECUTION_PLAN_CACHE_SIZE)
+
+
+class GraphIndex:
+  def __init__(self, project: ProjectPayload) -> None:
+    self.project = project
+    self.node_map: dict[str, ProjectNode] = merge_edge_inputs(project)
+    self.asset_index = AssetIndex(project.assets)
+    self.consumers: dict[str, list[str]] = {}
+    for node in self.node_map.values():
+      self.link_inputs(node)
+    self.signatures: dict[Any, dict[str, str | None]] = {}
+    self.media_sources: dict[str, str] = {}
+    self._plan: ExecutionPlan | None = None
+
+  def plan(self) -> ExecutionPlan:
+    if self._plan is None:
+      self._plan = EXECUTION_PLAN_CACHE.get_or_compile(self.node_map)
+    return self._plan
+
+  def link_inputs(self, node: ProjectNode) -> None:
+    self._plan = None
+    for target in (node.inputs or {}).values():
+      if isinstance(target, str):
+        self.consumers.setdefault(target.split(":", 1)[0], []).append(node.id)
+
+  def unlink_inputs(self, node: ProjectNode) -> None:
+    self._plan = None
+    for target in (node.inputs or {}).values():
+      if isinstance(target, str):
+        source_id = target.split(":", 1)[0]
+        consumers = self.consumers.get(source_id)
+        if consumers and node.id in consumers:
+          consumers.remove(node.id)
+          if not consumers:
+            del self.consumers[source_id]
+
+  def consumer_count(self, node_id: str) -> int:
+    return len(self.consumers.get(node_id, ()))
+
+  def signature_memo(self, key: Any) -> dict[str, str | None]:
+    # Viewports and frames each get their own memo; the oldest ones go once scrubbing piles them up.
+    if key not in self.signatures:
+      while len(self.signatures) >= GRAPH_SIGNATURE_MEMO_LIMIT:
+        del self.signatures[next(iter(self.signatures))]
+    return self.signatures.setdefault(key, {})
+
+  def fork(self, project: ProjectPayload) -> GraphIndex:
+    forked = GraphIndex.__new__(GraphIndex)
+    forked.project = project
+    forked.node_map = dict(self.node_map)
+    forked.asset_index = self.asset_index
+    forked.consumers = {node_id: list(consumers) for node_id, consumers in self.consumers.items()}
+    forked.signatures = {scale: dict(memo) for scale, memo in self.signatures.items()}
+    forked.media_sources = dict(self.media_sources)
+    forked._plan = self._plan
+    return forked
+
+  def collect_downstream(self, node_ids: list[str]) -> list[str]:
+    ordered: list[str] = []
+    seen: set[str] = set()
+    pending = list(node_ids)
+    while pending:
+      node_id = pending.pop(0)
+      if node_id in seen:
+        continue
+      seen.add(node_id)
+      ordered.append(node_id)
+      pending.extend(self.consumers.get(node_id, ()))
+    return ordered
+
+  def invalidate(self, node_ids: list[str]) -> list[str]:
+    affected = self.collect_downstream(node_ids)
+    for memo in self.signatures.values():
+      for node_id in affected:
+        memo.pop(node_id, None)
+    return affected
+
+  def refresh_media_sources(self) -> list[str]:
+    changed: list[str] = []
+    for node in self.node_map.values():
+      if node.type != "MediaInput":
+        continue
+      description = json.dumps(describe_media_source(self.project, node, self.asset_index, False), sort_keys=True)
+      if self.media_sources.get(node.id) != description:
+        if node.id in self.media_sources:
+          changed.append(node.id)
+        self.media_sources[node.id] = description
+    return self.invalidate(changed) if changed else []
+
+
+def create_size_resolver(project: ProjectPayload, graph: GraphIndex) -> Callable[[str], tuple[int, int] | None]:
+  node_map = graph.node_map
+  asset_index = graph.asset_index
+  size_cache: dict[str, tuple[int, int] | None] = {}
+  plan = graph.plan()
+
+  def measure_input(node_id: str | None) -> tuple[int, int] | None:
+    return size_cache.get(node_id) if node_id else None
+
+  def measure_node(node_id: str) -> tuple[int, int] | None:
+    if node_id not in size_cache:
+      for pending_id in plan.upstream([node_id], known=size_cache):
+        if pending_id not in size_cache:
+          size_cache[pending_id] = compute_size(node_map[pending_id])
+    return size_cache.get(node_id)
+
+  def compute_size(node: ProjectNode) -> tuple[int, int] | None:
+    size: tuple[int, int] | None = None
+    if node.type == "MediaInput":
+      size = read_media_dimensions(project, node, asset_index)
+    elif node.type in COLOR_NODE_TYPES or node.type == "PreviewDisplay":
+      size = measure_input(plan.single_input(node.id))
+    elif node.type == "Resize":
+      parent_size = measure_input(plan.single_input(node.id))
+      if parent_size is not None:
+        size = compute_resize_dimensions(parent_size[0], parent_size[1], node.params or {})
+    elif node.type == "Crop":
+      parent_size = measure_input(plan.single_input(node.id))
+      if parent_size is not None:
+        crop_box = compute_crop_box(parent_size[0], parent_size[1], node.params or {})
+        size = parent_size if crop_box is None else (crop_box[2] - crop_box[0], crop_box[3] - crop_box[1])
+    elif node.type == "Blend":
+      primary_size = measure_input(plan.named_input(node.id, "primary"))
+      secondary_size = measure_input(plan.named_input(node.id, "secondary"))
+      if primary_size is None:
+        primary_size = measure_input(plan.single_input(node.id))
+      if primary_size is not None and secondary_size is not None:
+        size = primary_size
+    return size
+
+  return measure_node
+
+
+def measure_graph_output(project: ProjectPayload, graph: GraphIndex | None = None) -> tuple[int, int]:
+  graph = graph or GraphIndex(project)
+  measure_node = create_size_resolver(project, graph)
+  for node in project.nodes:
+    if node.type == "PreviewDisplay":
+      size = measure_node(node.id)
+      if size is not None:
+        return size
+
+  for node in project.nodes:
+    if node.type == "MediaInput":
+      return read_media_dimensions(project, node, graph.asset_index)
+  return 1920, 1080
+
+
+def build_render_cost_estimate(graph_key: str, node_ms: dict[str, float]) -> RenderCostEstimate:
+  # Per-node overhead does not shrink with the proxy area, so it is fixed rather than scaled.
+  fixed_ms = RENDER_FIXED_COST_MS + NODE_FIXED_COST_MS * len(node_ms)
+  return RenderCostEstimate(graph_key, fixed_ms, node_ms, NODE_FIXED_COST_MS)
+
+
+def estimate_render_cost(
+  project: ProjectPayload,
+  graph: GraphIndex | None = None,
+  output_ids: list[str] | None = None,
+) -> RenderCostEstimate:
+  graph = graph or GraphIndex(project)
+  node_map = graph.node_map
+  measure_node = create_size_resolver(project, graph)
+  node_ms: dict[str, float] = {}
+
+  def pixels_of(node_id: str | None) -> int:
+    size = measure_node(node_id) if node_id else None
+    return size[0] * size[1] if size is not None else 0
+
+  def visit(node_id: str) -> None:
+    for pending_id in graph.plan().upstream([node_id], known=node_ms):
+      if pending_id in node_ms:
+        continue
+      node = node_map[pending_id]
+      cost_ns = NODE_COST_NS_PER_PIXEL.get(node.type, 0.0) * pixels_of(pending_id)
+      if node.type == "Resize":
+        cost_ns += RESIZE_INPUT_COST_NS_PER_PIXEL * pixels_of(graph.plan().single_input(pending_id))
+      node_ms[pending_id] = cost_ns / 1_000_000.0
+
+  if output_ids is not None:
+    for output_id in output_ids:
+      visit(output_id)
+    return build_render_cost_estimate(graph.plan().structure_key, node_ms)
+  for node in project.nodes:
+    if node.type == "PreviewDisplay" and measure_node(node.id) is not None:
+      visit(node.id)
+      break
+  else:
+    for node in project.nodes:
+      if node.type == "MediaInput":
+        visit(node.id)
+        break
+  return build_render_cost_estimate(graph.plan().structure_key, node_ms)
+
+
+def plan_region_of_interest(
+  project: ProjectPayload,
+  graph: GraphIndex,
+  viewport: RegionBox,
+) -> tuple[dict[str, RegionBox], dict[str, tuple[int, int]]] | None:
+  node_map = graph.node_map
+  measure_node = create_size_resolver(project, graph)
+  output_id = next(
+    (node.id for node in project.nodes if node.type == "PreviewDisplay" and measure_node(node.id) is not None),
+    None,
+  )
+  if output_id is None:
+    return None
+
+  plan = graph.plan()
+  order = plan.upstream([output_id])
+  sizes = {node_id: size for node_id in order if (size := measure_node(node_id)) is not None}
+  regions: dict[str, RegionBox] = {output_id: viewport}
+
+  def require(node_id: str | None, region: RegionBox) -> None:
+    if node_id is not None and node_id in sizes:
+      width, height = sizes[node_id]
+      clamped = clamp_region(region, width, height) or (0, 0, width, height)
+      regions[node_id] = union_regions(regions.get(node_id), clamped)
+
+  # Consumers come before their inputs in reverse topological order, so each node sees every request first.
+  for node_id in reversed(order):
+    region = regions.get(node_id)
+    node = node_map[node_id]
+    if region is None or node.type == "MediaInput":
+      continue
+    parent = plan.single_input(node_id)
+    if node.type == "ContrastAdjust":
+      # Contrast pivots on the mean of the whole frame.
+      require(parent, (0, 0, *sizes.get(parent or "", (0, 0))))
+    elif node.type == "Crop":
+      parent_size = sizes.get(parent or "")
+      crop_box = compute_crop_box(parent_size[0], parent_size[1], node.params or {}) if parent_size else None
+      offset_x, offset_y = (crop_box[0], crop_box[1]) if crop_box else (0, 0)
+      require(parent, (region[0] + offset_x, region[1] + offset_y, region[2] + offset_x, region[3] + offset_y))
+    elif node.type == "Resize":
+      if parent in sizes:
+        require(parent, map_region_through_resize(region, sizes[parent], sizes[node_id]))
+    elif node.type == "Blend":
+      primary = plan.named_input(node_id, "primary") or parent
+      secondary = plan.named_input(node_id, "secondary")
+      require(primary, region)
+      if secondary in sizes and primary in sizes:
+        if sizes[secondary] == sizes[primary]:
+          require(secondary, region)
+        else:
+          require(secondary, map_region_through_resize(region, sizes[secondary], sizes[primary]))
+    else:
+      require(parent, region)
+  return regions, sizes
+
+
+class SignatureScope(NamedTuple):
+  regions: dict[str, RegionBox]
+  sizes: dict[str, tuple[int, int]]
+  resolve: Callable[[str], str | None]
+
+
+def create_signature_scope(
+  project: ProjectPayload,
+  scale: float,
+  graph: GraphIndex,
+  viewport: RegionBox | None = None,
+  frame: int | None = None,
+) -> SignatureScope:
+  node_map = graph.node_map
+  asset_index = graph.asset_index
+  region_plan = plan_region_of_interest(project, graph, viewport) if viewport is not None else None
+  regions, sizes = region_plan if region_plan is not None else ({}, {})
+  memo_key = (scale, viewport) if region_plan is not None else scale
+  signatures = graph.signature_memo(memo_key if frame is None else (memo_key, frame))
+  plan = graph.plan()
+
+  def resolve_signature(node_id: str) -> str | None:
+    if node_id not in signatures:
+      for pending_id in plan.upstream([node_id], known=signatures):
+        if pending_id not in signatures:
+          signatures[pending_id] = compute_node_signature(node_map[pending_id])
+    return signatures.get(node_id)
+
+  def compute_node_signature(node: ProjectNode) -> str:
+    node_id = node.id
+    upstream = {key: signatures.get(source) for key, source in plan.inputs[node_id].items()}
+    payload: dict[str, Any] = {
+      "type": node.type,
+      "params": normalize_cache_value(node.params or {}),
+      "inputs": upstream,
+      "scale": scale,
+    }
+    if node.type == "MediaInput":
+      payload["source"] = describe_media_source(project, node, asset_index)
+      if frame is not None and is_video_media_node(node, asset_index):
+        payload["frame"] = frame
+    region = regions.get(node_id)
+    if region is not None and region != (0, 0, *sizes[node_id]):
+      payload["region"] = list(region)
+    return compute_signature(payload)
+
+  return SignatureScope(regions, sizes, resolve_signature)
+
+
+def create_graph_evaluator(
+  project: ProjectPayload,
+  scale: float,
+  graph: GraphIndex,
+  observer: GraphObserver | None = None,
+  timings: RenderTimings | None = None,
+  viewport: RegionBox | None = None,
+  frame: int | None = None,
+  strict_inputs: frozenset[str] = frozenset(),
+) -> Callable[[list[str]], dict[str, Image.Image | None]]:
+  node_map = graph.node_map
+  asset_index = graph.asset_index
+  image_cache: dict[str, Image.Image | None] = {}
+  regions, sizes, resolve_signature = create_signature_scope(project, scale, graph, viewport, frame)
+  announced: set[str] = set()
+  progress = {"total": 0, "done": 0}
+  started_at = time.perf_counter()
+  progress_lock = threading.Lock()
+  plan = graph.plan()
+  # Time spent in nested resolve_node calls, subtracted so node timings are exclusive.
+  clock = threading.local()
+
+  def announce(output_ids: list[str]) -> None:
+    if observer is None:
+      return
+    for node_id in plan.upstream(output_ids, known=announced):
+      if node_id in announced:
+        continue
+      announced.add(node_id)
+      with progress_lock:
+        progress["total"] += 1
+      observer("graph:queued", {"nodeId": node_id})
+
+  def notify_started(node_id: str) -> None:
+    if observer is None:
+      return
+    with progress_lock:
+      done, total = progress["done"], max(progress["total"], 1)
+    elapsed = time.perf_counter() - started_at
+    eta = round(elapsed / done * (total - done), 3) if done else None
+    observer("graph:progress", {"nodeId": node_id, "progress": int(done * 100 / total), "etaSec": eta})
+
+  def notify_completed(node_id: str, signature: str | None, cached: bool, **extra: Any) -> None:
+    if observer is None:
+      return
+    with progress_lock:
+      progress["done"] += 1
+    outputs = [f"memory:{signature}"] if signature else []
+    observer("graph:completed", {"nodeId": node_id, "outputs": outputs, "cached": cached, **extra})
+
+  def resolve_input_image(node: ProjectNode, key: str) -> Image.Image | None:
+    target_id = plan.named_input(node.id, key)
+    return resolve_node(target_id) if target_id else None
+
+  def plan_color_chain(node: ProjectNode) -> tuple[list[ProjectNode], str | None]:
+    chain = [node]
+    parent = plan.single_input(node.id)
+    while parent is not None and parent not in image_cache:
+      parent_node = node_map.get(parent)
+      if parent_node is None or parent_node.type not in COLOR_NODE_TYPES or graph.consumer_count(parent) != 1:
+        break
+      parent_signature = resolve_signature(parent)
+      if parent_signature is not None and NODE_RESULT_CACHE.contains(parent_signature):
+        break
+      chain.insert(0, parent_node)
+      parent = plan.single_input(parent)
+    return chain, parent
+
+  def resolve_node(node_id: str) -> Image.Image | None:
+    if node_id in image_cache:
+      return image_cache[node_id]
+    node = node_map.get(node_id)
+    if node is None:
+      return None
+    cacheable = node.type != "PreviewDisplay"
+    signature = resolve_signature(node_id) if cacheable else None
+    if signature is not None:
+      cached_image = NODE_RESULT_CACHE.get(signature)
+      if cached_image is not None:
+        image_cache[node_id] = cached_image
+        notify_completed(node_id, signature, True)
+        return cached_image
+    notify_started(node_id)
+    node_started = time.perf_counter()
+    outer_children = getattr(clock, "children", 0.0)
+    clock.children = 0.0
+    base_image: Image.Image | None = None
+    if node.type == "MediaInput":
+      base_image = load_media_image(
+        project, node, asset_index, scale, regions.get(node_id), frame, strict=node_id in strict_inputs
+      )
+    elif node.type in COLOR_NODE_TYPES:
+      chain, parent = plan_color_chain(node)
       parent_image = resolve_node(parent) if parent else None
       if parent_image is not None:
-        base_image = parent_image.copy()
-        params = node.params or {}
-        if node.type == "ExposureAdjust":
-          exposure_value = parse_float(params.get("exposure"))
-          exposure = max(min(exposure_value if exposure_value is not None else 0.0, 4.0), -4.0)
-          factor = 2 ** exposure
-          base_image = ImageEnhance.Brightness(base_image).enhance(factor)
-        elif node.type == "ContrastAdjust":
-          contrast_value = parse_float(params.get("contrast"))
-          contrast = max(min(contrast_value if contrast_value is not None else 1.0, 4.0), 0.0)
-          base_image = ImageEnhance.Contrast(base_image).enhance(contrast)
-        elif node.type == "SaturationAdjust":
-          saturation_value = parse_float(params.get("saturation"))
-          saturation = max(min(saturation_value if saturation_value is not None else 1.0, 4.0), 0.0)
-          base_image = ImageEnhance.Color(base_image).enhance(saturation)
+        base_image = apply_color_operations(parent_image, [extract_color_operation(item) for item in chain])
+        if node_id in regions and parent in regions:
+          base_image = crop_to_region(base_image, regions[parent], regions[node_id], scale)
+      for fused_node in chain[:-1]:
+        notify_completed(fused_node.id, None, False, fusedInto=node_id)
     elif node.type == "Resize":
-      parent = resolve_single_input(node)
+      parent = plan.single_input(node.id)
       parent_image = resolve_node(parent) if parent else None
-      if parent_image is not None:
-        params = node.params or {}
-        original_width, original_height = parent_image.size
-        keep_aspect = bool(params.get("keepAspectRatio", True))
-        scale_value = parse_float(params.get("scale"))
-        width_value = parse_int(params.get("width"))
-        height_value = parse_int(params.get("height"))
-
-        target_width = original_width
-        target_height = original_height
-
-        if scale_value is not None and scale_value > 0:
-          target_width = max(int(round(original_width * scale_value)), 1)
-          target_height = max(int(round(original_height * scale_value)), 1)
-        else:
-          if width_value is not None and width_value > 0:
-            target_width = width_value
-          if height_value is not None and height_value > 0:
-            target_height = height_value
-
-          if keep_aspect:
-            if width_value is None and height_value is not None and height_value > 0:
-              target_width = max(int(round(original_width * (target_height / original_height))), 1)
-            elif height_value is None and width_value is not None and width_value > 0:
-              target_height = max(int(round(original_height * (target_width / original_width))), 1)
-            elif width_value is not None and height_value is not None and width_value > 0 and height_value > 0:
-              ratio_w = width_value / original_width
-              ratio_h = height_value / original_height
-              if ratio_w < ratio_h:
-                target_height = max(int(round(original_height * ratio_w)), 1)
-                target_width = max(width_value, 1)
-              else:
-                target_width = max(int(round(original_width * ratio_h)), 1)
-                target_height = max(height_value, 1)
-
-        target_width = max(target_width, 1)
-        target_height = max(target_height, 1)
-        base_image = parent_image.resize((target_width, target_height), RESAMPLE_LANCZOS)
+      if parent_image is not None and node_id in regions and parent in regions:
+        base_image = resize_region(parent_image, regions[parent], regions[node_id], sizes[parent], sizes[node_id], scale)
+      elif parent_image is not None:
+        target_size = compute_resize_dimensions(parent_image.width, parent_image.height, node.params or {}, scale)
+        base_image = parent_image.resize(target_size, RESAMPLE_LANCZOS)
     elif node.type == "Crop":
-      parent = resolve_single_input(node)
+      parent = plan.single_input(node.id)
       parent_image = resolve_node(parent) if parent else None
-      if parent_image is not None:
-        params = node.params or {}
-        origin_x = max(parse_int(params.get("x")) or 0, 0)
-        origin_y = max(parse_int(params.get("y")) or 0, 0)
-        width_value = parse_int(params.get("width")) or parent_image.width
-        height_value = parse_int(params.get("height")) or parent_image.height
-        width_value = max(width_value, 1)
-        height_value = max(height_value, 1)
-        right = min(origin_x + width_value, parent_image.width)
-        bottom = min(origin_y + height_value, parent_image.height)
-        origin_x = min(origin_x, parent_image.width - 1)
-        origin_y = min(origin_y, parent_image.height - 1)
-        if right <= origin_x or bottom <= origin_y:
+      if parent_image is not None and node_id in regions and parent in regions:
+        crop_box = compute_crop_box(sizes[parent][0], sizes[parent][1], node.params or {})
+        offset_x, offset_y = (crop_box[0], crop_box[1]) if crop_box else (0, 0)
+        region = regions[node_id]
+        wanted = (region[0] + offset_x, region[1] + offset_y, region[2] + offset_x, region[3] + offset_y)
+        base_image = crop_to_region(parent_image, regions[parent], wanted, scale)
+      elif parent_image is not None:
+        crop_box = compute_crop_box(parent_image.width, parent_image.height, node.params or {}, scale)
+        if crop_box is None:
           base_image = parent_image.copy()
         else:
-          base_image = parent_image.crop((origin_x, origin_y, right, bottom))
+          base_image = parent_image.crop(crop_box)
     elif node.type == "Blend":
+      primary_id = plan.named_input(node.id, "primary")
+      secondary_id = plan.named_input(node.id, "secondary")
       primary_image = resolve_input_image(node, "primary")
       secondary_image = resolve_input_image(node, "secondary")
       if primary_image is None:
-        fallback_parent = resolve_single_input(node)
-        primary_image = resolve_node(fallback_parent) if fallback_parent else None
+        primary_id = plan.single_input(node.id)
+        primary_image = resolve_node(primary_id) if primary_id else None
       if primary_image is not None and secondary_image is not None:
         params = node.params or {}
         alpha_value = parse_float(params.get("alpha"))
         alpha = alpha_value if alpha_value is not None else 0.5
         alpha = min(max(alpha, 0.0), 1.0)
+        region = regions.get(node_id)
+        if region is not None and primary_id in regions and secondary_id in regions:
+          primary_image = crop_to_region(primary_image, regions[primary_id], region, scale)
+          if sizes[secondary_id] == sizes[primary_id]:
+            secondary_image = crop_to_region(secondary_image, regions[secondary_id], region, scale)
+          else:
+            secondary_image = resize_region(
+              secondary_image, regions[secondary_id], region, sizes[secondary_id], sizes[primary_id], scale
+            )
         if secondary_image.size != primary_image.size:
           secondary_image = secondary_image.resize(primary_image.size, RESAMPLE_LANCZOS)
         base_image = Image.blend(primary_image.convert("RGB"), secondary_image.convert("RGB"), alpha)
     elif node.type == "PreviewDisplay":
-      parent = resolve_single_input(node)
+      parent = plan.single_input(node.id)
       parent_image = resolve_node(parent) if parent else None
-      if parent_image is not None:
+      if parent_image is not None and node_id in regions and parent in regions:
+        base_image = crop_to_region(parent_image, regions[parent], regions[node_id], scale)
+      elif parent_image is not None:
         base_image = parent_image
-    if base_image is not None:
-      image_cache[node_id] = base_image
+    image_cache[node_id] = base_image
+    if base_image is not None and signature is not None:
+      NODE_RESULT_CACHE.put(signature, base_image)
+    node_elapsed = (time.perf_counter() - node_started) * 1000.0
+    if timings is not None:
+      timings.add_node(node.type, node_elapsed - clock.children, node_id)
+    clock.children = outer_children + node_elapsed
+    notify_completed(node_id, signature if base_image is not None else None, False)
     return base_image
 
+  def dependencies_of(node_id: str) -> list[str]:
+    # Mirrors the inputs resolve_node reads, so nodes run in this order never recurse.
+    node = node_map.get(node_id)
+    if node is None or node_id in image_cache:
+      return []
+    if node.type != "PreviewDisplay":
+      signature = resolve_signature(node_id)
+      if signature is not None and NODE_RESULT_CACHE.contains(signature):
+        return []
+    if node.type in COLOR_NODE_TYPES:
+      parent = plan_color_chain(node)[1]
+      return [parent] if parent else []
+    if node.type in ("Resize", "Crop", "PreviewDisplay"):
+      parent = plan.single_input(node.id)
+      return [parent] if parent else []
+    if node.type == "Blend":
+      primary = plan.named_input(node.id, "primary")
+      secondary = plan.named_input(node.id, "secondary")
+      if primary is None:
+        primary = plan.single_input(node.id)
+      return [item for item in dict.fromkeys((primary, secondary)) if item is not None]
+    return []
+
+  def schedule(output_ids: list[str]) -> None:
+    dependencies: dict[str, list[str]] = {}
+    pending = list(output_ids)
+    while pending:
+      node_id = pending.pop()
+      if node_id in dependencies:
+        continue
+      dependencies[node_id] = [item for item in dependencies_of(node_id) if item in node_map]
+      pending.extend(dependencies[node_id])
+    dependents: dict[str, list[str]] = {}
+    for node_id, inputs in dependencies.items():
+      for input_id in inputs:
+        dependents.setdefault(input_id, []).append(node_id)
+    ready = [node_id for node_id, inputs in dependencies.items() if not inputs]
+    remaining = {node_id: len(inputs) for node_id, inputs in dependencies.items()}
+    if GRAPH_WORKERS <= 1 or (len(ready) <= 1 and all(len(inputs) <= 1 for inputs in dependencies.values())):
+      # Outputs are preview nodes, so their dependencies all sit on the plan's topologically sorted live order.
+      for node_id in plan.order:
+        if node_id in dependencies:
+          resolve_node(node_id)
+      return
+    running = {GRAPH_EXECUTOR.submit(resolve_node, node_id): node_id for node_id in ready}
+    try:
+      while running:
+        done, _ = wait(running, return_when=FIRST_COMPLETED)
+        for future in done:
+          node_id = running.pop(future)
+          future.result()
+          for dependent in dependents.get(node_id, ()):
+            remaining[dependent] -= 1
+            if remaining[dependent] == 0:
+              running[GRAPH_EXECUTOR.submit(resolve_node, dependent)] = dependent
+    finally:
+      for future in running:
+        future.cancel()
+
+  def resolve_outputs(output_ids: list[str]) -> dict[str, Image.Image | None]:
+    announce(output_ids)
+    schedule(output_ids)
+    return {node_id: resolve_node(node_id) for node_id in output_ids}
+
+  return resolve_outputs
+
+
+def build_image_from_graph(
+  project: ProjectPayload,
+  scale: float = 1.0,
+  graph: GraphIndex | None = None,
+  observer: GraphObserver | None = None,
+  timings: RenderTimings | None = None,
+  viewport: RegionBox | None = None,
+  frame: int | None = None,
+) -> Image.Image:
+  graph = graph or GraphIndex(project)
+  resolve_outputs = create_graph_evaluator(project, scale, graph, observer, timings, viewport, frame)
   preview_nodes = [node for node in project.nodes if node.type == "PreviewDisplay"]
   for preview_node in preview_nodes:
-    image = resolve_node(preview_node.id)
+    image = resolve_outputs([preview_node.id])[preview_node.id]
     if image is not None:
       return image.convert("RGB")
 
   # fallback to first media input if preview missing
   for node in project.nodes:
     if node.type == "MediaInput":
-      return load_media_image(project, node, asset_map)
-  return Image.new("RGB", (1920, 1080), "#333333")
+      return load_media_image(project, node, graph.asset_index, scale, frame=frame)
+  return Image.new("RGB", (scale_pixel_value(1920, scale), scale_pixel_value(1080, scale)), "#333333")
 
 
-def overlay_preview_metadata(
-  image: Image.Image,
+def build_preview_hud(
   source_width: int,
   source_height: int,
   proxy_decision: ProxyDecision,
   project: ProjectPayload,
-) -> Image.Image:
-  draw = ImageDraw.Draw(image)
-  font = ImageFont.load_default()
-  width, height = image.size
+  render_ms: float | None = None,
+) -> PreviewHud:
   fps = project.projectFps if isinstance(project.projectFps, (int, float)) else 30
   reason_labels = {
     "client_force_on": "Renderer override (ON)",
     "client_force_off": "Renderer override (OFF)",
     "project_metadata_on": "Project setting (enabled)",
     "project_metadata_off": "Project setting (disabled)",
-    "resolution_4k": "Auto: ≥4K safeguard",
-    "resolution_qhd": "Auto: ≥1440p safeguard",
     "historical_delay": "Auto: latency exceeded",
-    "auto": "Auto baseline",
+    "cost_model": "Auto: render cost model",
+    "viewport_zoom": "Viewport zoom",
   }
   proxy_scale_label = f"{proxy_decision.scale:.2f}x"
   proxy_reason = reason_labels.get(proxy_decision.reason, proxy_decision.reason)
@@ -551,13 +2947,19 @@ def overlay_preview_metadata(
     if proxy_decision.average_delay_ms is not None
     else None
   )
+  p95_delay_label = (
+    f"P95 Delay: {proxy_decision.p95_delay_ms:.1f}ms"
+    if proxy_decision.p95_delay_ms is not None
+    else None
+  )
   info_lines = [
     "NodeVision Preview",
     f"Source: {source_width}x{source_height}",
     f"Proxy: {'ON' if proxy_decision.enabled else 'OFF'} ({proxy_scale_label})",
     f"Reason: {proxy_reason}",
   ]
-  pipeline_summary = ", ".join(node.type for node in project.nodes[:6])
+  pipeline = [node.type for node in project.nodes]
+  pipeline_summary = ", ".join(pipeline[:6])
   if len(project.nodes) > 6:
     pipeline_summary += ", …"
   info_lines.append(f"Nodes: {len(project.nodes)}")
@@ -567,11 +2969,33 @@ def overlay_preview_metadata(
     info_lines.append(target_delay_label)
   if avg_delay_label:
     info_lines.append(avg_delay_label)
+  if p95_delay_label:
+    info_lines.append(p95_delay_label)
+  if proxy_decision.predicted_render_ms is not None:
+    render_label = f"Render: pred {proxy_decision.predicted_render_ms:.1f}ms"
+    if render_ms is not None:
+      render_label += f" / actual {render_ms:.1f}ms"
+    info_lines.append(render_label)
+  info_lines.append(f"FPS: {fps}")
+  return PreviewHud(
+    title=info_lines[0], fps=fps, nodeCount=len(project.nodes), pipeline=pipeline, lines=info_lines[1:]
+  )
+
+
+def overlay_preview_metadata(
+  image: Image.Image,
+  source_width: int,
+  source_height: int,
+  proxy_decision: ProxyDecision,
+  project: ProjectPayload,
+  render_ms: float | None = None,
+) -> Image.Image:
+  draw = ImageDraw.Draw(image)
+  font = ImageFont.load_default()
+  width, height = image.size
+  hud = build_preview_hud(source_width, source_height, proxy_decision, project, render_ms)
   tokyo_now = datetime.now(ZoneInfo("Asia/Tokyo"))
-  info_lines.extend([
-    f"FPS: {fps}",
-    tokyo_now.strftime("%Y-%m-%d %H:%M:%S%z"),
-  ])
+  info_lines = [hud.title, *hud.lines, tokyo_now.strftime("%Y-%m-%d %H:%M:%S%z")]
   line_height = 18
   padding = 12
   overlay_height = min(height, max(line_height * len(info_lines) + padding * 2, 96))
@@ -586,10 +3010,340 @@ def overlay_preview_metadata(
   return image
 
 
-def encode_image_base64(image: Image.Image) -> str:
-  buffer = BytesIO()
-  image.save(buffer, format="PNG")
-  return b64encode(buffer.getvalue()).decode("ascii")
+def encode_image(image: Image.Image, image_format: str = "png", quality: int | None = None) -> bytes:
+  buffer = BytesIO()
+  if image_format == "jpeg":
+    image.save(buffer, format="JPEG", quality=quality or 85)
+  elif image_format == "webp":
+    image.save(buffer, format="WEBP", quality=quality or 80, method=0)
+  else:
+    image.save(buffer, format="PNG")
+  return buffer.getvalue()
+
+
+def encode_image_base64(image: Image.Image) -> str:
+  return b64encode(encode_image(image, "png")).decode("ascii")
+
+
+def negotiate_preview_format(requested: str | None, accept: str | None) -> str:
+  if requested in PREVIEW_MEDIA_TYPES:
+    return requested
+  accepted = {part.split(";", 1)[0].strip().lower() for part in (accept or "").split(",")}
+  for image_format in ("webp", "jpeg", "png"):
+    if PREVIEW_MEDIA_TYPES[image_format] in accepted:
+      return image_format
+  return "jpeg"
+
+
+class SessionPatchError(ValueError):
+  pass
+
+
+class GraphSession:
+  def __init__(self, session_id: str, project: ProjectPayload) -> None:
+    self.session_id = session_id
+    self.project = project
+    self.graph = GraphIndex(project)
+    self.graph.refresh_media_sources()
+    self.revision = 0
+    self.events: deque[GraphEvent] = deque(maxlen=SESSION_EVENT_HISTORY)
+    self.next_sequence = 1
+    self.listeners: list[Callable[[GraphEvent], None]] = []
+    self.prefetch_job: ScrubPrefetchJob | None = None
+    self.lock = threading.Lock()
+
+  def subscribe(self, listener: Callable[[GraphEvent], None]) -> None:
+    with self.lock:
+      self.listeners.append(listener)
+
+  def unsubscribe(self, listener: Callable[[GraphEvent], None]) -> None:
+    with self.lock:
+      if listener in self.listeners:
+        self.listeners.remove(listener)
+
+  def emit(self, event: str, payload: dict[str, Any]) -> GraphEvent:
+    with self.lock:
+      record = GraphEvent(sequence=self.next_sequence, event=event, payload=payload)
+      self.next_sequence += 1
+      self.events.append(record)
+      listeners = list(self.listeners)
+    for listener in listeners:
+      listener(record)
+    return record
+
+  def snapshot(self) -> tuple[ProjectPayload, GraphIndex]:
+    with self.lock:
+      return self.project, self.graph
+
+  def cancel_prefetch(self) -> None:
+    with self.lock:
+      job, self.prefetch_job = self.prefetch_job, None
+    if job is not None:
+      job.cancel()
+
+  def refresh_media(self) -> list[GraphEvent]:
+    with self.lock:
+      graph = self.graph
+    affected = graph.refresh_media_sources()
+    if affected:
+      self.cancel_prefetch()
+    return [self.emit("cache:invalidated", {"nodeId": node_id, "reason": "sourceChanged"}) for node_id in affected]
+
+  def apply(self, operations: list[SessionPatchOperation], base_revision: int | None) -> tuple[list[str], list[GraphEvent]]:
+    with self.lock:
+      if base_revision is not None and base_revision != self.revision:
+        raise SessionPatchError(f"revision mismatch: session is at {self.revision}, patch targets {base_revision}")
+      nodes = list(self.project.nodes)
+      edges = list(self.project.edges)
+      graph = self.graph.fork(self.project)
+      changes: list[tuple[str, str]] = []
+      for operation in operations:
+        changes.extend(apply_session_operation(graph, nodes, edges, operation))
+      project = self.project.model_copy(update={"nodes": nodes, "edges": edges})
+      graph.project = project
+      try:
+        graph.plan()
+      except GraphValidationError as error:
+        raise SessionPatchError(str(error)) from error
+      self.project = project
+      invalidated: list[str] = []
+      reasons: dict[str, str] = {}
+      for node_id, reason in changes:
+        for affected in graph.invalidate([node_id]):
+          if affected not in reasons:
+            invalidated.append(affected)
+            reasons[affected] = reason if affected == node_id else "upstreamChanged"
+      self.graph = graph
+      self.revision += 1
+    self.cancel_prefetch()
+    events = [
+      self.emit("cache:invalidated", {"nodeId": node_id, "reason": reasons[node_id]})
+      for node_id in invalidated
+    ]
+    return invalidated, events
+
+
+def replace_session_node(graph: GraphIndex, nodes: list[ProjectNode], updated: ProjectNode) -> None:
+  previous = graph.node_map[updated.id]
+  for index, node in enumerate(nodes):
+    if node.id == updated.id:
+      nodes[index] = updated
+      break
+  graph.unlink_inputs(previous)
+  graph.node_map[updated.id] = updated
+  graph.link_inputs(updated)
+
+
+def apply_session_operation(
+  graph: GraphIndex,
+  nodes: list[ProjectNode],
+  edges: list[ProjectEdge],
+  operation: SessionPatchOperation,
+) -> list[tuple[str, str]]:
+  if operation.op == "addNode":
+    if operation.node is None:
+      raise SessionPatchError("addNode requires 'node'")
+    if operation.node.id in graph.node_map:
+      raise SessionPatchError(f"node '{operation.node.id}' already exists")
+    nodes.append(operation.node)
+    graph.node_map[operation.node.id] = operation.node
+    graph.link_inputs(operation.node)
+    return [(operation.node.id, "nodeAdded")]
+
+  if operation.op in {"addEdge", "removeEdge"}:
+    if operation.edge is None:
+      raise SessionPatchError(f"{operation.op} requires 'edge'")
+    target_id, _, handle = operation.edge.to.partition(":")
+    target = graph.node_map.get(target_id)
+    if target is None or not handle:
+      raise SessionPatchError(f"edge target '{operation.edge.to}' is not a known node handle")
+    inputs = dict(target.inputs or {})
+    if operation.op == "addEdge":
+      edges.append(operation.edge)
+      inputs[handle] = operation.edge.from_
+    else:
+      edges[:] = [edge for edge in edges if not (edge.from_ == operation.edge.from_ and edge.to == operation.edge.to)]
+      if inputs.get(handle) == operation.edge.from_:
+        inputs[handle] = None
+    replace_session_node(graph, nodes, target.model_copy(update={"inputs": inputs}))
+    return [(target_id, "edgeChanged")]
+
+  node = graph.node_map.get(operation.nodeId or "")
+  if node is None:
+    raise SessionPatchError(f"node '{operation.nodeId}' does not exist")
+
+  if operation.op == "removeNode":
+    nodes[:] = [item for item in nodes if item.id != node.id]
+    edges[:] = [
+      edge
+      for edge in edges
+      if edge.from_.split(":", 1)[0] != node.id and edge.to.split(":", 1)[0] != node.id
+    ]
+    graph.unlink_inputs(node)
+    del graph.node_map[node.id]
+    return [(node.id, "nodeRemoved")]
+
+  if not operation.key:
+    raise SessionPatchError(f"{operation.op} requires 'key'")
+  if operation.op == "setParam":
+    updated = node.model_copy(update={"params": {**(node.params or {}), operation.key: operation.value}})
+    reason = "paramChanged"
+  else:
+    if operation.value is not None and not isinstance(operation.value, str):
+      raise SessionPatchError("setInput expects a 'node:handle' string or null")
+    updated = node.model_copy(update={"inputs": {**(node.inputs or {}), operation.key: operation.value}})
+    reason = "inputChanged"
+  replace_session_node(graph, nodes, updated)
+  return [(node.id, reason)]
+
+
+class GraphSessionStore:
+  def __init__(self, max_sessions: int) -> None:
+    self.max_sessions = max_sessions
+    self._sessions: OrderedDict[str, GraphSession] = OrderedDict()
+    self._lock = threading.Lock()
+
+  def create(self, project: ProjectPayload) -> GraphSession:
+    session = GraphSession(uuid.uuid4().hex, project)
+    with self._lock:
+      self._sessions[session.session_id] = session
+      while len(self._sessions) > self.max_sessions:
+        self._sessions.popitem(last=False)
+    return session
+
+  def get(self, session_id: str) -> GraphSession | None:
+    with self._lock:
+      session = self._sessions.get(session_id)
+      if session is not None:
+        self._sessions.move_to_end(session_id)
+      return session
+
+  def remove(self, session_id: str) -> bool:
+    with self._lock:
+      session = self._sessions.pop(session_id, None)
+    if session is None:
+      return False
+    session.cancel_prefetch()
+    return True
+
+
+SESSION_STORE = GraphSessionStore(SESSION_MAX_COUNT)
+
+
+def plan_prefetch_frames(frame: int, direction: int, count: int, frame_count: int) -> list[int]:
+  # Frames in the scrub direction come first; the ones behind cover a reversal.
+  ahead = [frame + direction * step for step in range(1, count + 1)]
+  behind = [frame - direction * step for step in range(1, count + 1)]
+  return [target for target in ahead + behind if 0 <= target < frame_count]
+
+
+def count_graph_frames(graph: GraphIndex) -> int | None:
+  frame_counts: list[int] = []
+  for node in graph.node_map.values():
+    if node.type != "MediaInput":
+      continue
+    for path, file_stat in locate_media_files(node, graph.asset_index):
+      if not is_video_file(path):
+        continue
+      try:
+        frame_counts.append(read_video_seek_index(path, file_stat).frame_count)
+      except OSError:
+        continue
+      break
+  return max(frame_counts) if frame_counts else None
+
+
+def lower_thread_priority() -> None:
+  # Linux applies niceness per thread, so only the prefetch workers are deprioritised.
+  try:
+    os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), PREFETCH_NICE)
+  except (AttributeError, OSError):
+    pass
+
+
+class ScrubPrefetchJob:
+  def __init__(self, revision: int, frame: int, direction: int, targets: list[int]) -> None:
+    self.revision = revision
+    self.frame = frame
+    self.direction = direction
+    self.targets = targets
+    self.cancelled = threading.Event()
+    self.future: Future[None] | None = None
+
+  def cancel(self) -> None:
+    self.cancelled.set()
+
+
+class ScrubPrefetcher:
+  def __init__(self, frames_ahead: int, workers: int) -> None:
+    self.frames_ahead = frames_ahead
+    self.workers = workers
+    self._executor = ThreadPoolExecutor(
+      max_workers=workers, thread_name_prefix="nodevision-prefetch", initializer=lower_thread_priority
+    )
+    self._active: set[ScrubPrefetchJob] = set()
+    self._scheduled = 0
+    self._rendered = 0
+    self._cancelled = 0
+    self._lock = threading.Lock()
+
+  def schedule(self, session: GraphSession, frame: int, force_proxy: bool | None) -> ScrubPrefetchJob | None:
+    if self.frames_ahead <= 0:
+      return None
+    project, graph = session.snapshot()
+    frame_count = count_graph_frames(graph)
+    if frame_count is None:
+      return None
+    with session.lock:
+      previous = session.prefetch_job
+      direction = 1
+      if previous is not None and previous.revision == session.revision:
+        direction = previous.direction if frame == previous.frame else (1 if frame > previous.frame else -1)
+      targets = plan_prefetch_frames(frame, direction, self.frames_ahead, frame_count)
+      job = ScrubPrefetchJob(session.revision, frame, direction, targets)
+      session.prefetch_job = job
+    if previous is not None:
+      previous.cancel()
+    with self._lock:
+      self._active.add(job)
+      self._scheduled += len(job.targets)
+    job.future = self._executor.submit(self.run, job, project, graph, force_proxy)
+    return job
+
+  def run(self, job: ScrubPrefetchJob, project: ProjectPayload, graph: GraphIndex, force_proxy: bool | None) -> None:
+    rendered = 0
+    try:
+      # Same scale decision as the interactive preview, so its node signatures match what was cached here.
+      _, _, proxy_decision, _, _ = decide_preview_proxy(project, force_proxy, graph)
+      scale = proxy_decision.scale if proxy_decision.enabled else 1.0
+      for target in job.targets:
+        while RENDER_POOL.busy() and not job.cancelled.is_set():
+          job.cancelled.wait(PREFETCH_YIELD_SEC)
+        if job.cancelled.is_set():
+          break
+        build_image_from_graph(project, scale, graph, frame=target)
+        rendered += 1
+    except (GraphValidationError, OSError, ValueError):
+      pass
+    finally:
+      with self._lock:
+        self._active.discard(job)
+        self._rendered += rendered
+        self._cancelled += len(job.targets) - rendered
+
+  def stats(self) -> PrefetchStats:
+    with self._lock:
+      return PrefetchStats(
+        framesAhead=self.frames_ahead,
+        workers=self.workers,
+        active=len(self._active),
+        scheduled=self._scheduled,
+        rendered=self._rendered,
+        cancelled=self._cancelled,
+      )
+
+
+SCRUB_PREFETCHER = ScrubPrefetcher(PREFETCH_FRAMES, PREFETCH_WORKERS)
 
 
 NODE_CATALOG: list[NodeCatalogItem] = [
@@ -723,6 +3477,47 @@ NODE_CATALOG: list[NodeCatalogItem] = [
 
 app = FastAPI(title="NodeVision Editor Backend Prototype", version=BACKEND_VERSION)
 
+JsonBodyModel = TypeVar("JsonBodyModel", bound=BaseModel)
+JSON_BODY_MODELS: list[type[BaseModel]] = []
+
+
+def json_body(model: type[JsonBodyModel]) -> Callable[[Request], Awaitable[JsonBodyModel]]:
+  # Project-carrying bodies are validated from the raw bytes in pydantic-core, skipping the dict tree
+  # FastAPI would build with json.loads first; errors keep FastAPI's 422 shape.
+  JSON_BODY_MODELS.append(model)
+
+  async def parse(request: Request) -> JsonBodyModel:
+    try:
+      return model.model_validate_json(await request.body())
+    except ValidationError as error:
+      raise RequestValidationError(
+        [{**issue, "loc": ("body", *issue["loc"])} for issue in error.errors(include_url=False)]
+      ) from error
+
+  return parse
+
+
+def json_body_openapi(model: type[BaseModel]) -> dict[str, Any]:
+  schema = {"$ref": f"#/components/schemas/{model.__name__}"}
+  return {"requestBody": {"required": True, "content": {"application/json": {"schema": schema}}}}
+
+
+default_openapi = app.openapi
+
+
+def build_openapi_schema() -> dict[str, Any]:
+  if app.openapi_schema is None:
+    schemas = default_openapi().setdefault("components", {}).setdefault("schemas", {})
+    for model in JSON_BODY_MODELS:
+      definition = model.model_json_schema(ref_template="#/components/schemas/{model}")
+      for name, nested in definition.pop("$defs", {}).items():
+        schemas.setdefault(name, nested)
+      schemas.setdefault(model.__name__, definition)
+  return app.openapi_schema
+
+
+app.openapi = build_openapi_schema  # type: ignore[method-assign]
+
 
 def normalize_project_slot(raw_slot: str | None, default: str = DEFAULT_PROJECT_SLOT) -> str:
   candidate = (raw_slot or default).strip()
@@ -746,7 +3541,26 @@ async def get_info() -> InfoResponse:
     name="NodeVision Editor Backend Prototype",
     description="Electron IPC 経由で疎通確認するための最小 API",
     backendVersion=BACKEND_VERSION,
-    endpoints=["/health", "/info", "/nodes/catalog", "/projects/save", "/projects/load"],
+    endpoints=[
+      "/health",
+      "/info",
+      "/nodes/catalog",
+      "/projects/save",
+      "/projects/load",
+      "/preview/generate",
+      "/preview/render",
+      "/preview/batch",
+      "/preview/stats",
+      "/preview/latency",
+      "/assets/hash",
+      "/assets/proxies",
+      "/metrics",
+      "/sessions",
+      "/sessions/{session_id}",
+      "/sessions/{session_id}/patch",
+      "/sessions/{session_id}/preview",
+      "/sessions/{session_id}/ws",
+    ],
   )
 
 
@@ -755,59 +3569,858 @@ async def get_node_catalog() -> list[NodeCatalogItem]:
   return NODE_CATALOG
 
 
-@app.post("/projects/save", response_model=ProjectSaveResponse, summary="プロジェクト保存")
-async def post_project_save(request: ProjectSaveRequest) -> ProjectSaveResponse:
+@app.post(
+  "/projects/save",
+  response_model=ProjectSaveResponse,
+  summary="プロジェクト保存",
+  openapi_extra=json_body_openapi(ProjectSaveRequest),
+)
+async def post_project_save(request: ProjectSaveRequest = Depends(json_body(ProjectSaveRequest))) -> ProjectSaveResponse:
   slot = normalize_project_slot(request.slot, DEFAULT_PROJECT_SLOT)
-  path = write_project(request.project, slot)
+  revision: int | None = None
+  if request.journal:
+    path, revision = await asyncio.to_thread(append_project_journal, request.project, slot)
+  else:
+    path = await asyncio.to_thread(write_project, request.project, slot)
+  await asyncio.to_thread(schedule_asset_jobs, request.project)
   summary = summarize_project(request.project)
-  return ProjectSaveResponse(slot=slot, path=str(path), summary=summary)
+  return ProjectSaveResponse(slot=slot, path=str(path), summary=summary, revision=revision)
+
+
+@app.post(
+  "/preview/generate",
+  response_model=PreviewResponse,
+  summary="プレビュー生成",
+  openapi_extra=json_body_openapi(PreviewGenerateRequest),
+)
+async def post_preview_generate(
+  response: Response,
+  request: PreviewGenerateRequest = Depends(json_body(PreviewGenerateRequest)),
+  if_none_match: str | None = Header(default=None),
+) -> PreviewResponse | Response:
+  try:
+    # Planning hashes the graph and measures its sources, so it is admitted like a render; a full queue answers 503.
+    # The body also carries timings and a timestamp, so the tag is always weak.
+    graph, plan, etag = await RENDER_POOL.run_local(
+      plan_cacheable_preview,
+      request.project,
+      request.forceProxy,
+      request.viewport,
+      request.frame,
+      request.overlay,
+      {"format": "png"},
+      True,
+    )
+    if etag_matches(if_none_match, etag):
+      return build_not_modified_response(etag)
+    preview, sample, timings = await RENDER_POOL.run(
+      render_preview,
+      request.project,
+      request.forceProxy,
+      graph,
+      request.includeTimings,
+      request.viewport,
+      request.frame,
+      request.overlay,
+      plan,
+    )
+  except RenderPoolBusyError as error:
+    raise build_render_busy_error(error) from error
+  except GraphValidationError as error:
+    raise build_graph_validation_error(error) from error
+  ENCODER_STATS.record(sample)
+  observe_render_timings(timings)
+  response.headers["Server-Timing"] = timings.server_timing()
+  response.headers["ETag"] = etag
+  response.headers["Cache-Control"] = PREVIEW_CACHE_CONTROL
+  return preview
+
+
+def build_graph_validation_error(error: GraphValidationError) -> HTTPException:
+  return HTTPException(
+    status_code=422,
+    detail={"message": "ノードグラフを評価できません。", "code": "E-NODE-VALIDATION", "cause": str(error)},
+  )
+
+
+def build_render_busy_error(error: RenderPoolBusyError) -> HTTPException:
+  return HTTPException(
+    status_code=503,
+    detail={"message": "プレビュー生成の待ち行列が上限に達しました。", "cause": str(error)},
+    headers={"Retry-After": "1"},
+  )
+
+
+def decide_preview_proxy(
+  project: ProjectPayload,
+  force_proxy: bool | None,
+  graph: GraphIndex,
+  viewport: PreviewViewport | None = None,
+) -> PreviewPlan:
+  source_width, source_height = measure_graph_output(project, graph)
+  cost_estimate = estimate_render_cost(project, graph)
+  viewport_box: RegionBox | None = None
+  if viewport is not None:
+    requested = (viewport.x, viewport.y, viewport.x + viewport.width, viewport.y + viewport.height)
+    viewport_box = clamp_region(requested, source_width, source_height)
+    if viewport_box == (0, 0, source_width, source_height):
+      viewport_box = None
+  if viewport_box is not None:
+    fraction = (viewport_box[2] - viewport_box[0]) * (viewport_box[3] - viewport_box[1]) / (source_width * source_height)
+    cost_estimate = cost_estimate._replace(node_ms={node_id: cost * fraction for node_id, cost in cost_estimate.node_ms.items()})
+  proxy_decision = compute_proxy_decision(project, source_width, source_height, force_proxy, cost_estimate)
+  render_scale = proxy_decision.scale if proxy_decision.enabled else 1.0
+  if viewport is not None and viewport.zoom < render_scale:
+    # Zoomed-out viewports never need more pixels than the panel displays.
+    proxy_decision = proxy_decision._replace(enabled=True, scale=viewport.zoom, reason="viewport_zoom", predicted_render_ms=None)
+    render_scale = viewport.zoom
+  if proxy_decision.predicted_render_ms is None:
+    proxy_decision = proxy_decision._replace(predicted_render_ms=RENDER_COST_MODEL.predict(cost_estimate, render_scale))
+  return PreviewPlan(source_width, source_height, proxy_decision, cost_estimate, viewport_box)
 
 
-@app.post("/preview/generate", response_model=PreviewResponse, summary="プレビュー生成")
-async def post_preview_generate(request: PreviewGenerateRequest) -> PreviewResponse:
-  project = request.project
-  base_image = build_image_from_graph(project).convert("RGB")
-  source_width, source_height = base_image.size
-  proxy_decision = compute_proxy_decision(project, source_width, source_height, request.forceProxy)
+def render_preview_image(
+  project: ProjectPayload,
+  force_proxy: bool | None,
+  graph: GraphIndex | None = None,
+  observer: GraphObserver | None = None,
+  timings: RenderTimings | None = None,
+  viewport: PreviewViewport | None = None,
+  frame: int | None = None,
+  overlay: str = "pixels",
+  plan: PreviewPlan | None = None,
+) -> RenderedPreview:
+  graph = graph or GraphIndex(project)
+  timings = timings if timings is not None else RenderTimings()
+  stage_started = time.perf_counter()
+  plan = plan or decide_preview_proxy(project, force_proxy, graph, viewport)
+  source_width, source_height, proxy_decision, cost_estimate, _ = plan
+  timings.add_stage("measure", (time.perf_counter() - stage_started) * 1000.0)
+  computed: set[str] = set()
+
+  def track(event: str, payload: dict[str, Any]) -> None:
+    if event == "graph:completed" and not payload.get("cached"):
+      computed.add(payload["nodeId"])
+    if observer is not None:
+      observer(event, payload)
 
   if proxy_decision.enabled:
+    render_scale = proxy_decision.scale
     target_width = max(int(round(source_width * proxy_decision.scale)), 1)
     target_height = max(int(round(source_height * proxy_decision.scale)), 1)
   else:
+    render_scale = 1.0
     target_width = source_width
     target_height = source_height
+  rendered_viewport: PreviewViewport | None = None
+  if viewport is not None:
+    region = plan.viewport or (0, 0, source_width, source_height)
+    target_width, target_height = region_pixel_size(region, render_scale, (source_width, source_height))
+    rendered_viewport = PreviewViewport(
+      x=region[0], y=region[1], width=region[2] - region[0], height=region[3] - region[1], zoom=viewport.zoom
+    )
 
-  if proxy_decision.enabled and (target_width != source_width or target_height != source_height):
-    preview_image = base_image.resize((target_width, target_height), RESAMPLE_LANCZOS)
+  render_started = time.perf_counter()
+  node_offset = len(timings.node_samples)
+  preview_image = build_image_from_graph(project, render_scale, graph, track, timings, plan.viewport, frame).convert("RGB")
+  graph_ms = (time.perf_counter() - render_started) * 1000.0
+  decode_ms = sum(elapsed for node_type, elapsed in timings.node_samples[node_offset:] if node_type == "MediaInput")
+  timings.add_stage("decode", decode_ms)
+  timings.add_stage("nodes", max(graph_ms - decode_ms, 0.0))
+  if preview_image.size != (target_width, target_height):
+    stage_started = time.perf_counter()
+    preview_image = preview_image.resize((target_width, target_height), RESAMPLE_LANCZOS)
+    timings.add_stage("resize", (time.perf_counter() - stage_started) * 1000.0)
+  render_ms = (time.perf_counter() - render_started) * 1000.0
+  predicted_ms = cost_estimate.predict(render_scale, computed)
+  if predicted_ms >= COST_MODEL_MIN_SAMPLE_MS:
+    timings.cost_samples.append((cost_estimate.graph_key, predicted_ms, render_ms))
+
+  stage_started = time.perf_counter()
+  hud: PreviewHud | None = None
+  if overlay == "metadata":
+    # Pixels stay a pure function of the graph, so identical requests give identical bytes.
+    hud = build_preview_hud(source_width, source_height, proxy_decision, project, render_ms)
   else:
-    preview_image = base_image
+    preview_image = overlay_preview_metadata(preview_image, source_width, source_height, proxy_decision, project, render_ms)
+  timings.add_stage("overlay", (time.perf_counter() - stage_started) * 1000.0)
+  generated_at = datetime.now(ZoneInfo("Asia/Tokyo")).isoformat()
+  return RenderedPreview(
+    preview_image, source_width, source_height, proxy_decision, generated_at, render_ms, rendered_viewport, frame, hud
+  )
+
+
+def compute_preview_etag(
+  project: ProjectPayload,
+  graph: GraphIndex,
+  plan: PreviewPlan,
+  frame: int | None,
+  variant: dict[str, Any],
+) -> str:
+  # Only what the client sent goes in: an adaptive proxy scale would change the tag whenever latency moves.
+  proxy_decision = plan.proxy_decision
+  pinned_scale: float | None = None
+  if proxy_decision.reason in PINNED_PROXY_REASONS:
+    pinned_scale = proxy_decision.scale if proxy_decision.enabled else 1.0
+  scope = create_signature_scope(project, pinned_scale or 1.0, graph, plan.viewport, frame)
+  output_ids = graph.plan().outputs or [node.id for node in project.nodes if node.type == "MediaInput"][:1]
+  payload = {
+    "version": BACKEND_VERSION,
+    "outputs": [scope.resolve(node_id) for node_id in output_ids],
+    "scale": pinned_scale,
+    "source": [plan.source_width, plan.source_height],
+    "viewport": list(plan.viewport) if plan.viewport is not None else None,
+    **variant,
+  }
+  return f'"{compute_signature(payload)[:32]}"'
+
+
+def plan_cacheable_preview(
+  project: ProjectPayload,
+  force_proxy: bool | None,
+  viewport: PreviewViewport | None,
+  frame: int | None,
+  overlay: str,
+  variant: dict[str, Any],
+  weak: bool = False,
+) -> tuple[GraphIndex, PreviewPlan, str]:
+  # Signatures resolved here land in the graph's memo, so the render that may follow reuses them.
+  graph = GraphIndex(project)
+  plan = decide_preview_proxy(project, force_proxy, graph, viewport)
+  etag = compute_preview_etag(project, graph, plan, frame, {"overlay": overlay, **variant})
+  # Same graph, not same bytes: a drawn HUD carries a clock, and an adaptive scale may pick other pixels.
+  if weak or overlay != "metadata" or plan.proxy_decision.reason not in PINNED_PROXY_REASONS:
+    etag = f"W/{etag}"
+  return graph, plan, etag
 
-  preview_image = overlay_preview_metadata(preview_image, source_width, source_height, proxy_decision, project)
 
-  encoded = encode_image_base64(preview_image)
-  return PreviewResponse(
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+  if not if_none_match:
+    return False
+  opaque = etag.removeprefix("W/")
+  for candidate in if_none_match.split(","):
+    candidate = candidate.strip()
+    if candidate == "*" or candidate.removeprefix("W/") == opaque:
+      return True
+  return False
+
+
+def build_not_modified_response(etag: str) -> Response:
+  return Response(status_code=304, headers={"ETag": etag, "Cache-Control": PREVIEW_CACHE_CONTROL})
+
+
+def build_proxy_info(rendered: RenderedPreview) -> PreviewProxyInfo:
+  proxy_decision = rendered.proxy_decision
+  return PreviewProxyInfo(
+    enabled=proxy_decision.enabled,
+    width=rendered.image.width,
+    height=rendered.image.height,
+    scale=proxy_decision.scale,
+    reason=proxy_decision.reason,
+    averageDelayMs=proxy_decision.average_delay_ms,
+    p95DelayMs=proxy_decision.p95_delay_ms,
+    targetDelayMs=proxy_decision.target_delay_ms,
+    predictedRenderMs=proxy_decision.predicted_render_ms,
+    actualRenderMs=rendered.render_ms,
+  )
+
+
+def render_preview(
+  project: ProjectPayload,
+  force_proxy: bool | None,
+  graph: GraphIndex | None = None,
+  include_timings: bool = False,
+  viewport: PreviewViewport | None = None,
+  frame: int | None = None,
+  overlay: str = "pixels",
+  plan: PreviewPlan | None = None,
+) -> tuple[PreviewResponse, EncodeSample, RenderTimings]:
+  timings = RenderTimings()
+  rendered = render_preview_image(project, force_proxy, graph, None, timings, viewport, frame, overlay, plan)
+  encode_started = time.perf_counter()
+  encoded = encode_image_base64(rendered.image)
+  sample = EncodeSample("png+base64", (time.perf_counter() - encode_started) * 1000.0, len(encoded))
+  timings.add_stage("encode", sample.encode_ms)
+  response = PreviewResponse(
     imageBase64=encoded,
-    width=preview_image.width,
-    height=preview_image.height,
-    source=PreviewSourceInfo(width=source_width, height=source_height),
+    width=rendered.image.width,
+    height=rendered.image.height,
+    source=PreviewSourceInfo(width=rendered.source_width, height=rendered.source_height),
+    proxy=build_proxy_info(rendered),
+    generatedAt=rendered.generated_at,
+    timings=timings.to_model() if include_timings else None,
+    viewport=rendered.viewport,
+    frame=rendered.frame,
+    hud=rendered.hud,
+  )
+  return response, sample, timings
+
+
+def render_preview_encoded(
+  project: ProjectPayload,
+  force_proxy: bool | None,
+  image_format: str,
+  quality: int | None,
+  graph: GraphIndex | None = None,
+  observer: GraphObserver | None = None,
+  viewport: PreviewViewport | None = None,
+  frame: int | None = None,
+  overlay: str = "pixels",
+  plan: PreviewPlan | None = None,
+) -> EncodedPreview:
+  timings = RenderTimings()
+  rendered = render_preview_image(project, force_proxy, graph, observer, timings, viewport, frame, overlay, plan)
+  encode_started = time.perf_counter()
+  data = encode_image(rendered.image, image_format, quality)
+  sample = EncodeSample(image_format, (time.perf_counter() - encode_started) * 1000.0, len(data))
+  timings.add_stage("encode", sample.encode_ms)
+  return EncodedPreview(
+    data=data,
+    media_type=PREVIEW_MEDIA_TYPES[image_format],
+    width=rendered.image.width,
+    height=rendered.image.height,
+    source=PreviewSourceInfo(width=rendered.source_width, height=rendered.source_height),
+    proxy=build_proxy_info(rendered),
+    generated_at=rendered.generated_at,
+    sample=sample,
+    timings=timings,
+    viewport=rendered.viewport,
+    frame=rendered.frame,
+  )
+
+
+class PreviewBatchError(ValueError):
+  pass
+
+
+def render_preview_batch(
+  project: ProjectPayload,
+  force_proxy: bool | None,
+  output_ids: list[str] | None,
+  image_format: str,
+  quality: int | None,
+  include_timings: bool = False,
+  frame: int | None = None,
+) -> tuple[PreviewBatchResponse, list[EncodeSample], RenderTimings]:
+  graph = GraphIndex(project)
+  preview_ids = [node.id for node in project.nodes if node.type == "PreviewDisplay"]
+  if output_ids is None:
+    output_ids = preview_ids
+  unknown = [node_id for node_id in output_ids if node_id not in preview_ids]
+  if unknown:
+    raise PreviewBatchError(f"PreviewDisplay ノードではありません: {', '.join(unknown)}")
+  output_ids = list(dict.fromkeys(output_ids))
+
+  timings = RenderTimings()
+  stage_started = time.perf_counter()
+  measure_node = create_size_resolver(project, graph)
+  sizes = {node_id: size for node_id in output_ids if (size := measure_node(node_id)) is not None}
+  source_width = max((size[0] for size in sizes.values()), default=1)
+  source_height = max((size[1] for size in sizes.values()), default=1)
+  cost_estimate = estimate_render_cost(project, graph, list(sizes))
+  proxy_decision = compute_proxy_decision(project, source_width, source_height, force_proxy, cost_estimate)
+  render_scale = proxy_decision.scale if proxy_decision.enabled else 1.0
+  if proxy_decision.predicted_render_ms is None:
+    proxy_decision = proxy_decision._replace(predicted_render_ms=RENDER_COST_MODEL.predict(cost_estimate, render_scale))
+  timings.add_stage("measure", (time.perf_counter() - stage_started) * 1000.0)
+
+  # One evaluator for every output, so shared upstream nodes are computed once.
+  render_started = time.perf_counter()
+  resolve_outputs = create_graph_evaluator(project, render_scale, graph, timings=timings, frame=frame)
+  images: dict[str, Image.Image] = {}
+  for node_id, image in resolve_outputs(list(sizes)).items():
+    if image is not None:
+      target_size = region_pixel_size((0, 0, *sizes[node_id]), render_scale, sizes[node_id])
+      image = image.convert("RGB")
+      images[node_id] = image if image.size == target_size else image.resize(target_size, RESAMPLE_LANCZOS)
+  graph_ms = (time.perf_counter() - render_started) * 1000.0
+  decode_ms = sum(elapsed for node_type, elapsed in timings.node_samples if node_type == "MediaInput")
+  timings.add_stage("decode", decode_ms)
+  timings.add_stage("nodes", max(graph_ms - decode_ms, 0.0))
+
+  stage_started = time.perf_counter()
+  for node_id, image in images.items():
+    images[node_id] = overlay_preview_metadata(image, sizes[node_id][0], sizes[node_id][1], proxy_decision, project, graph_ms)
+  timings.add_stage("overlay", (time.perf_counter() - stage_started) * 1000.0)
+
+  def encode_output(node_id: str) -> tuple[str, bytes, float]:
+    encode_started = time.perf_counter()
+    data = encode_image(images[node_id], image_format, quality)
+    return node_id, data, (time.perf_counter() - encode_started) * 1000.0
+
+  stage_started = time.perf_counter()
+  encoded_outputs = list(ENCODE_EXECUTOR.map(encode_output, list(images)))
+  timings.add_stage("encode", (time.perf_counter() - stage_started) * 1000.0)
+
+  samples = [EncodeSample(image_format, encode_ms, len(data)) for _, data, encode_ms in encoded_outputs]
+  largest = max(images.values(), key=lambda item: item.width * item.height, default=None)
+  response = PreviewBatchResponse(
+    outputs=[
+      PreviewBatchItem(
+        nodeId=node_id,
+        imageBase64=b64encode(data).decode("ascii"),
+        mediaType=PREVIEW_MEDIA_TYPES[image_format],
+        width=images[node_id].width,
+        height=images[node_id].height,
+        source=PreviewSourceInfo(width=sizes[node_id][0], height=sizes[node_id][1]),
+      )
+      for node_id, data, _ in encoded_outputs
+    ],
+    missing=[node_id for node_id in output_ids if node_id not in images],
     proxy=PreviewProxyInfo(
       enabled=proxy_decision.enabled,
-      width=preview_image.width,
-      height=preview_image.height,
+      width=largest.width if largest is not None else 0,
+      height=largest.height if largest is not None else 0,
       scale=proxy_decision.scale,
       reason=proxy_decision.reason,
       averageDelayMs=proxy_decision.average_delay_ms,
+      p95DelayMs=proxy_decision.p95_delay_ms,
       targetDelayMs=proxy_decision.target_delay_ms,
+      predictedRenderMs=proxy_decision.predicted_render_ms,
+      actualRenderMs=graph_ms,
     ),
     generatedAt=datetime.now(ZoneInfo("Asia/Tokyo")).isoformat(),
+    timings=timings.to_model() if include_timings else None,
+  )
+  return response, samples, timings
+
+
+def build_preview_headers(encoded: EncodedPreview) -> dict[str, str]:
+  headers = {
+    "X-NodeVision-Width": str(encoded.width),
+    "X-NodeVision-Height": str(encoded.height),
+    "X-NodeVision-Source-Width": str(encoded.source.width),
+    "X-NodeVision-Source-Height": str(encoded.source.height),
+    "X-NodeVision-Proxy-Enabled": "true" if encoded.proxy.enabled else "false",
+    "X-NodeVision-Proxy-Scale": f"{encoded.proxy.scale:.4f}",
+    "X-NodeVision-Proxy-Reason": encoded.proxy.reason,
+    "X-NodeVision-Encode-Ms": f"{encoded.sample.encode_ms:.2f}",
+    "X-NodeVision-Generated-At": encoded.generated_at,
+  }
+  if encoded.proxy.averageDelayMs is not None:
+    headers["X-NodeVision-Average-Delay-Ms"] = f"{encoded.proxy.averageDelayMs:.1f}"
+  if encoded.proxy.p95DelayMs is not None:
+    headers["X-NodeVision-P95-Delay-Ms"] = f"{encoded.proxy.p95DelayMs:.1f}"
+  if encoded.proxy.targetDelayMs is not None:
+    headers["X-NodeVision-Target-Delay-Ms"] = f"{encoded.proxy.targetDelayMs:.1f}"
+  if encoded.proxy.predictedRenderMs is not None:
+    headers["X-NodeVision-Predicted-Render-Ms"] = f"{encoded.proxy.predictedRenderMs:.1f}"
+  if encoded.proxy.actualRenderMs is not None:
+    headers["X-NodeVision-Actual-Render-Ms"] = f"{encoded.proxy.actualRenderMs:.1f}"
+  if encoded.timings is not None:
+    headers["Server-Timing"] = encoded.timings.server_timing()
+  if encoded.viewport is not None:
+    viewport = encoded.viewport
+    headers["X-NodeVision-Viewport"] = f"{viewport.x},{viewport.y},{viewport.width},{viewport.height}"
+  if encoded.frame is not None:
+    headers["X-NodeVision-Frame"] = str(encoded.frame)
+  return headers
+
+
+def stream_session_preview(
+  session: GraphSession,
+  force_proxy: bool | None,
+  image_format: str,
+  quality: int | None,
+  send: Callable[[Any], None],
+  frame: int | None = None,
+) -> None:
+  project, graph = session.snapshot()
+
+  def observe(event: str, payload: dict[str, Any]) -> None:
+    session.emit(event, payload)
+
+  try:
+    plan = decide_preview_proxy(project, force_proxy, graph)
+    source_width, source_height, proxy_decision, _, _ = plan
+    final_scale = proxy_decision.scale if proxy_decision.enabled else 1.0
+    draft_scale = min(final_scale, PREVIEW_DRAFT_MAX_EDGE / max(source_width, source_height, 1))
+    if draft_scale < final_scale * 0.75:
+      draft_image = build_image_from_graph(project, draft_scale, graph, frame=frame).convert("RGB")
+      draft_data = encode_image(draft_image, "jpeg", PREVIEW_DRAFT_QUALITY)
+      send({
+        "event": "preview:frame",
+        "payload": {
+          "stage": "draft",
+          "mediaType": PREVIEW_MEDIA_TYPES["jpeg"],
+          "width": draft_image.width,
+          "height": draft_image.height,
+          "byteLength": len(draft_data),
+          "frame": frame,
+        },
+      })
+      send(draft_data)
+    encoded = render_preview_encoded(project, force_proxy, image_format, quality, graph, observe, frame=frame, plan=plan)
+  except GraphValidationError as error:
+    session.emit("graph:failed", {"nodeId": None, "code": "E-NODE-VALIDATION", "message": str(error), "cause": "graph"})
+    return
+  except Exception as error:
+    session.emit("graph:failed", {"nodeId": None, "code": "E-INTERNAL-01", "message": str(error), "cause": type(error).__name__})
+    return
+  ENCODER_STATS.record(encoded.sample)
+  observe_render_timings(encoded.timings)
+  send({
+    "event": "preview:frame",
+    "payload": {
+      "stage": "final",
+      "mediaType": encoded.media_type,
+      "width": encoded.width,
+      "height": encoded.height,
+      "byteLength": len(encoded.data),
+      "source": encoded.source.model_dump(),
+      "proxy": encoded.proxy.model_dump(),
+      "generatedAt": encoded.generated_at,
+      "timings": encoded.timings.to_model().model_dump() if encoded.timings is not None else None,
+      "frame": encoded.frame,
+    },
+  })
+  send(encoded.data)
+
+
+@app.post(
+  "/preview/render",
+  response_class=Response,
+  responses={200: {"content": {media_type: {} for media_type in PREVIEW_MEDIA_TYPES.values()}}},
+  summary="プレビュー生成（バイナリ）",
+  openapi_extra=json_body_openapi(PreviewRenderRequest),
+)
+async def post_preview_render(
+  request: PreviewRenderRequest = Depends(json_body(PreviewRenderRequest)),
+  accept: str | None = Header(default=None),
+  if_none_match: str | None = Header(default=None),
+) -> Response:
+  image_format = negotiate_preview_format(request.format, accept)
+  try:
+    variant = {"format": image_format, "quality": request.quality}
+    graph, plan, etag = await RENDER_POOL.run_local(
+      plan_cacheable_preview, request.project, request.forceProxy, request.viewport, request.frame, request.overlay, variant
+    )
+    if etag_matches(if_none_match, etag):
+      return build_not_modified_response(etag)
+    encoded: EncodedPreview = await RENDER_POOL.run(
+      render_preview_encoded,
+      request.project,
+      request.forceProxy,
+      image_format,
+      request.quality,
+      graph,
+      None,
+      request.viewport,
+      request.frame,
+      request.overlay,
+      plan,
+    )
+  except RenderPoolBusyError as error:
+    raise build_render_busy_error(error) from error
+  except GraphValidationError as error:
+    raise build_graph_validation_error(error) from error
+  ENCODER_STATS.record(encoded.sample)
+  observe_render_timings(encoded.timings)
+  headers = build_preview_headers(encoded)
+  headers["ETag"] = etag
+  headers["Cache-Control"] = PREVIEW_CACHE_CONTROL
+  return Response(content=encoded.data, media_type=encoded.media_type, headers=headers)
+
+
+@app.post(
+  "/preview/batch",
+  response_model=PreviewBatchResponse,
+  summary="複数 PreviewDisplay の一括プレビュー生成",
+  openapi_extra=json_body_openapi(PreviewBatchRequest),
+)
+async def post_preview_batch(
+  response: Response,
+  request: PreviewBatchRequest = Depends(json_body(PreviewBatchRequest)),
+) -> PreviewBatchResponse:
+  try:
+    batch, samples, timings = await RENDER_POOL.run(
+      render_preview_batch,
+      request.project,
+      request.forceProxy,
+      request.outputs,
+      request.format,
+      request.quality,
+      request.includeTimings,
+      request.frame,
+    )
+  except RenderPoolBusyError as error:
+    raise build_render_busy_error(error) from error
+  except GraphValidationError as error:
+    raise build_graph_validation_error(error) from error
+  except PreviewBatchError as error:
+    raise HTTPException(
+      status_code=422,
+      detail={"message": "プレビュー対象のノード指定が不正です。", "code": "E-NODE-VALIDATION", "cause": str(error)},
+    ) from error
+  for sample in samples:
+    ENCODER_STATS.record(sample)
+  observe_render_timings(timings)
+  response.headers["Server-Timing"] = timings.server_timing()
+  return batch
+
+
+@app.post("/assets/hash", response_model=AssetHashResponse, summary="アセットのハッシュ計算開始")
+async def post_asset_hash(request: AssetProjectRequest) -> AssetHashResponse:
+  return build_asset_hash_response(await asyncio.to_thread(schedule_asset_hashing, request.project))
+
+
+@app.get("/assets/hash", response_model=AssetHashResponse, summary="アセットのハッシュ計算状況")
+async def get_asset_hash() -> AssetHashResponse:
+  return build_asset_hash_response([job.to_model() for job in ASSET_HASHER.jobs()])
+
+
+@app.post("/assets/proxies", response_model=AssetProxyResponse, summary="アセットのプロキシ生成開始")
+async def post_asset_proxies(request: AssetProjectRequest) -> AssetProxyResponse:
+  return build_asset_proxy_response(await asyncio.to_thread(schedule_asset_proxies, request.project))
+
+
+@app.get("/assets/proxies", response_model=AssetProxyResponse, summary="アセットのプロキシ生成状況")
+async def get_asset_proxies() -> AssetProxyResponse:
+  return build_asset_proxy_response([job.to_model() for job in PROXY_PYRAMIDS.jobs()])
+
+
+@app.get("/preview/stats", response_model=PreviewStatsResponse, summary="プレビュー統計")
+async def get_preview_stats() -> PreviewStatsResponse:
+  return PreviewStatsResponse(
+    cache=NODE_RESULT_CACHE.stats(),
+    media=DECODED_MEDIA_CACHE.stats(),
+    frames=DECODED_FRAME_CACHE.stats(),
+    prefetch=SCRUB_PREFETCHER.stats(),
+    pool=RENDER_POOL.stats(),
+    encoders=ENCODER_STATS.stats(),
+    latency=LATENCY_TRACKER.snapshot(),
+  )
+
+
+@app.get("/metrics", response_class=Response, summary="Prometheus メトリクス")
+async def get_metrics() -> Response:
+  return Response(content=render_metrics_text(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+def render_metrics_text() -> str:
+  lines = PREVIEW_METRICS.render()
+
+  def add_metric(name: str, metric_type: str, help_text: str, samples: list[tuple[str, float]]) -> None:
+    lines.extend([f"# HELP {name} {help_text}", f"# TYPE {name} {metric_type}"])
+    lines.extend(f"{name}{labels} {value}" for labels, value in samples)
+
+  for prefix, cache_stats in (
+    ("nodevision_node_cache", NODE_RESULT_CACHE.stats()),
+    ("nodevision_media_cache", DECODED_MEDIA_CACHE.stats()),
+    ("nodevision_frame_cache", DECODED_FRAME_CACHE.stats()),
+  ):
+    add_metric(f"{prefix}_hit_ratio", "gauge", "Cache hit ratio.", [("", cache_stats.hitRatio)])
+    add_metric(f"{prefix}_bytes", "gauge", "Bytes held by the cache.", [("", cache_stats.bytes)])
+    add_metric(f"{prefix}_entries", "gauge", "Entries held by the cache.", [("", cache_stats.entries)])
+    add_metric(f"{prefix}_hits_total", "counter", "Cache hits.", [("", cache_stats.hits)])
+    add_metric(f"{prefix}_misses_total", "counter", "Cache misses.", [("", cache_stats.misses)])
+    add_metric(f"{prefix}_evictions_total", "counter", "Cache evictions.", [("", cache_stats.evictions)])
+  pool_stats = RENDER_POOL.stats()
+  add_metric("nodevision_render_in_flight", "gauge", "Renders currently executing.", [("", pool_stats.inFlight)])
+  add_metric("nodevision_render_queue_depth", "gauge", "Renders waiting for a worker.", [("", pool_stats.queued)])
+  add_metric("nodevision_render_workers", "gauge", "Render pool workers.", [("", pool_stats.workers)])
+  add_metric("nodevision_render_completed_total", "counter", "Completed renders.", [("", pool_stats.completed)])
+  add_metric("nodevision_render_rejected_total", "counter", "Renders rejected by the pending bound.", [("", pool_stats.rejected)])
+  encoder_stats = ENCODER_STATS.stats()
+  add_metric(
+    "nodevision_encoded_bytes_total",
+    "counter",
+    "Encoded preview bytes per format.",
+    [(f'{{format="{item.format}"}}', item.totalBytes) for item in encoder_stats],
   )
+  return "\n".join(lines) + "\n"
+
+
+@app.post("/preview/latency", response_model=LatencyStats, summary="プレビュー遅延サンプル登録")
+async def post_preview_latency(request: LatencySampleRequest) -> LatencyStats:
+  base_profile = request.profile.split("_", 1)[0]
+  try:
+    width_text, height_text = base_profile.split("x", 1)
+    width, height = int(width_text), int(height_text)
+  except ValueError as error:
+    raise HTTPException(
+      status_code=422,
+      detail={"message": "profile は '<幅>x<高さ>' 形式で指定してください。", "cause": request.profile},
+    ) from error
+  return LATENCY_TRACKER.record(f"{width}x{height}", request.delayMs)
+
+
+@app.post(
+  "/sessions",
+  response_model=SessionInfoResponse,
+  summary="編集セッション作成",
+  openapi_extra=json_body_openapi(SessionCreateRequest),
+)
+async def post_session_create(request: SessionCreateRequest = Depends(json_body(SessionCreateRequest))) -> SessionInfoResponse:
+  session = SESSION_STORE.create(request.project)
+  await asyncio.to_thread(schedule_asset_jobs, request.project)
+  return build_session_info(session)
+
+
+@app.get("/sessions/{session_id}", response_model=SessionInfoResponse, summary="編集セッション情報")
+async def get_session(session_id: str) -> SessionInfoResponse:
+  return build_session_info(require_session(session_id))
+
+
+@app.delete("/sessions/{session_id}", summary="編集セッション破棄")
+async def delete_session(session_id: str) -> dict[str, str]:
+  if not SESSION_STORE.remove(session_id):
+    raise HTTPException(status_code=404, detail={"message": f"Session '{session_id}' が見つかりません。"})
+  return {"status": "deleted"}
+
+
+@app.post("/sessions/{session_id}/patch", response_model=SessionPatchResponse, summary="編集セッション差分適用")
+async def post_session_patch(session_id: str, request: SessionPatchRequest) -> SessionPatchResponse:
+  session = require_session(session_id)
+  try:
+    invalidated, events = session.apply(request.operations, request.baseRevision)
+  except SessionPatchError as error:
+    raise HTTPException(
+      status_code=422,
+      detail={"message": "差分を適用できませんでした。", "code": "E-NODE-VALIDATION", "cause": str(error)},
+    ) from error
+  return SessionPatchResponse(sessionId=session_id, revision=session.revision, invalidated=invalidated, events=events)
+
+
+@app.post("/sessions/{session_id}/preview", response_model=PreviewResponse, summary="編集セッションのプレビュー生成")
+async def post_session_preview(session_id: str, request: SessionPreviewRequest, response: Response) -> PreviewResponse:
+  session = require_session(session_id)
+  await asyncio.to_thread(session.refresh_media)
+  project, graph = session.snapshot()
+  try:
+    preview, sample, timings = await RENDER_POOL.run(
+      render_preview, project, request.forceProxy, graph, request.includeTimings, None, request.frame
+    )
+  except RenderPoolBusyError as error:
+    raise build_render_busy_error(error) from error
+  except GraphValidationError as error:
+    raise build_graph_validation_error(error) from error
+  if request.frame is not None:
+    SCRUB_PREFETCHER.schedule(session, request.frame, request.forceProxy)
+  ENCODER_STATS.record(sample)
+  observe_render_timings(timings)
+  response.headers["Server-Timing"] = timings.server_timing()
+  return preview
+
+
+@app.websocket("/sessions/{session_id}/ws")
+async def session_websocket(websocket: WebSocket, session_id: str) -> None:
+  session = SESSION_STORE.get(session_id)
+  if session is None:
+    await websocket.close(code=4404)
+    return
+  await websocket.accept()
+  loop = asyncio.get_running_loop()
+  outbox: asyncio.Queue[Any] = asyncio.Queue()
+  render_requested = asyncio.Event()
+  latest_request: dict[str, Any] = {}
+  connection = {"open": True}
+
+  def publish(message: Any) -> None:
+    if not connection["open"]:
+      return
+    try:
+      loop.call_soon_threadsafe(outbox.put_nowait, message)
+    except RuntimeError:
+      connection["open"] = False
+
+  def forward_event(record: GraphEvent) -> None:
+    publish(record.model_dump())
+
+  async def send_messages() -> None:
+    while True:
+      message = await outbox.get()
+      if isinstance(message, bytes):
+        await websocket.send_bytes(message)
+      else:
+        await websocket.send_json(message)
+
+  async def send_heartbeats() -> None:
+    while True:
+      publish({"event": "session:heartbeat", "payload": {"timestamp": datetime.now(ZoneInfo("UTC")).isoformat()}})
+      await asyncio.sleep(SESSION_HEARTBEAT_SEC)
+
+  async def render_previews() -> None:
+    while True:
+      await render_requested.wait()
+      render_requested.clear()
+      request = dict(latest_request)
+      await asyncio.to_thread(session.refresh_media)
+      image_format = negotiate_preview_format(request.get("format"), None)
+      quality = parse_int(request.get("quality"))
+      frame = parse_frame_number(request.get("frame"))
+      try:
+        await RENDER_POOL.run_local(
+          stream_session_preview, session, request.get("forceProxy"), image_format, quality, publish, frame
+        )
+      except RenderPoolBusyError as error:
+        publish({"event": "graph:log", "payload": {"nodeId": None, "level": "warn", "message": str(error)}})
+        continue
+      if frame is not None:
+        SCRUB_PREFETCHER.schedule(session, frame, request.get("forceProxy"))
+
+  session.subscribe(forward_event)
+  tasks = [
+    asyncio.create_task(send_messages()),
+    asyncio.create_task(send_heartbeats()),
+    asyncio.create_task(render_previews()),
+  ]
+  try:
+    while True:
+      received = await websocket.receive()
+      if received["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(received.get("code", 1000))
+      try:
+        message = json.loads(received.get("text") or received.get("bytes") or "")
+      except ValueError as error:
+        publish({
+          "event": "graph:failed",
+          "payload": {
+            "nodeId": None, "code": "E-WS-MESSAGE", "message": f"JSON として解釈できません: {error}", "cause": "message",
+          },
+        })
+        continue
+      if not isinstance(message, dict):
+        continue
+      if message.get("type") == "preview":
+        latest_request.clear()
+        latest_request.update(message)
+        render_requested.set()
+      elif message.get("type") == "patch":
+        try:
+          patch = SessionPatchRequest.model_validate(message)
+          session.apply(patch.operations, patch.baseRevision)
+        except (ValidationError, SessionPatchError) as error:
+          publish({
+            "event": "graph:failed",
+            "payload": {"nodeId": None, "code": "E-NODE-VALIDATION", "message": str(error), "cause": "patch"},
+          })
+  except WebSocketDisconnect:
+    pass
+  finally:
+    connection["open"] = False
+    session.unsubscribe(forward_event)
+    for task in tasks:
+      task.cancel()
+
+
+def require_session(session_id: str) -> GraphSession:
+  session = SESSION_STORE.get(session_id)
+  if session is None:
+    raise HTTPException(status_code=404, detail={"message": f"Session '{session_id}' が見つかりません。"})
+  return session
+
+
+def build_session_info(session: GraphSession) -> SessionInfoResponse:
+  project, _ = session.snapshot()
+  return SessionInfoResponse(sessionId=session.session_id, revision=session.revision, summary=summarize_project(project))
 
 
 @app.post("/projects/load", response_model=ProjectLoadResponse, summary="プロジェクト読み込み")
 async def post_project_load(request: ProjectLoadRequest) -> ProjectLoadResponse:
   slot = normalize_project_slot(request.slot, DEFAULT_PROJECT_SLOT)
   try:
-    project, path = read_project(slot)
+    project, path, revision = await asyncio.to_thread(read_project, slot, request.revision)
   except FileNotFoundError as error:
     raise HTTPException(status_code=404, detail={"message": str(error)}) from error
   except json.JSONDecodeError as error:
@@ -829,8 +4442,9 @@ async def post_project_load(request: ProjectLoadRequest) -> ProjectLoadResponse:
       },
     ) from error
 
+  await asyncio.to_thread(schedule_asset_jobs, project)
   summary = summarize_project(project)
-  return ProjectLoadResponse(slot=slot, path=str(path), project=project, summary=summary)
+  return ProjectLoadResponse(slot=slot, path=str(path), project=project, summary=summary, revision=revision)
 
 
 def summarize_project(project: ProjectPayload) -> ProjectSummary:
@@ -844,33 +4458,327 @@ def summarize_project(project: ProjectPayload) -> ProjectSummary:
   )
 
 
+class ProjectCache:
+  # Validated projects keyed by path; an entry is only served while the file's mtime and size still match.
+  def __init__(self, max_entries: int) -> None:
+    self.max_entries = max_entries
+    self._entries: OrderedDict[str, tuple[int, int, ProjectPayload]] = OrderedDict()
+    self._lock = threading.Lock()
+
+  def get(self, path: Path, file_stat: os.stat_result) -> ProjectPayload | None:
+    key = str(path)
+    with self._lock:
+      entry = self._entries.get(key)
+      if entry is None or entry[:2] != (file_stat.st_mtime_ns, file_stat.st_size):
+        return None
+      self._entries.move_to_end(key)
+      return entry[2]
+
+  def put(self, path: Path, file_stat: os.stat_result, project: ProjectPayload) -> None:
+    key = str(path)
+    with self._lock:
+      self._entries[key] = (file_stat.st_mtime_ns, file_stat.st_size, project)
+      self._entries.move_to_end(key)
+      while len(self._entries) > self.max_entries:
+        self._entries.popitem(last=False)
+
+  def discard(self, path: Path) -> None:
+    with self._lock:
+      self._entries.pop(str(path), None)
+
+  def clear(self) -> None:
+    with self._lock:
+      self._entries.clear()
+
+
+PROJECT_CACHE = ProjectCache(PROJECT_CACHE_SIZE)
+
+
+def dump_project_payload(project: ProjectPayload) -> dict[str, Any]:
+  return {
+    **project.model_dump(by_alias=True),
+    "metadata": {**project.metadata, "savedBy": "backend"},
+  }
+
+
+def serialize_project(project: ProjectPayload) -> bytes:
+  return encode_project_payload(dump_project_payload(project))
+
+
+def encode_project_payload(payload: dict[str, Any]) -> bytes:
+  # Large graphs are written without indentation; small ones stay readable and diff-friendly.
+  compact = len(payload.get("nodes") or []) >= PROJECT_COMPACT_MIN_NODES
+  if orjson is not None:
+    return orjson.dumps(payload, option=0 if compact else orjson.OPT_INDENT_2) + b"\n"
+  if compact:
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+  return json.dumps(payload, indent=2, ensure_ascii=False).encode("utf-8") + b"\n"
+
+
+def write_bytes_atomic(target: Path, data: bytes) -> None:
+  temp_path = target.with_name(f".{target.name}.{uuid.uuid4().hex}.tmp")
+  try:
+    with temp_path.open("wb") as fh:
+      fh.write(data)
+      fh.flush()
+      os.fsync(fh.fileno())
+    os.replace(temp_path, target)
+  except BaseException:
+    temp_path.unlink(missing_ok=True)
+    raise
+
+
+def encode_json_line(value: dict[str, Any]) -> bytes:
+  if orjson is not None:
+    return orjson.dumps(value) + b"\n"
+  return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+def decode_json(data: bytes) -> Any:
+  return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def index_keyed_items(items: Any) -> dict[str, dict[str, Any]] | None:
+  if not isinstance(items, list):
+    return None
+  indexed: dict[str, dict[str, Any]] = {}
+  for item in items:
+    if not isinstance(item, dict) or not isinstance(item.get("id"), str) or item["id"] in indexed:
+      return None
+    indexed[item["id"]] = item
+  return indexed
+
+
+def diff_project_payload(previous: dict[str, Any], current: dict[str, Any]) -> dict[str, Any]:
+  # Nodes and assets are diffed by id, so moving one node journals that node only.
+  diff: dict[str, Any] = {}
+  fields = {key: value for key, value in current.items() if key not in previous or previous[key] != value}
+  removed = [key for key in previous if key not in current]
+  for key in PROJECT_KEYED_LISTS:
+    if key not in fields:
+      continue
+    previous_items = index_keyed_items(previous.get(key))
+    current_items = index_keyed_items(current.get(key))
+    if previous_items is None or current_items is None:
+      continue
+    del fields[key]
+    change: dict[str, Any] = {
+      "upsert": [item for item_id, item in current_items.items() if previous_items.get(item_id) != item],
+      "remove": [item_id for item_id in previous_items if item_id not in current_items],
+    }
+    expected_order = [item_id for item_id in previous_items if item_id in current_items]
+    expected_order += [item_id for item_id in current_items if item_id not in previous_items]
+    if list(current_items) != expected_order:
+      change["order"] = list(current_items)
+    diff[key] = change
+  if fields:
+    diff["fields"] = fields
+  if removed:
+    diff["removed"] = removed
+  return diff
+
+
+def apply_project_diff(payload: dict[str, Any], diff: dict[str, Any]) -> dict[str, Any]:
+  updated = {key: value for key, value in payload.items() if key not in diff.get("removed", ())}
+  updated.update(diff.get("fields", {}))
+  for key in PROJECT_KEYED_LISTS:
+    change = diff.get(key)
+    if change is None:
+      continue
+    items = index_keyed_items(updated.get(key)) or {}
+    for item_id in change.get("remove", ()):
+      items.pop(item_id, None)
+    for item in change.get("upsert", ()):
+      items[item["id"]] = item
+    order = change.get("order") or list(items)
+    updated[key] = [items[item_id] for item_id in order if item_id in items]
+  return updated
+
+
+class ProjectJournal:
+  # A slot saved as snapshot (.nveproj) plus append-only diffs (.nvejournal); entries at or below
+  # the snapshot's journalRevision are already folded in and skipped on replay.
+  def __init__(self, slot: str) -> None:
+    self.slot = slot
+    self.snapshot_path = STORAGE_DIR / f"{slot}.nveproj"
+    self.journal_path = STORAGE_DIR / f"{slot}.nvejournal"
+    self.lock = threading.Lock()
+    self.loaded = False
+    self.base_payload: dict[str, Any] | None = None
+    self.base_revision = 0
+    self.payload: dict[str, Any] | None = None
+    self.revision = 0
+    self.entries: list[tuple[int, dict[str, Any], bytes]] = []
+    self.snapshot_bytes = 0
+    self.project: ProjectPayload | None = None
+    self.compacting = False
+    self.retired = False
+
+  def ensure_loaded(self) -> None:
+    if self.loaded:
+      return
+    if self.snapshot_path.exists():
+      data = self.snapshot_path.read_bytes()
+      payload = decode_json(data)
+      metadata = dict(payload.get("metadata") or {})
+      self.base_revision = parse_int(metadata.pop("journalRevision", None)) or 0
+      self.base_payload = {**payload, "metadata": metadata}
+      self.snapshot_bytes = len(data)
+    self.payload, self.revision = self.base_payload, self.base_revision
+    if self.journal_path.exists() and self.payload is not None:
+      for line in self.journal_path.read_bytes().splitlines(keepends=True):
+        try:
+          entry = decode_json(line)
+        except ValueError:
+          # A torn final line from an interrupted append.
+          break
+        revision = entry.pop("revision", None)
+        if not isinstance(revision, int) or revision <= self.base_revision:
+          continue
+        if revision != self.revision + 1:
+          break
+        self.payload = apply_project_diff(self.payload, entry)
+        self.revision = revision
+        self.entries.append((revision, entry, line))
+    self.loaded = True
+
+  def journal_bytes(self) -> int:
+    return sum(len(line) for _, _, line in self.entries)
+
+  def write_snapshot(self, payload: dict[str, Any], revision: int) -> None:
+    data = encode_project_payload({**payload, "metadata": {**payload.get("metadata", {}), "journalRevision": revision}})
+    write_bytes_atomic(self.snapshot_path, data)
+    PROJECT_CACHE.discard(self.snapshot_path)
+    self.base_payload, self.base_revision, self.snapshot_bytes = payload, revision, len(data)
+
+  def append(self, project: ProjectPayload) -> tuple[int, bool]:
+    payload = dump_project_payload(project)
+    with self.lock:
+      self.ensure_loaded()
+      if self.payload is None:
+        self.write_snapshot(payload, 1)
+        self.journal_path.write_bytes(b"")
+        self.payload, self.revision, self.entries = payload, 1, []
+      else:
+        diff = diff_project_payload(self.payload, payload)
+        if not diff:
+          return self.revision, False
+        revision = self.revision + 1
+        line = encode_json_line({"revision": revision, **diff})
+        with self.journal_path.open("ab") as fh:
+          fh.write(line)
+          fh.flush()
+          os.fsync(fh.fileno())
+        self.payload, self.revision = payload, revision
+        self.entries.append((revision, diff, line))
+      self.project = project.model_copy(update={"metadata": payload["metadata"]})
+      needs_compaction = not self.compacting and (
+        len(self.entries) >= PROJECT_JOURNAL_MAX_ENTRIES or self.journal_bytes() >= self.snapshot_bytes
+      )
+      if needs_compaction:
+        self.compacting = True
+      return self.revision, needs_compaction
+
+  def compact(self) -> None:
+    with self.lock:
+      try:
+        # A plain save retires the journal; a compaction queued before it must not resurrect old state.
+        if self.retired or self.payload is None or self.revision == self.base_revision:
+          return
+        self.write_snapshot(self.payload, self.revision)
+        self.entries = []
+        write_bytes_atomic(self.journal_path, b"")
+      finally:
+        self.compacting = False
+
+  def reset(self, project: ProjectPayload) -> None:
+    # A plain save over a journaled slot: the new snapshot outranks every journal entry.
+    payload = dump_project_payload(project)
+    with self.lock:
+      self.ensure_loaded()
+      self.retired = True
+      self.write_snapshot(payload, self.revision + 1)
+      self.journal_path.unlink(missing_ok=True)
+      self.payload, self.revision, self.entries = payload, self.base_revision, []
+      self.project = project
+
+  def read(self, revision: int | None) -> tuple[ProjectPayload, int]:
+    with self.lock:
+      self.ensure_loaded()
+      if self.payload is None:
+        raise FileNotFoundError(f"Project slot '{self.slot}' が見つかりません。")
+      if revision is None or revision == self.revision:
+        if self.project is None:
+          self.project = ProjectPayload.model_validate(self.payload)
+        return self.project, self.revision
+      if revision < self.base_revision or revision > self.revision or self.base_payload is None:
+        raise FileNotFoundError(f"Project slot '{self.slot}' のリビジョン {revision} が見つかりません。")
+      payload = self.base_payload
+      for entry_revision, diff, _ in self.entries:
+        if entry_revision > revision:
+          break
+        payload = apply_project_diff(payload, diff)
+    return ProjectPayload.model_validate(payload), revision
+
+
+PROJECT_JOURNALS: dict[str, ProjectJournal] = {}
+PROJECT_JOURNALS_LOCK = threading.Lock()
+
+
+def find_project_journal(slot: str, create: bool = False) -> ProjectJournal | None:
+  with PROJECT_JOURNALS_LOCK:
+    journal = PROJECT_JOURNALS.get(slot)
+    if journal is None and (create or (STORAGE_DIR / f"{slot}.nvejournal").exists()):
+      journal = PROJECT_JOURNALS[slot] = ProjectJournal(slot)
+    return journal
+
+
+def append_project_journal(project: ProjectPayload, slot: str) -> tuple[Path, int]:
+  journal = find_project_journal(slot, create=True)
+  revision, needs_compaction = journal.append(project)
+  if needs_compaction:
+    JOURNAL_EXECUTOR.submit(journal.compact)
+  return journal.snapshot_path, revision
+
+
 def write_project(project: ProjectPayload, slot: str) -> Path:
   target = STORAGE_DIR / f"{slot}.nveproj"
-  with target.open("w", encoding="utf-8") as fh:
-    json.dump(
-      {
-        **project.model_dump(by_alias=True),
-        "metadata": {**project.metadata, "savedBy": "backend"},
-      },
-      fh,
-      indent=2,
-      ensure_ascii=False,
-    )
-    fh.write("\n")
+  journal = find_project_journal(slot)
+  if journal is not None:
+    journal.reset(project)
+    with PROJECT_JOURNALS_LOCK:
+      PROJECT_JOURNALS.pop(slot, None)
+    return target
+  write_bytes_atomic(target, serialize_project(project))
+  PROJECT_CACHE.discard(target)
   return target
 
 
-def read_project(slot: str) -> tuple[ProjectPayload, Path]:
+def read_project(slot: str, revision: int | None = None) -> tuple[ProjectPayload, Path, int | None]:
   normalized_slot = normalize_project_slot(slot, DEFAULT_PROJECT_SLOT)
   target = STORAGE_DIR / f"{normalized_slot}.nveproj"
-  if not target.exists():
-    raise FileNotFoundError(f"Project slot '{normalized_slot}' が見つかりません。")
+  journal = find_project_journal(normalized_slot)
+  if journal is not None:
+    project, loaded_revision = journal.read(revision)
+    return project, target, loaded_revision
+  if revision is not None:
+    raise FileNotFoundError(f"Project slot '{normalized_slot}' のリビジョン {revision} が見つかりません。")
+  try:
+    file_stat = target.stat()
+  except FileNotFoundError as error:
+    raise FileNotFoundError(f"Project slot '{normalized_slot}' が見つかりません。") from error
 
-  with target.open("r", encoding="utf-8") as fh:
-    payload = json.load(fh)
+  project = PROJECT_CACHE.get(target, file_stat)
+  if project is not None:
+    return project, target, None
 
+  payload = decode_json(target.read_bytes())
+  if isinstance(payload, dict) and isinstance(payload.get("metadata"), dict):
+    # Left behind when a journaled slot was overwritten by a plain save.
+    payload["metadata"].pop("journalRevision", None)
   project = ProjectPayload.model_validate(payload)
-  return project, target
+  PROJECT_CACHE.put(target, file_stat, project)
+  return project, target, None
 
 
 def build_validation_issues(errors: list[dict[str, Any]]) -> list[ValidationIssue]:
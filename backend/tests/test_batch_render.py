@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import io
+import json
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+
+FASTAPI_AVAILABLE = True
+
+try:
+  from PIL import Image
+  from backend.app import main as engine
+  from backend.app.batch_render import collect_input_frames, main as batch_main
+  from backend.app.main import STORAGE_DIR, ProjectPayload, write_project
+except ModuleNotFoundError as error:
+  if error.name == "fastapi":
+    FASTAPI_AVAILABLE = False
+    batch_main = None  # type: ignore[assignment]
+    engine = None  # type: ignore[assignment]
+    collect_input_frames = None  # type: ignore[assignment]
+    ProjectPayload = None  # type: ignore[assignment]
+    write_project = None  # type: ignore[assignment]
+    STORAGE_DIR = Path(".")
+  else:
+    raise
+
+
+BATCH_SLOT = "unit-test-batch-render"
+BATCH_PROJECT = {
+  "schemaVersion": "1.0.0",
+  "mediaColorSpace": "Rec.709",
+  "projectFps": 30,
+  "nodes": [
+    {"id": "n1", "type": "MediaInput", "params": {"assetId": "a1"}, "inputs": {}, "outputs": ["video"]},
+    {"id": "n2", "type": "Resize", "params": {"width": 32, "height": 24}, "inputs": {"image": "n1:video"}, "outputs": ["image"]},
+    {"id": "n3", "type": "ExposureAdjust", "params": {"exposure": 0.5}, "inputs": {"video": "n2:image"}, "outputs": ["video"]},
+    {"id": "n4", "type": "PreviewDisplay", "params": {}, "inputs": {"primary": "n3:video"}, "outputs": []},
+  ],
+  "edges": [],
+  "assets": [{"id": "a1", "path": "missing.png", "hash": "sha256:unit-test"}],
+  "metadata": {},
+}
+
+
+class BatchRenderTests(unittest.TestCase):
+
+  def tearDown(self) -> None:
+    (STORAGE_DIR / f"{BATCH_SLOT}.nveproj").unlink(missing_ok=True)
+
+  def run_batch(self, *args: str) -> tuple[int, dict]:
+    output = io.StringIO()
+    with redirect_stdout(output):
+      exit_code = batch_main([BATCH_SLOT, "--json", *args])  # type: ignore[misc]
+    return exit_code, json.loads(output.getvalue()) if output.getvalue() else {}
+
+  @unittest.skipUnless(FASTAPI_AVAILABLE, "FastAPI dependency is not installed")
+  def test_frames_are_rendered_on_worker_processes_and_resumed(self) -> None:
+    write_project(ProjectPayload.model_validate(BATCH_PROJECT), BATCH_SLOT)  # type: ignore[union-attr,misc]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+      input_dir = Path(tmp_dir) / "frames"
+      input_dir.mkdir()
+      for number in range(6):
+        Image.new("RGB", (64, 48), (number * 40, 0, 0)).save(input_dir / f"frame_{number:04d}.png")
+      (input_dir / "notes.txt").write_text("ignored")
+      self.assertEqual(len(collect_input_frames(str(input_dir))), 6)  # type: ignore[misc]
+      self.assertEqual(len(collect_input_frames(str(input_dir / "frame_000[0-2].png"))), 3)  # type: ignore[misc]
+
+      output_dir = Path(tmp_dir) / "out"
+      exit_code, report = self.run_batch("--input", str(input_dir), "--output-dir", str(output_dir), "--workers", "2")
+      self.assertEqual(exit_code, 0)
+      self.assertEqual((report["rendered"], report["skipped"], report["failed"]), (6, 0, 0))
+      self.assertGreater(report["framesPerSec"], 0)
+      self.assertEqual({node["nodeId"] for node in report["nodes"]}, {"n1", "n2", "n3", "n4"})
+      written = sorted(path.name for path in output_dir.iterdir())
+      self.assertEqual(written, [f"frame_{number:04d}.png" for number in range(6)])
+      with Image.open(output_dir / "frame_0003.png") as image:
+        self.assertEqual(image.size, (32, 24))
+        self.assertGreater(image.getpixel((16, 12))[0], 120)
+
+      (output_dir / "frame_0004.png").unlink()
+      exit_code, report = self.run_batch(
+        "--input", str(input_dir), "--output-dir", str(output_dir), "--workers", "2", "--resume"
+      )
+      self.assertEqual(exit_code, 0)
+      self.assertEqual((report["rendered"], report["skipped"]), (1, 5))
+
+  @unittest.skipUnless(FASTAPI_AVAILABLE, "FastAPI dependency is not installed")
+  def test_corrupt_input_frame_fails_the_batch(self) -> None:
+    write_project(ProjectPayload.model_validate(BATCH_PROJECT), BATCH_SLOT)  # type: ignore[union-attr,misc]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+      input_dir = Path(tmp_dir) / "frames"
+      input_dir.mkdir()
+      Image.new("RGB", (64, 48), (200, 0, 0)).save(input_dir / "frame_0000.png")
+      (input_dir / "frame_0001.png").write_bytes(b"not a png")
+      output_dir = Path(tmp_dir) / "out"
+      limits = (engine.GRAPH_WORKERS, engine.NODE_RESULT_CACHE.max_bytes, engine.DECODED_MEDIA_CACHE.max_bytes)  # type: ignore[union-attr]
+      exit_code, report = self.run_batch(
+        "--input", str(input_dir), "--output-dir", str(output_dir), "--workers", "1", "--cache-mb", "1"
+      )
+      # An in-process batch must not leave its worker limits on the imported engine.
+      self.assertEqual(
+        (engine.GRAPH_WORKERS, engine.NODE_RESULT_CACHE.max_bytes, engine.DECODED_MEDIA_CACHE.max_bytes), limits  # type: ignore[union-attr]
+      )
+      self.assertEqual(exit_code, 1)
+      self.assertEqual((report["rendered"], report["failed"]), (1, 1))
+      self.assertEqual([Path(failure["frame"]).name for failure in report["failures"]], ["frame_0001.png"])
+      self.assertEqual(sorted(path.name for path in output_dir.iterdir()), ["frame_0000.png"])
+
+  @unittest.skipUnless(FASTAPI_AVAILABLE, "FastAPI dependency is not installed")
+  def test_frames_sharing_an_output_name_are_rejected(self) -> None:
+    write_project(ProjectPayload.model_validate(BATCH_PROJECT), BATCH_SLOT)  # type: ignore[union-attr,misc]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+      input_dir = Path(tmp_dir) / "frames"
+      input_dir.mkdir()
+      Image.new("RGB", (64, 48), (200, 0, 0)).save(input_dir / "shot.png")
+      Image.new("RGB", (64, 48), (0, 200, 0)).save(input_dir / "shot.jpg")
+      output_dir = Path(tmp_dir) / "out"
+      exit_code, report = self.run_batch("--input", str(input_dir), "--output-dir", str(output_dir), "--workers", "1")
+    self.assertEqual(exit_code, 2)
+    self.assertEqual(report, {})
+    self.assertFalse(output_dir.exists())
+
+  @unittest.skipUnless(FASTAPI_AVAILABLE, "FastAPI dependency is not installed")
+  def test_unknown_output_node_is_rejected(self) -> None:
+    write_project(ProjectPayload.model_validate(BATCH_PROJECT), BATCH_SLOT)  # type: ignore[union-attr,misc]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+      Image.new("RGB", (8, 8)).save(Path(tmp_dir) / "frame.png")
+      exit_code, report = self.run_batch("--input", tmp_dir, "--output-dir", tmp_dir, "--output", "n3")
+    self.assertEqual(exit_code, 2)
+    self.assertEqual(report, {})
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -1,20 +1,63 @@
 from __future__ import annotations
 
+import hashlib
+import shutil
+import tempfile
+import threading
+import time
 import unittest
+from io import BytesIO
+from pathlib import Path
+from unittest import mock
 
 FASTAPI_AVAILABLE = True
 
+try:
+  import av
+except ModuleNotFoundError:
+  av = None
+
 try:
   from fastapi.testclient import TestClient
-  from backend.app.main import app
+  from PIL import Image, ImageChops, ImageEnhance, ImageFilter, ImageStat
+  from backend.app import main as main_module
+  from backend.app.main import (
+    app,
+    DECODED_FRAME_CACHE,
+    DECODED_MEDIA_CACHE,
+    EXECUTION_PLAN_CACHE,
+    NODE_RESULT_CACHE,
+    GraphIndex,
+    VideoSeekIndex,
+    describe_media_source,
+    plan_video_seek,
+    ProjectPayload,
+    apply_color_operations,
+    build_image_from_graph,
+  )
 except ModuleNotFoundError as error:
   if error.name == "fastapi":
     FASTAPI_AVAILABLE = False
     TestClient = None  # type: ignore[assignment]
+    main_module = None  # type: ignore[assignment]
     app = None  # type: ignore[assignment]
+    NODE_RESULT_CACHE = None  # type: ignore[assignment]
+    DECODED_MEDIA_CACHE = None  # type: ignore[assignment]
+    DECODED_FRAME_CACHE = None  # type: ignore[assignment]
+    EXECUTION_PLAN_CACHE = None  # type: ignore[assignment]
+    GraphIndex = None  # type: ignore[assignment]
+    VideoSeekIndex = None  # type: ignore[assignment]
+    plan_video_seek = None  # type: ignore[assignment]
+    describe_media_source = None  # type: ignore[assignment]
+    ProjectPayload = None  # type: ignore[assignment]
+    build_image_from_graph = None  # type: ignore[assignment]
+    apply_color_operations = None  # type: ignore[assignment]
   else:
     raise
 
+# Node caches live in each worker process, so cache-hit assertions only hold for thread pools.
+SHARED_RENDER_CACHE = not FASTAPI_AVAILABLE or main_module.RENDER_POOL.mode != "process"  # type: ignore[union-attr]
+
 
 class ImageNodeProcessingTests(unittest.TestCase):
 
@@ -114,6 +157,806 @@ class ImageNodeProcessingTests(unittest.TestCase):
     self.assertEqual(payload["proxy"]["enabled"], False)
     self.assertTrue(payload["imageBase64"])
 
+  @unittest.skipUnless(FASTAPI_AVAILABLE, "FastAPI dependency is not installed")
+  @unittest.skipUnless(SHARED_RENDER_CACHE, "Process render pools keep node caches per worker")
+  def test_node_results_are_reused_across_requests(self) -> None:
+    def build_project(contrast: float) -> dict:
+      return {
+        "schemaVersion": "1.0.0",
+        "mediaColorSpace": "Rec.709",
+        "projectFps": 30,
+        "projectResolution": {"width": 640, "height": 360},
+        "nodes": [
+          {
+            "id": "n1",
+            "type": "MediaInput",
+            "params": {"placeholderWidth": 640, "placeholderHeight": 360},
+            "inputs": {},
+            "outputs": ["video"],
+          },
+          {
+            "id": "n2",
+            "type": "ExposureAdjust",
+            "params": {"exposure": 0.5},
+            "inputs": {"video": "n1:video"},
+            "outputs": ["video"],
+          },
+          {
+            "id": "n3",
+            "type": "ContrastAdjust",
+            "params": {"contrast": contrast},
+            "inputs": {"video": "n2:video"},
+            "outputs": ["video"],
+          },
+          {
+            "id": "n4",
+            "type": "PreviewDisplay",
+            "params": {},
+            "inputs": {"primary": "n3:video"},
+            "outputs": [],
+          },
+        ],
+        "edges": [],
+        "assets": [],
+        "metadata": {},
+      }
+
+    NODE_RESULT_CACHE.clear()  # type: ignore[union-attr]
+    first = self.client.post("/preview/generate", json={"project": build_project(1.2), "forceProxy": False})
+    self.assertEqual(first.status_code, 200)
+    stats = self.client.get("/preview/stats").json()["cache"]
+    self.assertEqual(stats["hits"], 0)
+    self.assertEqual(stats["entries"], 2)
+
+    second = self.client.post("/preview/generate", json={"project": build_project(1.2), "forceProxy": False})
+    self.assertEqual(second.status_code, 200)
+    stats = self.client.get("/preview/stats").json()["cache"]
+    self.assertEqual(stats["hits"], 1)
+
+    changed = self.client.post("/preview/generate", json={"project": build_project(1.5), "forceProxy": False})
+    self.assertEqual(changed.status_code, 200)
+    stats = self.client.get("/preview/stats").json()["cache"]
+    self.assertEqual(stats["hits"], 2)
+    self.assertEqual(stats["entries"], 3)
+
+  @unittest.skipUnless(FASTAPI_AVAILABLE, "FastAPI dependency is not installed")
+  def test_proxy_scale_is_applied_at_the_source(self) -> None:
+    project = {
+      "schemaVersion": "1.0.0",
+      "mediaColorSpace": "Rec.709",
+      "projectFps": 30,
+      "projectResolution": {"width": 3840, "height": 2160},
+      "nodes": [
+        {
+          "id": "n1",
+          "type": "MediaInput",
+          "params": {"placeholderWidth": 3840, "placeholderHeight": 2160},
+          "inputs": {},
+          "outputs": ["video"],
+        },
+        {
+          "id": "n2",
+          "type": "Crop",
+          "params": {"x": 200, "y": 100, "width": 1600, "height": 900},
+          "inputs": {"image": "n1:video"},
+          "outputs": ["image"],
+        },
+        {
+          "id": "n3",
+          "type": "PreviewDisplay",
+          "params": {},
+          "inputs": {"primary": "n2:image"},
+          "outputs": [],
+        },
+      ],
+      "edges": [],
+      "assets": [],
+      "metadata": {"previewProxy": {"enabled": True, "scale": 0.5}},
+    }
+
+    proxy_image = build_image_from_graph(ProjectPayload.model_validate(project), 0.5)  # type: ignore[union-attr]
+    self.assertEqual(proxy_image.size, (800, 450))
+
+    response = self.client.post("/preview/generate", json={"project": project})
+    self.assertEqual(response.status_code, 200)
+    payload = response.json()
+    self.assertEqual(payload["source"], {"width": 1600, "height": 900})
+    self.assertEqual((payload["width"], payload["height"]), (800, 450))
+    self.assertTrue(payload["proxy"]["enabled"])
+
+  @unittest.skipUnless(FASTAPI_AVAILABLE, "FastAPI dependency is not installed")
+  def test_fused_color_chain_matches_per_node_enhance(self) -> None:
+    noise = Image.effect_noise((320, 180), 64)
+    gradient = Image.linear_gradient("L").resize((320, 180))
+    image = Image.merge("RGB", [noise, gradient, noise.point(lambda value: 255 - value)])
+    enhancers = {
+      "exposure": ImageEnhance.Brightness,
+      "contrast": ImageEnhance.Contrast,
+      "saturation": ImageEnhance.Color,
+    }
+    chains = [
+      [("exposure", 2 ** 0.35), ("contrast", 1.12), ("saturation", 1.3)],
+      [("saturation", 1.5), ("contrast", 1.4), ("exposure", 0.8)],
+      [("contrast", 0.6), ("exposure", 1.0), ("saturation", 0.0)],
+      [("saturation", 4.0), ("saturation", 0.25)],
+      [("saturation", 3.0), ("contrast", 1.2), ("saturation", 0.5)],
+      [("saturation", 0.8), ("saturation", 0.5), ("exposure", 1.3), ("saturation", 2.0)],
+    ]
+    for operations in chains:
+      expected = image
+      for kind, factor in operations:
+        expected = enhancers[kind](expected.copy()).enhance(factor)
+      fused = apply_color_operations(image, operations)  # type: ignore[misc]
+      difference = ImageChops.difference(expected, fused)
+      self.assertLessEqual(max(high for _, high in difference.getextrema()), 2, operations)
+
+  @unittest.skipUnless(FASTAPI_AVAILABLE, "FastAPI dependency is not installed")
+  def test_media_decoding_is_reduced_and_cached(self) -> None:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+      media_path = Path(tmp_dir) / "still.jpg"
+      Image.linear_gradient("L").resize((1600, 1200)).convert("RGB").save(media_path, quality=90)
+      project = {
+        "schemaVersion": "1.0.0",
+        "mediaColorSpace": "Rec.709",
+        "projectFps": 30,
+        "nodes": [
+          {"id": "n1", "type": "MediaInput", "params": {"assetId": "a1"}, "inputs": {}, "outputs": ["video"]},
+          {"id": "n2", "type": "PreviewDisplay", "params": {}, "inputs": {"primary": "n1:video"}, "outputs": []},
+        ],
+        "edges": [],
+        "assets": [{"id": "a1", "path": str(media_path), "hash": "sha256:unit-test"}],
+        "metadata": {},
+      }
+      payload = ProjectPayload.model_validate(project)  # type: ignore[union-attr]
+
+      NODE_RESULT_CACHE.clear()  # type: ignore[union-attr]
+      DECODED_MEDIA_CACHE.clear()  # type: ignore[union-attr]
+      self.assertEqual(build_image_from_graph(payload, 0.25).size, (400, 300))  # type: ignore[misc]
+      NODE_RESULT_CACHE.clear()  # type: ignore[union-attr]
+      self.assertEqual(build_image_from_graph(payload, 0.25).size, (400, 300))  # type: ignore[misc]
+      media_stats = DECODED_MEDIA_CACHE.stats()  # type: ignore[union-attr]
+      self.assertEqual(media_stats.hits, 1)
+      self.assertEqual(media_stats.entries, 1)
+
+  @unittest.skipUnless(FASTAPI_AVAILABLE, "FastAPI dependency is not installed")
+  def test_binary_preview_endpoint_returns_encoded_bytes(self) -> None:
+    project = {
+      "schemaVersion": "1.0.0",
+      "mediaColorSpace": "Rec.709",
+      "projectFps": 30,
+      "projectResolution": {"width": 640, "height": 360},
+      "nodes": [
+        {"id": "n1", "type": "MediaInput", "params": {}, "inputs": {}, "outputs": ["video"]},
+        {"id": "n2", "type": "PreviewDisplay", "params": {}, "inputs": {"primary": "n1:video"}, "outputs": []},
+      ],
+      "edges": [],
+      "assets": [],
+      "metadata": {},
+    }
+
+    response = self.client.post(
+      "/preview/render",
+      json={"project": project, "forceProxy": False, "format": "jpeg", "quality": 70},
+    )
+    self.assertEqual(response.status_code, 200)
+    self.assertEqual(response.headers["content-type"], "image/jpeg")
+    self.assertEqual(response.headers["x-nodevision-source-width"], "640")
+    self.assertEqual(response.headers["x-nodevision-proxy-enabled"], "false")
+    with Image.open(BytesIO(response.content)) as decoded:
+      self.assertEqual(decoded.format, "JPEG")
+      self.assertEqual(decoded.size, (640, 360))
+
+    negotiated = self.client.post(
+      "/preview/render",
+      json={"project": project, "forceProxy": False},
+      headers={"Accept": "image/webp,image/*;q=0.8"},
+    )
+    self.assertEqual(negotiated.status_code, 200)
+    self.assertEqual(negotiated.headers["content-type"], "image/webp")
+
+    encoders = {item["format"]: item for item in self.client.get("/preview/stats").json()["encoders"]}
+    self.assertGreaterEqual(encoders["jpeg"]["count"], 1)
+    self.assertEqual(encoders["webp"]["lastBytes"], len(negotiated.content))
+
+  @unittest.skipUnless(SHARED_RENDER_CACHE, "Process render pools keep node caches per worker")
+  def test_preview_timings_are_reported_and_exported_as_metrics(self) -> None:
+    project = {
+      "schemaVersion": "1.0.0",
+      "mediaColorSpace": "Rec.709",
+      "projectFps": 30,
+      "projectResolution": {"width": 640, "height": 360},
+      "nodes": [
+        {"id": "n1", "type": "MediaInput", "params": {}, "inputs": {}, "outputs": ["video"]},
+        {"id": "n2", "type": "Resize", "params": {"width": 320, "height": 180}, "inputs": {"image": "n1:video"}, "outputs": ["image"]},
+        {"id": "n3", "type": "PreviewDisplay", "params": {}, "inputs": {"primary": "n2:image"}, "outputs": []},
+      ],
+      "edges": [],
+      "assets": [],
+      "metadata": {},
+    }
+
+    response = self.client.post("/preview/generate", json={"project": project, "forceProxy": False, "includeTimings": True})
+    self.assertEqual(response.status_code, 200)
+    timings = response.json()["timings"]
+    self.assertTrue({"measure", "decode", "nodes", "overlay", "encode"} <= set(timings["stages"]))
+    self.assertEqual(set(timings["nodes"]), {"MediaInput", "Resize", "PreviewDisplay"})
+    server_timing = response.headers["server-timing"]
+    self.assertIn("decode;dur=", server_timing)
+    self.assertIn("node.Resize;dur=", server_timing)
+
+    without_timings = self.client.post("/preview/generate", json={"project": project, "forceProxy": False})
+    self.assertIsNone(without_timings.json()["timings"])
+    self.assertIn("server-timing", without_timings.headers)
+
+    metrics = self.client.get("/metrics")
+    self.assertEqual(metrics.status_code, 200)
+    self.assertTrue(metrics.headers["content-type"].startswith("text/plain"))
+    body = metrics.text
+    self.assertIn('nodevision_preview_stage_seconds_count{stage="encode"}', body)
+    self.assertIn('nodevision_node_seconds_bucket{node_type="Resize",le="+Inf"}', body)
+    self.assertIn("nodevision_node_cache_hit_ratio ", body)
+    self.assertIn("nodevision_render_queue_depth 0", body)
+
+  @unittest.skipUnless(FASTAPI_AVAILABLE, "FastAPI dependency is not installed")
+  def test_viewport_render_matches_full_frame_region(self) -> None:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+      media_path = Path(tmp_dir) / "still.ppm"
+      Image.effect_noise((1600, 1200), 60).convert("RGB").filter(ImageFilter.GaussianBlur(3)).save(media_path)
+      project = {
+        "schemaVersion": "1.0.0",
+        "mediaColorSpace": "Rec.709",
+        "projectFps": 30,
+        "nodes": [
+          {"id": "n1", "type": "MediaInput", "params": {"path": str(media_path)}, "inputs": {}, "outputs": ["video"]},
+          {"id": "n2", "type": "Resize", "params": {"width": 800, "height": 600}, "inputs": {"image": "n1:video"}, "outputs": ["image"]},
+          {"id": "n3", "type": "ExposureAdjust", "params": {"exposure": 0.3}, "inputs": {"image": "n2:image"}, "outputs": ["image"]},
+          {"id": "n4", "type": "Crop", "params": {"x": 100, "y": 50, "width": 600, "height": 500}, "inputs": {"image": "n3:image"}, "outputs": ["image"]},
+          {"id": "n5", "type": "Blend", "params": {"alpha": 0.3}, "inputs": {"primary": "n4:image", "secondary": "n1:video"}, "outputs": ["image"]},
+          {"id": "n6", "type": "PreviewDisplay", "params": {}, "inputs": {"primary": "n5:image"}, "outputs": []},
+        ],
+        "edges": [],
+        "assets": [],
+        "metadata": {},
+      }
+      payload = ProjectPayload.model_validate(project)  # type: ignore[union-attr]
+
+      NODE_RESULT_CACHE.clear()  # type: ignore[union-attr]
+      DECODED_MEDIA_CACHE.clear()  # type: ignore[union-attr]
+      full_frame = build_image_from_graph(payload, 1.0)  # type: ignore[misc]
+      NODE_RESULT_CACHE.clear()  # type: ignore[union-attr]
+      DECODED_MEDIA_CACHE.clear()  # type: ignore[union-attr]
+      viewport_image = build_image_from_graph(payload, 1.0, viewport=(300, 200, 600, 450))  # type: ignore[misc]
+      self.assertEqual(viewport_image.size, (300, 250))
+      difference = ImageChops.difference(full_frame.crop((300, 200, 600, 450)), viewport_image)
+      self.assertEqual(max(high for _, high in difference.getextrema()), 0)
+      # Uncompressed rows outside the region are skipped instead of decoding the full frame.
+      self.assertEqual(DECODED_MEDIA_CACHE.stats().entries, 0)  # type: ignore[union-attr]
+
+      response = self.client.post(
+        "/preview/generate",
+        json={"project": project, "forceProxy": False, "viewport": {"x": 300, "y": 200, "width": 300, "height": 250, "zoom": 2}},
+      )
+      self.assertEqual(response.status_code, 200)
+      body = response.json()
+      self.assertEqual((body["width"], body["height"]), (300, 250))
+      self.assertEqual(body["source"], {"width": 600, "height": 500})
+      self.assertEqual(body["viewport"]["width"], 300)
+
+      zoomed_out = self.client.post(
+        "/preview/render",
+        json={"project": project, "forceProxy": False, "viewport": {"x": 0, "y": 0, "width": 600, "height": 500, "zoom": 0.5}},
+      )
+      self.assertEqual(zoomed_out.status_code, 200)
+      self.assertEqual(zoomed_out.headers["x-nodevision-proxy-reason"], "viewport_zoom")
+      self.assertEqual(zoomed_out.headers["x-nodevision-width"], "300")
+      self.assertEqual(zoomed_out.headers["x-nodevision-viewport"], "0,0,600,500")
+
+  @unittest.skipUnless(FASTAPI_AVAILABLE, "FastAPI dependency is not installed")
+  def test_scaled_viewport_render_is_a_crop_of_the_full_render(self) -> None:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+      media_path = Path(tmp_dir) / "noise.ppm"
+      Image.effect_noise((301, 203), 90).convert("RGB").save(media_path)
+      project = {
+        "schemaVersion": "1.0.0",
+        "mediaColorSpace": "Rec.709",
+        "projectFps": 30,
+        "nodes": [
+          {"id": "n1", "type": "MediaInput", "params": {"path": str(media_path)}, "inputs": {}, "outputs": ["video"]},
+          {"id": "n2", "type": "PreviewDisplay", "params": {}, "inputs": {"primary": "n1:video"}, "outputs": []},
+        ],
+        "edges": [],
+        "assets": [],
+        "metadata": {},
+      }
+      payload = ProjectPayload.model_validate(project)  # type: ignore[union-attr]
+      region = (37, 21, 134, 82)
+      for scale in (0.5, 0.3):
+        NODE_RESULT_CACHE.clear()  # type: ignore[union-attr]
+        DECODED_MEDIA_CACHE.clear()  # type: ignore[union-attr]
+        full_frame = build_image_from_graph(payload, scale)  # type: ignore[misc]
+        NODE_RESULT_CACHE.clear()  # type: ignore[union-attr]
+        DECODED_MEDIA_CACHE.clear()  # type: ignore[union-attr]
+        viewport_image = build_image_from_graph(payload, scale, viewport=region)  # type: ignore[misc]
+        box = main_module.scale_region_box(region, scale, (301, 203))  # type: ignore[union-attr]
+        self.assertEqual(viewport_image.size, (box[2] - box[0], box[3] - box[1]))
+        # Same reduce + Lanczos path; the fixed-point filter weights may still round one level apart.
+        difference = ImageChops.difference(full_frame.crop(box), viewport_image)
+        self.assertLessEqual(max(high for _, high in difference.getextrema()), 1)
+        self.assertLess(max(ImageStat.Stat(difference).mean), 0.05)
+        self.assertEqual(DECODED_MEDIA_CACHE.stats().entries, 0)  # type: ignore[union-attr]
+
+      response = self.client.post(
+        "/preview/generate",
+        json={
+          "project": project,
+          "forceProxy": False,
+          "includeTimings": True,
+          "viewport": {"x": 37, "y": 21, "width": 97, "height": 61, "zoom": 0.5},
+        },
+      )
+      body = response.json()
+      self.assertEqual((body["width"], body["height"]), (49, 31))
+      self.assertNotIn("resize", body["timings"]["stages"])
+
+  @unittest.skipUnless(FASTAPI_AVAILABLE, "FastAPI dependency is not installed")
+  @unittest.skipUnless(SHARED_RENDER_CACHE, "Process render pools keep node caches per worker")
+  def test_batch_preview_renders_every_output_in_one_pass(self) -> None:
+    project = {
+      "schemaVersion": "1.0.0",
+      "mediaColorSpace": "Rec.709",
+      "projectFps": 30,
+      "projectResolution": {"width": 640, "height": 360},
+      "nodes": [
+        {"id": "n1", "type": "MediaInput", "params": {}, "inputs": {}, "outputs": ["video"]},
+        {"id": "n2", "type": "Resize", "params": {"width": 320, "height": 180}, "inputs": {"image": "n1:video"}, "outputs": ["image"]},
+        {"id": "n3", "type": "ExposureAdjust", "params": {"exposure": 0.5}, "inputs": {"image": "n2:image"}, "outputs": ["image"]},
+        {"id": "n4", "type": "ContrastAdjust", "params": {"contrast": 1.4}, "inputs": {"image": "n2:image"}, "outputs": ["image"]},
+        {"id": "left", "type": "PreviewDisplay", "params": {}, "inputs": {"primary": "n3:image"}, "outputs": []},
+        {"id": "right", "type": "PreviewDisplay", "params": {}, "inputs": {"primary": "n4:image"}, "outputs": []},
+        {"id": "idle", "type": "PreviewDisplay", "params": {}, "inputs": {}, "outputs": []},
+      ],
+      "edges": [],
+      "assets": [],
+      "metadata": {},
+    }
+
+    NODE_RESULT_CACHE.clear()  # type: ignore[union-attr]
+    response = self.client.post("/preview/batch", json={"project": project, "forceProxy": False, "format": "jpeg"})
+    self.assertEqual(response.status_code, 200)
+    payload = response.json()
+    self.assertEqual([item["nodeId"] for item in payload["outputs"]], ["left", "right"])
+    self.assertEqual(payload["missing"], ["idle"])
+    for item in payload["outputs"]:
+      self.assertEqual(item["mediaType"], "image/jpeg")
+      self.assertEqual((item["width"], item["height"]), (320, 180))
+    cache_stats = NODE_RESULT_CACHE.stats()  # type: ignore[union-attr]
+    self.assertEqual((cache_stats.entries, cache_stats.hits), (4, 0))
+
+    subset = self.client.post("/preview/batch", json={"project": project, "forceProxy": False, "outputs": ["right"]})
+    self.assertEqual([item["nodeId"] for item in subset.json()["outputs"]], ["right"])
+
+    invalid = self.client.post("/preview/batch", json={"project": project, "outputs": ["n3"]})
+    self.assertEqual(invalid.status_code, 422)
+    self.assertEqual(invalid.json()["detail"]["code"], "E-NODE-VALIDATION")
+
+  @unittest.skipUnless(FASTAPI_AVAILABLE, "FastAPI dependency is not installed")
+  def test_independent_branches_run_once_on_the_graph_pool(self) -> None:
+    project = ProjectPayload.model_validate({  # type: ignore[union-attr]
+      "schemaVersion": "1.0.0",
+      "mediaColorSpace": "Rec.709",
+      "projectFps": 30,
+      "projectResolution": {"width": 640, "height": 360},
+      "nodes": [
+        {"id": "n1", "type": "MediaInput", "params": {}, "inputs": {}, "outputs": ["video"]},
+        {"id": "n2", "type": "ExposureAdjust", "params": {"exposure": 0.5}, "inputs": {"image": "n1:video"}, "outputs": ["image"]},
+        {"id": "n3", "type": "ContrastAdjust", "params": {"contrast": 1.3}, "inputs": {"image": "n1:video"}, "outputs": ["image"]},
+        {"id": "n4", "type": "Resize", "params": {"width": 320, "height": 180}, "inputs": {"image": "n3:image"}, "outputs": ["image"]},
+        {"id": "n5", "type": "Blend", "params": {"alpha": 0.4}, "inputs": {"primary": "n2:image", "secondary": "n4:image"}, "outputs": ["image"]},
+        {"id": "n6", "type": "PreviewDisplay", "params": {}, "inputs": {"primary": "n5:image"}, "outputs": []},
+      ],
+      "edges": [],
+      "assets": [],
+      "metadata": {},
+    })
+
+    NODE_RESULT_CACHE.clear()  # type: ignore[union-attr]
+    with mock.patch.object(main_module, "GRAPH_WORKERS", 1):
+      sequential = build_image_from_graph(project)  # type: ignore[misc]
+
+    completed: dict[str, int] = {}
+    threads: set[str] = set()
+
+    def observe(event: str, payload: dict) -> None:
+      if event == "graph:completed":
+        completed[payload["nodeId"]] = completed.get(payload["nodeId"], 0) + 1
+        threads.add(threading.current_thread().name)
+
+    NODE_RESULT_CACHE.clear()  # type: ignore[union-attr]
+    with mock.patch.object(main_module, "GRAPH_WORKERS", 4):
+      parallel = build_image_from_graph(project, observer=observe)  # type: ignore[misc]
+    self.assertEqual(completed, {"n1": 1, "n2": 1, "n3": 1, "n4": 1, "n5": 1, "n6": 1})
+    self.assertTrue(any(name.startswith("nodevision-graph") for name in threads))
+    self.assertIsNone(ImageChops.difference(sequential, parallel).getbbox())
+
+  @unittest.skipUnless(FASTAPI_AVAILABLE, "FastAPI dependency is not installed")
+  def test_edges_are_compiled_into_a_cached_execution_plan(self) -> None:
+    project = {
+      "schemaVersion": "1.0.0",
+      "mediaColorSpace": "Rec.709",
+      "projectFps": 30,
+      "projectResolution": {"width": 320, "height": 180},
+      "nodes": [
+        {"id": "n1", "type": "MediaInput", "params": {}, "inputs": {}, "outputs": ["video"]},
+        {"id": "n2", "type": "ExposureAdjust", "params": {"exposure": 0.5}, "inputs": {}, "outputs": ["image"]},
+        {"id": "n3", "type": "Resize", "params": {"width": 160, "height": 90}, "inputs": {}, "outputs": ["image"]},
+        {"id": "n4", "type": "PreviewDisplay", "params": {}, "inputs": {}, "outputs": []},
+      ],
+      "edges": [
+        {"from": "n1:video", "to": "n2:image"},
+        {"from": "n2:image", "to": "n4:primary"},
+        {"from": "n1:video", "to": "n3:image", "disabled": True},
+      ],
+      "assets": [],
+      "metadata": {},
+    }
+    graph = GraphIndex(ProjectPayload.model_validate(project))  # type: ignore[misc,union-attr]
+    plan = graph.plan()
+    self.assertEqual(plan.order, ["n1", "n2", "n4"])
+    self.assertEqual((plan.named_input("n2", "image"), plan.single_input("n4"), plan.single_input("n3")), ("n1", "n2", None))
+    self.assertEqual(plan.upstream(["n2"]), ["n1", "n2"])
+
+    project["nodes"][1]["params"] = {"exposure": -0.5}
+    edited = GraphIndex(ProjectPayload.model_validate(project))  # type: ignore[misc,union-attr]
+    self.assertIs(edited.plan(), plan)
+
+    response = self.client.post("/preview/generate", json={"project": project})
+    self.assertEqual(response.status_code, 200)
+    self.assertEqual((response.json()["width"], response.json()["height"]), (320, 180))
+
+  @unittest.skipUnless(FASTAPI_AVAILABLE, "FastAPI dependency is not installed")
+  def test_cyclic_graph_is_rejected_before_rendering(self) -> None:
+    project = {
+      "schemaVersion": "1.0.0",
+      "mediaColorSpace": "Rec.709",
+      "projectFps": 30,
+      "nodes": [
+        {"id": "n1", "type": "ExposureAdjust", "params": {}, "inputs": {"image": "n2:image"}, "outputs": ["image"]},
+        {"id": "n2", "type": "ContrastAdjust", "params": {}, "inputs": {"image": "n1:image"}, "outputs": ["image"]},
+        {"id": "n3", "type": "PreviewDisplay", "params": {}, "inputs": {"primary": "n2:image"}, "outputs": []},
+      ],
+      "edges": [],
+      "assets": [],
+      "metadata": {},
+    }
+    response = self.client.post("/preview/generate", json={"project": project})
+    self.assertEqual(response.status_code, 422)
+    detail = response.json()["detail"]
+    self.assertEqual(detail["code"], "E-NODE-VALIDATION")
+    self.assertIn("n1", detail["cause"])
+    self.assertNotIn("n3", detail["cause"])
+
+  @unittest.skipUnless(FASTAPI_AVAILABLE, "FastAPI dependency is not installed")
+  def test_deep_chains_are_evaluated_without_recursion(self) -> None:
+    depth = 1500
+    nodes = [{"id": "n0", "type": "MediaInput", "params": {"placeholderWidth": 128, "placeholderHeight": 72}, "inputs": {}, "outputs": ["video"]}]
+    for index in range(1, depth + 1):
+      node_type = "Resize" if index % 2 else "ExposureAdjust"
+      params = {"width": 128, "height": 72} if node_type == "Resize" else {"exposure": 0.001}
+      nodes.append({"id": f"n{index}", "type": node_type, "params": params, "inputs": {"image": f"n{index - 1}:image"}, "outputs": ["image"]})
+    nodes.append({"id": "out", "type": "PreviewDisplay", "params": {}, "inputs": {"primary": f"n{depth}:image"}, "outputs": []})
+    project = ProjectPayload.model_validate({  # type: ignore[union-attr]
+      "schemaVersion": "1.0.0",
+      "mediaColorSpace": "Rec.709",
+      "projectFps": 30,
+      "nodes": nodes,
+      "edges": [],
+      "assets": [],
+      "metadata": {},
+    })
+    EXECUTION_PLAN_CACHE.clear()  # type: ignore[union-attr]
+    NODE_RESULT_CACHE.clear()  # type: ignore[union-attr]
+    self.assertEqual(build_image_from_graph(project).size, (128, 72))  # type: ignore[misc]
+
+  @unittest.skipUnless(FASTAPI_AVAILABLE, "FastAPI dependency is not installed")
+  def test_placeholders_are_cached_within_the_media_byte_budget(self) -> None:
+    DECODED_MEDIA_CACHE.clear()  # type: ignore[union-attr]
+    first = main_module.create_placeholder_image(320, 180, "Missing")  # type: ignore[union-attr]
+    first.paste((255, 0, 0), (0, 0, 320, 180))
+    second = main_module.create_placeholder_image(320, 180, "Missing")  # type: ignore[union-attr]
+    stats = DECODED_MEDIA_CACHE.stats()  # type: ignore[union-attr]
+    self.assertEqual((stats.entries, stats.hits, stats.bytes), (1, 1, 320 * 180 * 3))
+    self.assertNotEqual(second.getpixel((160, 120)), (255, 0, 0))
+
+    with mock.patch.object(DECODED_MEDIA_CACHE, "max_bytes", 1024):
+      DECODED_MEDIA_CACHE.clear()  # type: ignore[union-attr]
+      large = main_module.create_placeholder_image(3840, 2160, "Missing")  # type: ignore[union-attr]
+      self.assertEqual(DECODED_MEDIA_CACHE.stats().entries, 0)  # type: ignore[union-attr]
+    self.assertEqual(large.size, (3840, 2160))
+
+  @unittest.skipUnless(FASTAPI_AVAILABLE, "FastAPI dependency is not installed")
+  def test_asset_hashes_are_computed_in_the_background(self) -> None:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+      media_path = Path(tmp_dir) / "still.png"
+      Image.effect_noise((256, 256), 80).convert("RGB").save(media_path)
+      expected = "sha256:" + hashlib.sha256(media_path.read_bytes()).hexdigest()
+      project = {
+        "schemaVersion": "1.0.0",
+        "mediaColorSpace": "Rec.709",
+        "projectFps": 30,
+        "nodes": [
+          {"id": "n1", "type": "MediaInput", "params": {"assetId": "a1"}, "inputs": {}, "outputs": ["video"]},
+          {"id": "n2", "type": "PreviewDisplay", "params": {}, "inputs": {"primary": "n1:video"}, "outputs": []},
+        ],
+        "edges": [],
+        "assets": [
+          {"id": "a1", "path": str(media_path), "hash": expected},
+          {"id": "a2", "path": str(Path(tmp_dir) / "missing.png"), "hash": "sha256:missing"},
+        ],
+        "metadata": {},
+      }
+      main_module.ASSET_HASHER.clear()  # type: ignore[union-attr]
+      with mock.patch.object(main_module, "ASSET_HASH_CHUNK_BYTES", 4096):
+        started = self.client.post("/assets/hash", json={"project": project}).json()
+        self.assertEqual([item["assetId"] for item in started["assets"]], ["a1", "a2"])
+        self.assertEqual(started["assets"][1]["state"], "failed")
+        deadline = time.monotonic() + 5.0
+        status = self.client.get("/assets/hash").json()
+        while status["done"] < 1 and time.monotonic() < deadline:
+          time.sleep(0.01)
+          status = self.client.get("/assets/hash").json()
+      self.assertEqual(status["assets"][0]["hash"], expected)
+      self.assertEqual(status["bytesHashed"], media_path.stat().st_size)
+
+      finished = self.client.post("/assets/hash", json={"project": project}).json()
+      self.assertTrue(finished["assets"][0]["matches"])
+      payload = ProjectPayload.model_validate(project)  # type: ignore[union-attr]
+      graph = GraphIndex(payload)  # type: ignore[misc]
+      description = describe_media_source(payload, graph.node_map["n1"], graph.asset_index)  # type: ignore[misc]
+      self.assertIn([expected], description["files"])
+
+  @unittest.skipUnless(FASTAPI_AVAILABLE, "FastAPI dependency is not installed")
+  def test_proxy_pyramid_is_built_once_and_used_for_scaled_previews(self) -> None:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+      media_path = Path(tmp_dir) / "large.png"
+      Image.linear_gradient("L").resize((1024, 768)).convert("RGB").save(media_path)
+      project = {
+        "schemaVersion": "1.0.0",
+        "mediaColorSpace": "Rec.709",
+        "projectFps": 30,
+        "nodes": [
+          {"id": "n1", "type": "MediaInput", "params": {"assetId": "a1"}, "inputs": {}, "outputs": ["video"]},
+          {"id": "n2", "type": "PreviewDisplay", "params": {}, "inputs": {"primary": "n1:video"}, "outputs": []},
+        ],
+        "edges": [],
+        "assets": [{"id": "a1", "path": str(media_path), "hash": "sha256:unit-test"}],
+        "metadata": {},
+      }
+      payload = ProjectPayload.model_validate(project)  # type: ignore[union-attr]
+      NODE_RESULT_CACHE.clear()  # type: ignore[union-attr]
+      DECODED_MEDIA_CACHE.clear()  # type: ignore[union-attr]
+      reference = build_image_from_graph(payload, 0.3)  # type: ignore[misc]
+
+      pyramids = main_module.PROXY_PYRAMIDS  # type: ignore[union-attr]
+      pyramids.clear()
+      with mock.patch.object(pyramids, "cache_dir", Path(tmp_dir) / "proxies"):
+        started = self.client.post("/assets/proxies", json={"project": project}).json()
+        self.assertEqual(started["assets"][0]["assetId"], "a1")
+        deadline = time.monotonic() + 10.0
+        status = self.client.get("/assets/proxies").json()
+        while status["done"] < 1 and status["failed"] < 1 and time.monotonic() < deadline:
+          time.sleep(0.01)
+          status = self.client.get("/assets/proxies").json()
+        levels = {level["factor"]: (level["width"], level["height"]) for level in status["assets"][0]["levels"]}
+        self.assertEqual(levels, {2: (512, 384), 4: (256, 192), 8: (128, 96)})
+        self.assertTrue(status["assets"][0]["proxyPath"].endswith("2.jpg"))
+        main_module.schedule_asset_proxies(payload)  # type: ignore[union-attr]
+        self.assertEqual(payload.assets[0].proxyPath, status["assets"][0]["proxyPath"])
+
+        decoded: list[Path] = []
+        original_decode = main_module.decode_media_file  # type: ignore[union-attr]
+
+        def record_decode(path, *args):  # type: ignore[no-untyped-def]
+          decoded.append(path)
+          return original_decode(path, *args)
+
+        NODE_RESULT_CACHE.clear()  # type: ignore[union-attr]
+        with mock.patch.object(main_module, "decode_media_file", record_decode):
+          proxied = build_image_from_graph(payload, 0.3)  # type: ignore[misc]
+          full = build_image_from_graph(payload, 1.0)  # type: ignore[misc]
+        self.assertEqual([path.name for path in decoded], ["2.jpg", "large.png"])
+        self.assertEqual(proxied.size, reference.size)
+        self.assertEqual(full.size, (1024, 768))
+        difference = ImageChops.difference(reference, proxied).convert("L")
+        self.assertLessEqual(max(difference.getextrema()), 8)
+
+        with mock.patch.object(pyramids, "max_entries", 0):
+          pyramids.evict()
+        self.assertEqual(self.client.get("/assets/proxies").json()["assets"], [])
+      pyramids.clear()
+
+  @unittest.skipUnless(FASTAPI_AVAILABLE, "FastAPI dependency is not installed")
+  def test_failed_proxy_builds_are_not_resubmitted(self) -> None:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+      first = Path(tmp_dir) / "clip.mp4"
+      first.write_bytes(b"not an image" * 64)
+      copy = Path(tmp_dir) / "copy.mp4"
+      shutil.copyfile(first, copy)
+      pyramids = main_module.PROXY_PYRAMIDS  # type: ignore[union-attr]
+      pyramids.clear()
+      original_build = pyramids.build
+      with mock.patch.object(pyramids, "cache_dir", Path(tmp_dir) / "proxies"), \
+          mock.patch.object(pyramids, "build", side_effect=original_build) as build:
+        job = pyramids.request(first, first.stat())
+        job.future.result()
+        self.assertEqual(job.state, "failed")
+        self.assertIs(pyramids.request(first, first.stat()), job)
+        duplicate = pyramids.request(copy, copy.stat())
+        duplicate.future.result()
+        self.assertEqual((duplicate.state, duplicate.error), ("failed", job.error))
+        self.assertEqual(build.call_count, 1)
+      pyramids.clear()
+
+  @unittest.skipUnless(FASTAPI_AVAILABLE, "FastAPI dependency is not installed")
+  def test_video_seeks_only_when_the_target_leaves_the_decoded_gop(self) -> None:
+    index = VideoSeekIndex(  # type: ignore[misc]
+      width=64, height=36, fps=25.0, time_base=1 / 12800, start_pts=0, frame_count=100, keyframes=[0, 12800, 25600]
+    )
+    self.assertEqual(index.pts_of(30), 15360)
+    self.assertEqual(index.frame_of(15360), 30)
+    self.assertEqual(index.keyframe_before(15360), 12800)
+    self.assertEqual(plan_video_seek(index, None, index.pts_of(30)), 12800)  # type: ignore[misc]
+    self.assertIsNone(plan_video_seek(index, index.pts_of(27), index.pts_of(30)))  # type: ignore[misc]
+    self.assertEqual(plan_video_seek(index, index.pts_of(31), index.pts_of(30)), 12800)  # type: ignore[misc]
+    self.assertEqual(plan_video_seek(index, index.pts_of(10), index.pts_of(30)), 12800)  # type: ignore[misc]
+
+  @unittest.skipUnless(FASTAPI_AVAILABLE, "FastAPI dependency is not installed")
+  def test_frame_parameter_is_echoed_and_ignored_for_still_images(self) -> None:
+    project = {
+      "schemaVersion": "1.0.0",
+      "mediaColorSpace": "Rec.709",
+      "projectFps": 30,
+      "nodes": [
+        {"id": "n1", "type": "MediaInput", "params": {"placeholderWidth": 320, "placeholderHeight": 180}, "inputs": {}, "outputs": ["video"]},
+        {"id": "n2", "type": "PreviewDisplay", "params": {}, "inputs": {"primary": "n1:video"}, "outputs": []},
+      ],
+      "edges": [],
+      "assets": [],
+      "metadata": {},
+    }
+    still = self.client.post("/preview/generate", json={"project": project}).json()
+    framed = self.client.post("/preview/generate", json={"project": project, "frame": 42}).json()
+    self.assertIsNone(still["frame"])
+    self.assertEqual(framed["frame"], 42)
+    self.assertEqual((framed["width"], framed["height"]), (still["width"], still["height"]))
+    rendered = self.client.post("/preview/render", json={"project": project, "frame": 42, "format": "png"})
+    self.assertEqual(rendered.headers["x-nodevision-frame"], "42")
+    rejected = self.client.post("/preview/generate", json={"project": project, "frame": -1})
+    self.assertEqual(rejected.status_code, 422)
+
+  @unittest.skipUnless(FASTAPI_AVAILABLE and av is not None, "PyAV is not installed")
+  def test_video_frames_are_decoded_forward_and_cached(self) -> None:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+      media_path = Path(tmp_dir) / "clip.mp4"
+      with av.open(str(media_path), "w") as container:  # type: ignore[union-attr]
+        stream = container.add_stream("mpeg4", rate=25, options={"sc_threshold": "1000000000"})
+        stream.width, stream.height, stream.pix_fmt = 64, 48, "yuv420p"
+        stream.codec_context.gop_size = 12
+        for number in range(48):
+          frame = av.VideoFrame.from_image(Image.new("RGB", (64, 48), (number * 5,) * 3))  # type: ignore[union-attr]
+          for packet in stream.encode(frame):
+            container.mux(packet)
+        for packet in stream.encode():
+          container.mux(packet)
+      project = {
+        "schemaVersion": "1.0.0",
+        "mediaColorSpace": "Rec.709",
+        "projectFps": 25,
+        "nodes": [
+          {"id": "n1", "type": "MediaInput", "params": {"assetId": "a1"}, "inputs": {}, "outputs": ["video"]},
+          {"id": "n2", "type": "PreviewDisplay", "params": {}, "inputs": {"primary": "n1:video"}, "outputs": []},
+        ],
+        "edges": [],
+        "assets": [{"id": "a1", "path": str(media_path), "hash": "sha256:unit-test"}],
+        "metadata": {},
+      }
+      payload = ProjectPayload.model_validate(project)  # type: ignore[union-attr]
+      NODE_RESULT_CACHE.clear()  # type: ignore[union-attr]
+      DECODED_FRAME_CACHE.clear()  # type: ignore[union-attr]
+      graph = GraphIndex(payload)  # type: ignore[misc]
+      image = build_image_from_graph(payload, 1.0, graph, frame=30)  # type: ignore[misc]
+      self.assertEqual(image.size, (64, 48))
+      self.assertAlmostEqual(image.convert("L").getpixel((32, 24)), 150, delta=12)
+      decoded_frames = DECODED_FRAME_CACHE.stats().entries  # type: ignore[union-attr]
+      self.assertGreater(decoded_frames, 1)
+
+      with mock.patch.object(main_module.VIDEO_DECODERS, "acquire") as acquire:  # type: ignore[union-attr]
+        earlier = build_image_from_graph(payload, 1.0, graph, frame=28)  # type: ignore[misc]
+      acquire.assert_not_called()
+      self.assertAlmostEqual(earlier.convert("L").getpixel((32, 24)), 140, delta=12)
+      later = build_image_from_graph(payload, 1.0, graph, frame=31)  # type: ignore[misc]
+      self.assertAlmostEqual(later.convert("L").getpixel((32, 24)), 155, delta=12)
+      main_module.VIDEO_DECODERS.clear()  # type: ignore[union-attr]
+
+      copy_path = Path(tmp_dir) / "copy.mp4"
+      shutil.copyfile(media_path, copy_path)
+      pool = main_module.VideoDecoderPool(1)  # type: ignore[union-attr]
+      index = main_module.read_video_seek_index(media_path, media_path.stat())  # type: ignore[union-attr]
+      held = pool.acquire(media_path, media_path.stat(), index)
+      with mock.patch.object(held, "close", wraps=held.close) as close:
+        other = pool.acquire(copy_path, copy_path.stat(), index)
+        pool.release(other)
+        close.assert_not_called()
+        held.decode(5, lambda number, frame: None)
+        pool.release(held)
+        close.assert_called_once()
+      pool.clear()
+
+  @unittest.skipUnless(FASTAPI_AVAILABLE, "FastAPI dependency is not installed")
+  def test_metadata_overlay_previews_are_revalidated_with_etags(self) -> None:
+    project = {
+      "schemaVersion": "1.0.0",
+      "mediaColorSpace": "Rec.709",
+      "projectFps": 30,
+      "nodes": [
+        {"id": "n1", "type": "MediaInput", "params": {"placeholderWidth": 320, "placeholderHeight": 180}, "inputs": {}, "outputs": ["video"]},
+        {"id": "n2", "type": "ExposureAdjust", "params": {"exposure": 0.2}, "inputs": {"video": "n1:video"}, "outputs": ["video"]},
+        {"id": "n3", "type": "PreviewDisplay", "params": {}, "inputs": {"primary": "n2:video"}, "outputs": []},
+      ],
+      "edges": [],
+      "assets": [],
+      "metadata": {},
+    }
+    request = {"project": project, "forceProxy": False, "overlay": "metadata"}
+    first = self.client.post("/preview/generate", json=request)
+    second = self.client.post("/preview/generate", json=request)
+    etag = first.headers["etag"]
+    self.assertTrue(etag.startswith('W/"'))
+    self.assertEqual(second.headers["etag"], etag)
+    self.assertEqual(first.json()["imageBase64"], second.json()["imageBase64"])
+    hud = first.json()["hud"]
+    self.assertEqual((hud["title"], hud["nodeCount"]), ("NodeVision Preview", 3))
+    self.assertIn("Source: 320x180", hud["lines"])
+
+    with mock.patch.object(main_module, "render_preview") as render:  # type: ignore[union-attr]
+      cached = self.client.post("/preview/generate", json=request, headers={"If-None-Match": etag})
+    render.assert_not_called()
+    self.assertEqual(cached.status_code, 304)
+    self.assertEqual(cached.headers["etag"], etag)
+
+    project["nodes"][1]["params"] = {"exposure": 0.4}
+    changed = self.client.post("/preview/generate", json=request, headers={"If-None-Match": etag})
+    self.assertEqual(changed.status_code, 200)
+    self.assertNotEqual(changed.headers["etag"], etag)
+
+    pixels = self.client.post("/preview/generate", json={"project": project, "forceProxy": False})
+    self.assertTrue(pixels.headers["etag"].startswith('W/"'))
+    self.assertNotEqual(pixels.headers["etag"], changed.headers["etag"])
+    self.assertIsNone(pixels.json()["hud"])
+
+    rendered = self.client.post("/preview/render", json={**request, "format": "png"})
+    binary_etag = rendered.headers["etag"]
+    self.assertTrue(binary_etag.startswith('"'))
+    revalidated = self.client.post("/preview/render", json={**request, "format": "png"}, headers={"If-None-Match": binary_etag})
+    self.assertEqual(revalidated.status_code, 304)
+    as_jpeg = self.client.post("/preview/render", json={**request, "format": "jpeg"}, headers={"If-None-Match": binary_etag})
+    self.assertEqual(as_jpeg.status_code, 200)
+
+    adaptive = {**request, "forceProxy": None, "format": "png"}
+    with mock.patch.object(main_module, "choose_proxy_scale", return_value=(1.0, 1.0)):  # type: ignore[union-attr]
+      full = self.client.post("/preview/render", json=adaptive)
+    with mock.patch.object(main_module, "choose_proxy_scale", return_value=(0.5, 1.0)):  # type: ignore[union-attr]
+      proxied = self.client.post("/preview/render", json=adaptive, headers={"If-None-Match": full.headers["etag"]})
+    self.assertEqual(full.headers["x-nodevision-proxy-enabled"], "false")
+    self.assertTrue(full.headers["etag"].startswith('W/"'))
+    self.assertEqual(proxied.status_code, 304)
+
+    with mock.patch.object(main_module.RENDER_POOL, "max_pending", 0), \
+        mock.patch.object(main_module, "plan_cacheable_preview") as plan:  # type: ignore[union-attr]
+      busy = self.client.post("/preview/render", json=adaptive, headers={"If-None-Match": full.headers["etag"]})
+    plan.assert_not_called()
+    self.assertEqual(busy.status_code, 503)
+    self.assertEqual(busy.headers["retry-after"], "1")
+
 
 if __name__ == "__main__":
   unittest.main()
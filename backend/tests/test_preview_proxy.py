@@ -1,19 +1,35 @@
 from __future__ import annotations
 
+import tempfile
+import threading
 import unittest
+from pathlib import Path
+from unittest import mock
 
 FASTAPI_AVAILABLE = True
 
 try:
+  from backend.app import main as main_module
   from backend.app.main import (
+    PreviewLatencyTracker,
     ProjectPayload,
+    RENDER_COST_MODEL,
+    RenderPool,
+    RenderPoolBusyError,
     compute_proxy_decision,
+    estimate_render_cost,
   )
 except ModuleNotFoundError as error:
   if error.name == "fastapi":
     FASTAPI_AVAILABLE = False
+    main_module = None  # type: ignore[assignment]
+    PreviewLatencyTracker = None  # type: ignore[assignment]
     ProjectPayload = None  # type: ignore[assignment]
+    RENDER_COST_MODEL = None  # type: ignore[assignment]
+    RenderPool = None  # type: ignore[assignment]
+    RenderPoolBusyError = RuntimeError  # type: ignore[assignment,misc]
     compute_proxy_decision = None  # type: ignore[assignment]
+    estimate_render_cost = None  # type: ignore[assignment]
   else:
     raise
 
@@ -38,26 +54,193 @@ class ProxyDecisionTests(unittest.TestCase):
   @unittest.skipUnless(FASTAPI_AVAILABLE, "FastAPI dependency is not installed")
   def test_1080p_defaults_to_full_resolution(self) -> None:
     project = create_project()
-    decision = compute_proxy_decision(project, 1920, 1080, None)
+    decision = compute_proxy_decision(project, 1920, 1080, None, estimate_render_cost(project))
     self.assertFalse(decision.enabled)
-    self.assertEqual(decision.reason, "auto")
+    self.assertEqual(decision.reason, "cost_model")
     self.assertAlmostEqual(decision.scale, 1.0, places=6)
 
-  @unittest.skipUnless(FASTAPI_AVAILABLE, "FastAPI dependency is not installed")
-  def test_4k_triggers_proxy_half_resolution(self) -> None:
-    project = create_project()
-    decision = compute_proxy_decision(project, 3840, 2160, None)
-    self.assertTrue(decision.enabled)
-    self.assertEqual(decision.reason, "resolution_4k")
-    self.assertLessEqual(decision.scale, 0.5)
-
   @unittest.skipUnless(FASTAPI_AVAILABLE, "FastAPI dependency is not installed")
   def test_project_metadata_can_disable_proxy(self) -> None:
     project = create_project({"previewProxy": {"enabled": False}})
-    decision = compute_proxy_decision(project, 3840, 2160, None)
+    decision = compute_proxy_decision(project, 3840, 2160, None, estimate_render_cost(project))
     self.assertFalse(decision.enabled)
     self.assertEqual(decision.reason, "project_metadata_off")
 
+  @unittest.skipUnless(FASTAPI_AVAILABLE, "FastAPI dependency is not installed")
+  def test_recent_p95_latency_triggers_proxy(self) -> None:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+      tracker = PreviewLatencyTracker(Path(tmp_dir) / "preview_bench.log", 200)  # type: ignore[misc]
+      for _ in range(18):
+        tracker.record("1280x720_auto", 100.0)
+      for _ in range(2):
+        tracker.record("1280x720_auto", 400.0)
+      project = create_project({"previewProxy": {"scale": 0.75}})
+      with mock.patch.object(main_module, "LATENCY_TRACKER", tracker):
+        decision = compute_proxy_decision(project, 1280, 720, None, estimate_render_cost(project))
+    self.assertTrue(decision.enabled)
+    self.assertEqual(decision.reason, "historical_delay")
+    self.assertAlmostEqual(decision.scale, 0.75, places=6)
+    self.assertAlmostEqual(decision.average_delay_ms or 0.0, 130.0, places=6)
+    self.assertAlmostEqual(decision.p95_delay_ms or 0.0, 400.0, places=6)
+
+
+def create_graph_project(width: int, height: int, steps: list[dict]) -> ProjectPayload:
+  nodes = [{
+    "id": "n1",
+    "type": "MediaInput",
+    "params": {"placeholderWidth": width, "placeholderHeight": height},
+    "inputs": {},
+    "outputs": ["video"],
+  }]
+  for index, step in enumerate(steps, start=2):
+    nodes.append({"id": f"n{index}", "inputs": {"image": f"n{index - 1}:image"}, "outputs": ["image"], **step})
+  nodes.append({
+    "id": "out",
+    "type": "PreviewDisplay",
+    "params": {},
+    "inputs": {"primary": f"n{len(nodes)}:image"},
+    "outputs": [],
+  })
+  return ProjectPayload.model_validate({**create_project().model_dump(), "nodes": nodes})  # type: ignore[union-attr]
+
+
+class CostModelProxyTests(unittest.TestCase):
+
+  def setUp(self) -> None:
+    if FASTAPI_AVAILABLE:
+      RENDER_COST_MODEL.clear()  # type: ignore[union-attr]
+
+  def tearDown(self) -> None:
+    if FASTAPI_AVAILABLE:
+      RENDER_COST_MODEL.clear()  # type: ignore[union-attr]
+
+  @unittest.skipUnless(FASTAPI_AVAILABLE, "FastAPI dependency is not installed")
+  def test_light_4k_graph_keeps_full_resolution(self) -> None:
+    project = create_graph_project(3840, 2160, [{"type": "ExposureAdjust", "params": {"exposure": 0.5}}])
+    estimate = estimate_render_cost(project)
+    decision = compute_proxy_decision(project, 3840, 2160, None, estimate)
+    self.assertFalse(decision.enabled)
+    self.assertEqual(decision.reason, "cost_model")
+    self.assertAlmostEqual(decision.scale, 1.0, places=6)
+    self.assertLessEqual(decision.predicted_render_ms, decision.target_delay_ms)
+
+  @unittest.skipUnless(FASTAPI_AVAILABLE, "FastAPI dependency is not installed")
+  def test_heavy_1080p_graph_gets_largest_scale_within_budget(self) -> None:
+    project = create_graph_project(1920, 1080, [
+      {"type": "Resize", "params": {"width": 3840, "height": 2160}},
+      {"type": "ContrastAdjust", "params": {"contrast": 1.2}},
+      {"type": "Crop", "params": {"x": 960, "y": 540, "width": 1920, "height": 1080}},
+    ])
+    estimate = estimate_render_cost(project)
+    decision = compute_proxy_decision(project, 1920, 1080, None, estimate)
+    self.assertTrue(decision.enabled)
+    self.assertEqual(decision.reason, "cost_model")
+    self.assertLess(decision.scale, 1.0)
+    self.assertLessEqual(decision.predicted_render_ms, decision.target_delay_ms)
+    next_scale = decision.scale + 0.125
+    self.assertGreater(estimate.predict(next_scale), decision.target_delay_ms * 0.6)
+
+  @unittest.skipUnless(FASTAPI_AVAILABLE, "FastAPI dependency is not installed")
+  def test_project_proxy_scale_caps_the_cost_model(self) -> None:
+    steps = [{"type": "Resize", "params": {"width": 7680, "height": 4320}}]
+    project = create_graph_project(1920, 1080, steps)
+    estimate = estimate_render_cost(project)
+    chosen = compute_proxy_decision(project, 1920, 1080, None, estimate)
+    self.assertTrue(chosen.enabled)
+    self.assertGreater(chosen.scale, 0.125)
+    capped = create_graph_project(1920, 1080, steps)
+    capped.metadata = {"previewProxy": {"scale": 0.125}}
+    decision = compute_proxy_decision(capped, 1920, 1080, None, estimate)
+    self.assertEqual((decision.reason, decision.scale), ("cost_model", 0.125))
+
+  @unittest.skipUnless(FASTAPI_AVAILABLE, "FastAPI dependency is not installed")
+  def test_measured_render_times_correct_the_estimate(self) -> None:
+    project = create_graph_project(1920, 1080, [{"type": "ExposureAdjust", "params": {"exposure": 0.5}}])
+    estimate = estimate_render_cost(project)
+    baseline = compute_proxy_decision(project, 1920, 1080, None, estimate)
+    self.assertFalse(baseline.enabled)
+
+    RENDER_COST_MODEL.observe(estimate.graph_key, estimate.predict(1.0), estimate.predict(1.0) * 4.0)  # type: ignore[union-attr]
+    corrected = compute_proxy_decision(project, 1920, 1080, None, estimate)
+    self.assertTrue(corrected.enabled)
+    self.assertAlmostEqual(corrected.predicted_render_ms or 0.0, estimate.predict(corrected.scale) * 4.0, places=6)
+
+
+  @unittest.skipUnless(FASTAPI_AVAILABLE, "FastAPI dependency is not installed")
+  def test_per_node_overhead_is_not_scaled_by_the_proxy(self) -> None:
+    project = create_graph_project(64, 64, [{"type": "ExposureAdjust", "params": {"exposure": 0.01}}] * 3000)
+    estimate = estimate_render_cost(project)
+    self.assertGreater(estimate.predict(0.5), estimate.fixed_ms)
+    self.assertGreater(estimate.fixed_ms, 3000 * main_module.NODE_FIXED_COST_MS)  # type: ignore[union-attr]
+    decision = compute_proxy_decision(project, 64, 64, None, estimate)
+    self.assertEqual((decision.enabled, decision.scale), (False, 1.0))
+
+  @unittest.skipUnless(FASTAPI_AVAILABLE, "FastAPI dependency is not installed")
+  def test_render_timings_carry_cost_samples_back_to_the_planner(self) -> None:
+    project = create_graph_project(1920, 1080, [{"type": "ExposureAdjust", "params": {"exposure": 0.5}}])
+    graph_key = estimate_render_cost(project).graph_key
+    # Render jobs may run in a worker process, so they only report the sample; the API process applies it.
+    _, _, timings = main_module.render_preview(project, False)  # type: ignore[union-attr]
+    self.assertEqual([sample[0] for sample in timings.cost_samples], [graph_key])
+    self.assertEqual(RENDER_COST_MODEL.correction_for(graph_key), 1.0)  # type: ignore[union-attr]
+    main_module.observe_render_timings(timings)  # type: ignore[union-attr]
+    _, predicted_ms, actual_ms = timings.cost_samples[0]
+    expected = min(max(actual_ms / predicted_ms, 0.1), 10.0)
+    self.assertAlmostEqual(RENDER_COST_MODEL.correction_for(graph_key), expected, places=6)  # type: ignore[union-attr]
+
+class PreviewLatencyTrackerTests(unittest.TestCase):
+
+  @unittest.skipUnless(FASTAPI_AVAILABLE, "FastAPI dependency is not installed")
+  def test_log_is_followed_incrementally_with_rolling_window(self) -> None:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+      log_path = Path(tmp_dir) / "preview_bench.log"
+      tracker = PreviewLatencyTracker(log_path, 4)  # type: ignore[misc]
+      self.assertIsNone(tracker.stats_for(1920, 1080))
+
+      log_path.write_text(
+        "PREVIEW_DELAY,1920x1080_auto,10\nCPU_USAGE,%,30\nPREVIEW_DELAY,1920x1080_auto,20\nPREVIEW_DELAY,3840x2160_auto,9",
+        encoding="utf-8",
+      )
+      stats = tracker.stats_for(1920, 1080)
+      self.assertEqual((stats.count, stats.meanMs), (2, 15.0))
+      self.assertIsNone(tracker.stats_for(3840, 2160))
+
+      with log_path.open("a", encoding="utf-8") as fh:
+        fh.write("0\n" + "".join(f"PREVIEW_DELAY,1920x1080_auto,{value}\n" for value in (30, 40, 50)))
+      stats = tracker.stats_for(1920, 1080)
+      self.assertEqual(stats.count, 4)
+      self.assertEqual((stats.p50Ms, stats.p95Ms), (30.0, 50.0))
+      self.assertEqual(tracker.stats_for(3840, 2160).meanMs, 90.0)
+
+
+class RenderPoolTests(unittest.TestCase):
+
+  @unittest.skipUnless(FASTAPI_AVAILABLE, "FastAPI dependency is not installed")
+  def test_pool_reports_queue_depth_and_rejects_when_full(self) -> None:
+    pool = RenderPool("thread", 1, 2)  # type: ignore[misc]
+    started = threading.Event()
+    release = threading.Event()
+
+    def blocking_render() -> str:
+      started.set()
+      release.wait(5)
+      return "done"
+
+    running = pool.submit(blocking_render)
+    self.assertTrue(started.wait(5))
+    queued = pool.submit(lambda: "queued")
+    stats = pool.stats()
+    self.assertEqual(stats.inFlight, 1)
+    self.assertEqual(stats.queued, 1)
+
+    with self.assertRaises(RenderPoolBusyError):
+      pool.submit(lambda: "rejected")
+    self.assertEqual(pool.stats().rejected, 1)
+
+    release.set()
+    self.assertEqual(running.result(5), "done")
+    self.assertEqual(queued.result(5), "queued")
+
 
 if __name__ == "__main__":
   unittest.main()
@@ -1,18 +1,23 @@
 from __future__ import annotations
 
+import threading
 import unittest
 from pathlib import Path
+from unittest import mock
 
 FASTAPI_AVAILABLE = True
 
 try:
   from fastapi.testclient import TestClient
-  from backend.app.main import app, STORAGE_DIR
+  from backend.app import main as main_module
+  from backend.app.main import app, STORAGE_DIR, read_project
 except ModuleNotFoundError as error:
   if error.name == "fastapi":
     FASTAPI_AVAILABLE = False
     TestClient = None  # type: ignore[assignment]
     app = None  # type: ignore[assignment]
+    main_module = None  # type: ignore[assignment]
+    read_project = None  # type: ignore[assignment]
     STORAGE_DIR = Path(".")
   else:
     raise
@@ -41,9 +46,12 @@ class ProjectLoadEndpointTests(unittest.TestCase):
     if FASTAPI_AVAILABLE:
       self.client.close()
     for slot in self.created_slots:
-      target = STORAGE_DIR / f"{slot}.nveproj"
-      if target.exists():
-        target.unlink()
+      for suffix in (".nveproj", ".nvejournal"):
+        target = STORAGE_DIR / f"{slot}{suffix}"
+        if target.exists():
+          target.unlink()
+      if FASTAPI_AVAILABLE:
+        main_module.PROJECT_JOURNALS.pop(slot, None)
 
   @unittest.skipUnless(FASTAPI_AVAILABLE, "FastAPI dependency is not installed")
   def test_round_trip_save_and_load_project(self) -> None:
@@ -77,6 +85,13 @@ class ProjectLoadEndpointTests(unittest.TestCase):
     self.assertEqual(loaded["slot"], sanitized_slot)
     self.assertTrue(loaded["path"].endswith(f"{sanitized_slot}.nveproj"))
 
+  @unittest.skipUnless(FASTAPI_AVAILABLE, "FastAPI dependency is not installed")
+  def test_info_lists_every_route(self) -> None:
+    response = self.client.get("/info")
+    self.assertEqual(response.status_code, 200)
+    routes = {route.path for route in app.routes if not route.path.startswith(("/docs", "/redoc", "/openapi"))}  # type: ignore[union-attr]
+    self.assertEqual(set(response.json()["endpoints"]), routes)
+
   @unittest.skipUnless(FASTAPI_AVAILABLE, "FastAPI dependency is not installed")
   def test_node_catalog_provides_defaults(self) -> None:
     response = self.client.get("/nodes/catalog")
@@ -172,6 +187,155 @@ class ProjectLoadEndpointTests(unittest.TestCase):
     self.assertTrue({"Resize", "Crop", "Blend"}.issubset(loaded_types))
     self.assertEqual(loaded["summary"]["nodes"], 5)
 
+  @unittest.skipUnless(FASTAPI_AVAILABLE, "FastAPI dependency is not installed")
+  def test_large_projects_are_saved_compactly_and_atomically(self) -> None:
+    project = {
+      **PROJECT_SAMPLE,
+      "nodes": [
+        {"id": f"n{index}", "type": "ExposureAdjust", "params": {"exposure": 0.1}, "inputs": {}, "outputs": ["image"]}
+        for index in range(3)
+      ],
+    }
+    with mock.patch.object(main_module, "PROJECT_COMPACT_MIN_NODES", 3):
+      save_response = self.client.post("/projects/save", json={"project": project, "slot": "unit-test-compact"})
+    self.assertEqual(save_response.status_code, 200)
+    slot = save_response.json()["slot"]
+    self.created_slots.append(slot)
+
+    target = STORAGE_DIR / f"{slot}.nveproj"
+    content = target.read_text(encoding="utf-8")
+    self.assertEqual(content.count("\n"), 1)
+    self.assertEqual(list(STORAGE_DIR.glob(f".{slot}.nveproj.*.tmp")), [])
+
+    load_response = self.client.post("/projects/load", json={"slot": slot})
+    self.assertEqual(load_response.status_code, 200)
+    self.assertEqual(load_response.json()["summary"]["nodes"], 3)
+    self.assertEqual(load_response.json()["project"]["metadata"]["savedBy"], "backend")
+
+  @unittest.skipUnless(FASTAPI_AVAILABLE, "FastAPI dependency is not installed")
+  def test_loads_reuse_the_parsed_project_until_the_file_changes(self) -> None:
+    save_response = self.client.post("/projects/save", json={"project": PROJECT_SAMPLE, "slot": "unit-test-cache"})
+    slot = save_response.json()["slot"]
+    self.created_slots.append(slot)
+
+    first, _, _ = read_project(slot)  # type: ignore[misc]
+    second, _, _ = read_project(slot)  # type: ignore[misc]
+    self.assertIs(first, second)
+
+    changed = {**PROJECT_SAMPLE, "projectFps": 24.0}
+    self.client.post("/projects/save", json={"project": changed, "slot": slot})
+    reloaded, _, _ = read_project(slot)  # type: ignore[misc]
+    self.assertIsNot(reloaded, first)
+    self.assertEqual(reloaded.projectFps, 24.0)
+
+  @unittest.skipUnless(FASTAPI_AVAILABLE, "FastAPI dependency is not installed")
+  def test_journaled_saves_append_diffs_and_load_any_revision(self) -> None:
+    nodes = [
+      {"id": f"n{index}", "type": "ExposureAdjust", "params": {"exposure": 0.0}, "inputs": {}, "outputs": ["image"]}
+      for index in range(50)
+    ]
+    slot = "unit-test-journal"
+    self.created_slots.append(slot)
+    revisions = []
+    for exposure in (0.0, 0.5, 1.0):
+      nodes[7] = {**nodes[7], "params": {"exposure": exposure}}
+      response = self.client.post(
+        "/projects/save", json={"project": {**PROJECT_SAMPLE, "nodes": nodes}, "slot": slot, "journal": True}
+      )
+      self.assertEqual(response.status_code, 200)
+      revisions.append(response.json()["revision"])
+    self.assertEqual(revisions, [1, 2, 3])
+
+    snapshot_size = (STORAGE_DIR / f"{slot}.nveproj").stat().st_size
+    journal_lines = (STORAGE_DIR / f"{slot}.nvejournal").read_bytes().splitlines()
+    self.assertEqual(len(journal_lines), 2)
+    self.assertTrue(all(len(line) * 10 < snapshot_size for line in journal_lines))
+
+    latest = self.client.post("/projects/load", json={"slot": slot}).json()
+    self.assertEqual(latest["revision"], 3)
+    self.assertEqual(latest["project"]["nodes"][7]["params"]["exposure"], 1.0)
+    self.assertNotIn("journalRevision", latest["project"]["metadata"])
+    earlier = self.client.post("/projects/load", json={"slot": slot, "revision": 2}).json()
+    self.assertEqual(earlier["project"]["nodes"][7]["params"]["exposure"], 0.5)
+    self.assertEqual(self.client.post("/projects/load", json={"slot": slot, "revision": 9}).status_code, 404)
+
+    main_module.PROJECT_JOURNALS.pop(slot)
+    replayed = self.client.post("/projects/load", json={"slot": slot}).json()
+    self.assertEqual(replayed["revision"], 3)
+    self.assertEqual(replayed["project"]["nodes"][7]["params"]["exposure"], 1.0)
+
+  @unittest.skipUnless(FASTAPI_AVAILABLE, "FastAPI dependency is not installed")
+  def test_journal_is_compacted_into_a_new_snapshot(self) -> None:
+    slot = "unit-test-compaction"
+    self.created_slots.append(slot)
+    with mock.patch.object(main_module, "PROJECT_JOURNAL_MAX_ENTRIES", 2):
+      for fps in (24.0, 25.0, 30.0):
+        self.client.post("/projects/save", json={"project": {**PROJECT_SAMPLE, "projectFps": fps}, "slot": slot, "journal": True})
+      main_module.JOURNAL_EXECUTOR.submit(lambda: None).result()
+    self.assertEqual((STORAGE_DIR / f"{slot}.nvejournal").read_bytes(), b"")
+
+    main_module.PROJECT_JOURNALS.pop(slot)
+    loaded = self.client.post("/projects/load", json={"slot": slot}).json()
+    self.assertEqual((loaded["revision"], loaded["project"]["projectFps"]), (3, 30.0))
+
+    self.client.post("/projects/save", json={"project": {**PROJECT_SAMPLE, "projectFps": 60.0}, "slot": slot})
+    self.assertFalse((STORAGE_DIR / f"{slot}.nvejournal").exists())
+    plain = self.client.post("/projects/load", json={"slot": slot}).json()
+    self.assertEqual((plain["revision"], plain["project"]["projectFps"]), (None, 60.0))
+    self.assertNotIn("journalRevision", plain["project"]["metadata"])
+
+  @unittest.skipUnless(FASTAPI_AVAILABLE, "FastAPI dependency is not installed")
+  def test_queued_compaction_does_not_undo_a_plain_save(self) -> None:
+    slot = "unit-test-compaction-race"
+    self.created_slots.append(slot)
+    release = threading.Event()
+    blocker = main_module.JOURNAL_EXECUTOR.submit(release.wait, 10)
+    try:
+      with mock.patch.object(main_module, "PROJECT_JOURNAL_MAX_ENTRIES", 2):
+        for fps in (24.0, 25.0, 30.0):
+          self.client.post("/projects/save", json={"project": {**PROJECT_SAMPLE, "projectFps": fps}, "slot": slot, "journal": True})
+      self.client.post("/projects/save", json={"project": {**PROJECT_SAMPLE, "projectFps": 99.0}, "slot": slot})
+    finally:
+      release.set()
+    blocker.result()
+    main_module.JOURNAL_EXECUTOR.submit(lambda: None).result()
+
+    self.assertFalse((STORAGE_DIR / f"{slot}.nvejournal").exists())
+    loaded = self.client.post("/projects/load", json={"slot": slot}).json()
+    self.assertEqual((loaded["revision"], loaded["project"]["projectFps"]), (None, 99.0))
+
+  @unittest.skipUnless(FASTAPI_AVAILABLE, "FastAPI dependency is not installed")
+  def test_project_bodies_are_validated_from_raw_json(self) -> None:
+    slot = "unit-test-raw-body"
+    self.created_slots.append(slot)
+    project = {
+      **PROJECT_SAMPLE,
+      "nodes": [
+        {"id": "n1", "type": "MediaInput", "params": {}, "inputs": {}, "outputs": ["video"], "position": {"x": 4, "y": 2}},
+      ],
+    }
+    saved = self.client.post("/projects/save", json={"project": project, "slot": slot})
+    self.assertEqual(saved.status_code, 200)
+    loaded = self.client.post("/projects/load", json={"slot": slot}).json()
+    self.assertEqual(loaded["project"]["nodes"][0]["position"], {"x": 4.0, "y": 2.0})
+
+    broken = {**project, "nodes": [{"id": "n1", "params": {}, "position": {"x": "left"}}]}
+    rejected = self.client.post("/preview/generate", json={"project": broken})
+    self.assertEqual(rejected.status_code, 422)
+    locations = [issue["loc"] for issue in rejected.json()["detail"]]
+    self.assertIn(["body", "project", "nodes", 0, "type"], locations)
+    self.assertIn(["body", "project", "nodes", 0, "position", "x"], locations)
+
+    malformed = self.client.post(
+      "/projects/save", content=b'{"project": ', headers={"Content-Type": "application/json"}
+    )
+    self.assertEqual(malformed.status_code, 422)
+    self.assertEqual(malformed.json()["detail"][0]["type"], "json_invalid")
+
+    schema = self.client.get("/openapi.json").json()
+    body = schema["paths"]["/preview/generate"]["post"]["requestBody"]["content"]["application/json"]["schema"]
+    self.assertEqual(body["$ref"], "#/components/schemas/PreviewGenerateRequest")
+    self.assertIn("NodePosition", schema["components"]["schemas"])
 
 if __name__ == "__main__":
   unittest.main()
@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+FASTAPI_AVAILABLE = True
+
+try:
+  import av
+except ModuleNotFoundError:
+  av = None
+
+try:
+  from fastapi.testclient import TestClient
+  from PIL import Image
+  from backend.app import main as main_module
+  from backend.app.main import app, NODE_RESULT_CACHE, SESSION_STORE, plan_prefetch_frames
+except ModuleNotFoundError as error:
+  if error.name == "fastapi":
+    FASTAPI_AVAILABLE = False
+    TestClient = None  # type: ignore[assignment]
+    main_module = None  # type: ignore[assignment]
+    app = None  # type: ignore[assignment]
+    NODE_RESULT_CACHE = None  # type: ignore[assignment]
+    SESSION_STORE = None  # type: ignore[assignment]
+    plan_prefetch_frames = None  # type: ignore[assignment]
+  else:
+    raise
+
+# Node caches live in each worker process, so cache-hit assertions only hold for thread pools.
+SHARED_RENDER_CACHE = not FASTAPI_AVAILABLE or main_module.RENDER_POOL.mode != "process"  # type: ignore[union-attr]
+
+
+SESSION_PROJECT = {
+  "schemaVersion": "1.0.0",
+  "mediaColorSpace": "Rec.709",
+  "projectFps": 30,
+  "projectResolution": {"width": 640, "height": 360},
+  "nodes": [
+    {"id": "n1", "type": "MediaInput", "params": {}, "inputs": {}, "outputs": ["video"]},
+    {"id": "n2", "type": "Resize", "params": {"width": 320, "height": 180}, "inputs": {"image": "n1:video"}, "outputs": ["image"]},
+    {"id": "n3", "type": "ExposureAdjust", "params": {"exposure": 0.2}, "inputs": {"video": "n1:video"}, "outputs": ["video"]},
+    {"id": "n4", "type": "PreviewDisplay", "params": {}, "inputs": {"primary": "n3:video"}, "outputs": []},
+  ],
+  "edges": [
+    {"from": "n1:video", "to": "n2:image"},
+    {"from": "n1:video", "to": "n3:video"},
+    {"from": "n3:video", "to": "n4:primary"},
+  ],
+  "assets": [],
+  "metadata": {},
+}
+
+
+class GraphSessionTests(unittest.TestCase):
+
+  @unittest.skipUnless(FASTAPI_AVAILABLE, "FastAPI dependency is not installed")
+  def setUp(self) -> None:
+    self.client = TestClient(app)  # type: ignore[arg-type]
+    response = self.client.post("/sessions", json={"project": SESSION_PROJECT})
+    self.assertEqual(response.status_code, 200)
+    self.session_id = response.json()["sessionId"]
+
+  @unittest.skipUnless(FASTAPI_AVAILABLE, "FastAPI dependency is not installed")
+  def tearDown(self) -> None:
+    self.client.delete(f"/sessions/{self.session_id}")
+    self.client.close()
+
+  @unittest.skipUnless(FASTAPI_AVAILABLE, "FastAPI dependency is not installed")
+  @unittest.skipUnless(SHARED_RENDER_CACHE, "Process render pools keep node caches per worker")
+  def test_param_patch_invalidates_only_downstream_nodes(self) -> None:
+    first = self.client.post(f"/sessions/{self.session_id}/preview", json={"forceProxy": False})
+    self.assertEqual(first.status_code, 200)
+
+    response = self.client.post(
+      f"/sessions/{self.session_id}/patch",
+      json={"baseRevision": 0, "operations": [{"op": "setParam", "nodeId": "n3", "key": "exposure", "value": 0.6}]},
+    )
+    self.assertEqual(response.status_code, 200)
+    payload = response.json()
+    self.assertEqual(payload["revision"], 1)
+    self.assertEqual(payload["invalidated"], ["n3", "n4"])
+    self.assertEqual(
+      [(event["event"], event["payload"]["nodeId"], event["payload"]["reason"]) for event in payload["events"]],
+      [("cache:invalidated", "n3", "paramChanged"), ("cache:invalidated", "n4", "upstreamChanged")],
+    )
+
+    hits_before = NODE_RESULT_CACHE.stats().hits  # type: ignore[union-attr]
+    second = self.client.post(f"/sessions/{self.session_id}/preview", json={"forceProxy": False})
+    self.assertEqual(second.status_code, 200)
+    self.assertGreater(NODE_RESULT_CACHE.stats().hits, hits_before)  # type: ignore[union-attr]
+    self.assertNotEqual(first.json()["imageBase64"], second.json()["imageBase64"])
+
+  @unittest.skipUnless(FASTAPI_AVAILABLE, "FastAPI dependency is not installed")
+  def test_edge_patch_rewires_inputs(self) -> None:
+    response = self.client.post(
+      f"/sessions/{self.session_id}/patch",
+      json={"operations": [{"op": "addEdge", "edge": {"from": "n2:image", "to": "n4:primary"}}]},
+    )
+    self.assertEqual(response.status_code, 200)
+    self.assertEqual(response.json()["invalidated"], ["n4"])
+
+    preview = self.client.post(f"/sessions/{self.session_id}/preview", json={"forceProxy": False})
+    self.assertEqual(preview.status_code, 200)
+    self.assertEqual((preview.json()["width"], preview.json()["height"]), (320, 180))
+
+  @unittest.skipUnless(FASTAPI_AVAILABLE, "FastAPI dependency is not installed")
+  def test_invalid_patches_are_rejected(self) -> None:
+    unknown = self.client.post(
+      f"/sessions/{self.session_id}/patch",
+      json={"operations": [{"op": "setParam", "nodeId": "missing", "key": "exposure", "value": 1}]},
+    )
+    self.assertEqual(unknown.status_code, 422)
+    self.assertEqual(unknown.json()["detail"]["code"], "E-NODE-VALIDATION")
+
+    stale = self.client.post(
+      f"/sessions/{self.session_id}/patch",
+      json={"baseRevision": 5, "operations": []},
+    )
+    self.assertEqual(stale.status_code, 422)
+    self.assertEqual(self.client.get(f"/sessions/{self.session_id}").json()["revision"], 0)
+
+    self.assertEqual(self.client.post("/sessions/unknown/preview", json={}).status_code, 404)
+
+  @unittest.skipUnless(FASTAPI_AVAILABLE, "FastAPI dependency is not installed")
+  def test_websocket_streams_events_draft_and_final_frames(self) -> None:
+    patch = {
+      "operations": [
+        {"op": "setParam", "nodeId": "n1", "key": "placeholderWidth", "value": 1920},
+        {"op": "setParam", "nodeId": "n1", "key": "placeholderHeight", "value": 1080},
+      ],
+    }
+    self.assertEqual(self.client.post(f"/sessions/{self.session_id}/patch", json=patch).status_code, 200)
+
+    with self.client.websocket_connect(f"/sessions/{self.session_id}/ws") as websocket:
+      self.assertEqual(websocket.receive_json()["event"], "session:heartbeat")
+      websocket.send_json({"type": "preview", "forceProxy": False, "format": "jpeg"})
+
+      events: list[str] = []
+      frames: list[tuple[str, int]] = []
+      while not frames or frames[-1][0] != "final":
+        message = websocket.receive_json()
+        events.append(message["event"])
+        if message["event"] == "preview:frame":
+          data = websocket.receive_bytes()
+          self.assertEqual(len(data), message["payload"]["byteLength"])
+          frames.append((message["payload"]["stage"], message["payload"]["width"]))
+
+      self.assertEqual(frames, [("draft", 480), ("final", 1920)])
+      self.assertIn("graph:queued", events)
+      self.assertIn("graph:completed", events)
+      self.assertLess(events.index("graph:queued"), events.index("graph:completed"))
+
+      websocket.send_json({"type": "patch", "operations": [{"op": "setParam", "nodeId": "n3", "key": "exposure", "value": 1.0}]})
+      message = websocket.receive_json()
+      self.assertEqual(message["event"], "cache:invalidated")
+      self.assertEqual(message["payload"], {"nodeId": "n3", "reason": "paramChanged"})
+
+      websocket.send_text("not json")
+      while message["event"] != "graph:failed":
+        message = websocket.receive_json()
+      self.assertEqual(message["payload"]["code"], "E-WS-MESSAGE")
+      websocket.send_json({"type": "patch", "operations": [{"op": "setParam", "nodeId": "n3", "key": "exposure", "value": 0.5}]})
+      while message["event"] != "cache:invalidated":
+        message = websocket.receive_json()
+
+  @unittest.skipUnless(FASTAPI_AVAILABLE, "FastAPI dependency is not installed")
+  def test_prefetch_plans_the_scrub_direction_first(self) -> None:
+    self.assertEqual(plan_prefetch_frames(10, 1, 3, 100), [11, 12, 13, 9, 8, 7])  # type: ignore[misc]
+    self.assertEqual(plan_prefetch_frames(10, -1, 3, 100), [9, 8, 7, 11, 12, 13])  # type: ignore[misc]
+    self.assertEqual(plan_prefetch_frames(1, -1, 3, 3), [0, 2])  # type: ignore[misc]
+
+  @unittest.skipUnless(FASTAPI_AVAILABLE and av is not None, "PyAV is not installed")
+  def test_neighbouring_frames_are_prefetched_and_cancelled_on_change(self) -> None:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+      media_path = Path(tmp_dir) / "clip.mp4"
+      with av.open(str(media_path), "w") as container:  # type: ignore[union-attr]
+        stream = container.add_stream("mpeg4", rate=25, options={"sc_threshold": "1000000000"})
+        stream.width, stream.height, stream.pix_fmt = 64, 48, "yuv420p"
+        for number in range(40):
+          frame = av.VideoFrame.from_image(Image.new("RGB", (64, 48), (number * 5,) * 3))  # type: ignore[union-attr]
+          for packet in stream.encode(frame):
+            container.mux(packet)
+        for packet in stream.encode():
+          container.mux(packet)
+      project = {
+        **SESSION_PROJECT,
+        "nodes": [
+          {"id": "n1", "type": "MediaInput", "params": {"assetId": "a1"}, "inputs": {}, "outputs": ["video"]},
+          *SESSION_PROJECT["nodes"][1:],  # type: ignore[misc]
+        ],
+        "assets": [{"id": "a1", "path": str(media_path), "hash": "sha256:unit-test"}],
+      }
+      session_id = self.client.post("/sessions", json={"project": project}).json()["sessionId"]
+      session = SESSION_STORE.get(session_id)  # type: ignore[union-attr]
+      NODE_RESULT_CACHE.clear()  # type: ignore[union-attr]
+      prefetcher = main_module.SCRUB_PREFETCHER  # type: ignore[union-attr]
+      with mock.patch.object(prefetcher, "frames_ahead", 2):
+        response = self.client.post(f"/sessions/{session_id}/preview", json={"frame": 20})
+        self.assertEqual(response.json()["frame"], 20)
+        job = session.prefetch_job
+        self.assertEqual((job.direction, job.targets), (1, [21, 22, 19, 18]))
+        job.future.result(timeout=10)
+
+        # Hold the reversed job on the busy check so only the interactive render can touch the decoder here.
+        with mock.patch.object(main_module.RENDER_POOL, "busy", return_value=True), \
+            mock.patch.object(main_module, "load_media_image", wraps=main_module.load_media_image) as load:  # type: ignore[union-attr]
+          self.client.post(f"/sessions/{session_id}/preview", json={"frame": 19})
+          load.assert_not_called()
+        reversed_job = session.prefetch_job
+        self.assertTrue(job.cancelled.is_set())
+        self.assertEqual(reversed_job.direction, -1)
+
+        patch = {"operations": [{"op": "setParam", "nodeId": "n3", "key": "exposure", "value": 0.5}]}
+        self.client.post(f"/sessions/{session_id}/patch", json=patch)
+        self.assertTrue(reversed_job.cancelled.is_set())
+        self.assertIsNone(session.prefetch_job)
+        reversed_job.future.result(timeout=10)
+      stats = self.client.get("/preview/stats").json()["prefetch"]
+      self.assertGreaterEqual(stats["rendered"], 4)
+      self.client.delete(f"/sessions/{session_id}")
+      main_module.VIDEO_DECODERS.clear()  # type: ignore[union-attr]
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,100 @@
+"""
+Project validation benchmark.
+
+使い方:
+    python scripts/benchmarks/project_validation.py --nodes 1000 10000 --repeat 10
+
+`/preview/generate` のリクエストボディ検証に掛かる時間を、ノード数ごとに計測します
+（1 ノードのパラメータだけを変えながら再送するパターン）。
+
+- before: FastAPI 標準の経路。`json.loads` で dict を組み立ててから `model_validate` で検証します。
+- after: プロジェクトを含むエンドポイントの経路。受信したバイト列を `model_validate_json` で直接検証します。
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from backend.app.main import PreviewGenerateRequest  # noqa: E402
+
+
+def parse_args():
+  parser = argparse.ArgumentParser(description="NodeVision project validation benchmark")
+  parser.add_argument("--nodes", type=int, nargs="+", default=[1000, 10000], help="計測するノード数")
+  parser.add_argument("--repeat", type=int, default=10, help="計測回数")
+  return parser.parse_args()
+
+
+def build_project(node_count):
+  nodes = [{
+    "id": "n0",
+    "type": "MediaInput",
+    "displayName": "Media",
+    "params": {"placeholderWidth": 1920, "placeholderHeight": 1080},
+    "inputs": {},
+    "outputs": ["video"],
+    "cachePolicy": "auto",
+    "position": {"x": 0.0, "y": 0.0},
+  }]
+  edges = []
+  for index in range(1, node_count):
+    nodes.append({
+      "id": f"n{index}",
+      "type": "ExposureAdjust",
+      "displayName": f"Exposure {index}",
+      "params": {"exposure": 0.01},
+      "inputs": {"image": f"n{index - 1}:image"},
+      "outputs": ["image"],
+      "cachePolicy": "auto",
+      "position": {"x": index * 10.0, "y": index * 5.0},
+    })
+    edges.append({"from": f"n{index - 1}:image", "to": f"n{index}:image"})
+  return {
+    "schemaVersion": "1.0.0",
+    "mediaColorSpace": "Rec.709",
+    "projectFps": 30,
+    "nodes": nodes,
+    "edges": edges,
+    "assets": [],
+    "metadata": {},
+  }
+
+
+def validate_from_dict(body):
+  return PreviewGenerateRequest.model_validate(json.loads(body))
+
+
+def validate_from_bytes(body):
+  return PreviewGenerateRequest.model_validate_json(body)
+
+
+def measure(bodies, validate):
+  samples = []
+  for body in bodies:
+    started = time.perf_counter()
+    validate(body)
+    samples.append((time.perf_counter() - started) * 1000.0)
+  return statistics.median(samples)
+
+
+def main():
+  args = parse_args()
+  print(f"{'nodes':>8} {'before ms':>11} {'after ms':>10} {'speedup':>9}")
+  for node_count in args.nodes:
+    project = build_project(node_count)
+    edits = []
+    for step in range(args.repeat):
+      project["nodes"][node_count // 2]["params"]["exposure"] = 0.02 + step * 0.01
+      edits.append(json.dumps({"project": project}).encode("utf-8"))
+    before = measure(edits, validate_from_dict)
+    after = measure(edits, validate_from_bytes)
+    print(f"{node_count:>8} {before:>11.2f} {after:>10.2f} {before / after:>8.2f}x")
+
+
+if __name__ == "__main__":
+  main()
@@ -37,10 +37,9 @@ export function PreviewPanel({
     client_force_off: 'レンダラーで強制 OFF',
     project_metadata_on: 'プロジェクト設定で有効',
     project_metadata_off: 'プロジェクト設定で無効',
-    resolution_4k: '自動判定: 4K 以上',
-    resolution_qhd: '自動判定: 1440p 以上',
     historical_delay: '自動判定: 遅延が閾値超過',
-    auto: '自動判定: ベースライン',
+    cost_model: '自動判定: 描画コスト予測',
+    viewport_zoom: 'ビューポートのズーム',
   };
 
   const reasonLabel = preview ? proxyReasonLabels[preview.proxyReason] ?? preview.proxyReason : '';